@@ -0,0 +1,307 @@
+"""
+Benchmark suite for the functional test utilities at production-like scale.
+
+Generates (or reuses) a seeded synthetic extract, runs each component benchmark and records
+throughput, latency percentiles and peak Python memory. Results can be saved as a baseline
+and later runs compared against it; the exit code is 1 when a benchmark regressed.
+
+    python benchmark.py --rows 100000 --save-baseline benchmarks/baseline.json
+    python benchmark.py --rows 100000 --baseline benchmarks/baseline.json
+    python benchmark.py --only csv_reader_load,compare_tables
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from utilities.csv_reader import CSVReader, IndexedCSVFile, parse_creation_date
+from utilities.data_comparator import DataComparator
+from utilities.date_normalizer import DateNormalizer
+from utilities.local_screening import LocalScreeningEngine
+from utilities.name_keys import alias_keys, name_keys
+from utilities.synthetic_data import SyntheticExtractGenerator
+
+# Lookups and screens timed individually for the latency percentiles
+SAMPLE_SIZE = 1000
+# Relative change that counts as a regression when comparing against a baseline
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class BenchmarkContext:
+    def __init__(self, csv_path: str, seed: int, resolve_rows: int):
+        self.csv_path = csv_path
+        self.rng = random.Random(seed)
+        self.resolve_rows = resolve_rows
+        self._records: Optional[List[Dict]] = None
+
+    @property
+    def records(self) -> List[Dict]:
+        # Loaded once outside the timed sections
+        if self._records is None:
+            self._records = CSVReader(self.csv_path).get_all_records()
+        return self._records
+
+    def sample(self, count: int = SAMPLE_SIZE) -> List[Dict]:
+        return self.rng.sample(self.records, min(count, len(self.records)))
+
+    def opensearch_copy(self, records: List[Dict]) -> List[Dict]:
+        """
+        Records as they would come back from OpenSearch: ISO dates and a few edited values.
+        """
+        copies = []
+        for record in records:
+            copy = dict(record)
+            created = parse_creation_date(copy['Creation_Date'])
+            if created is not None:
+                copy['Creation_Date'] = created.strftime('%Y-%m-%d')
+            if self.rng.random() < 0.05:
+                copy['Additional Comments'] = (copy['Additional Comments'] or '') + ' (updated)'
+            if self.rng.random() < 0.02:
+                copy['Classification'] = 'Firm'
+            copies.append(copy)
+        return copies
+
+
+def timed(operations) -> List[float]:
+    """
+    Runs each zero-argument operation and returns its latency in milliseconds.
+    """
+    latencies = []
+    for operation in operations:
+        started = time.perf_counter()
+        operation()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def bench_csv_reader_load(ctx: BenchmarkContext):
+    reader = CSVReader(ctx.csv_path)
+    return reader.get_record_count(), None
+
+
+def bench_csv_reader_lookup(ctx: BenchmarkContext):
+    reader = CSVReader(ctx.csv_path, index_fields=('SAM Number',))
+    keys = [r['SAM Number'] for r in ctx.sample()]
+    return len(keys), timed(lambda k=k: reader.get_records_by_field('SAM Number', k) for k in keys)
+
+
+def bench_indexed_csv_lookup(ctx: BenchmarkContext):
+    index_path = f"{ctx.csv_path}.benchmark.idx.json"
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    try:
+        with IndexedCSVFile(ctx.csv_path, index_path=index_path) as indexed:
+            keys = [r['SAM Number'] for r in ctx.sample()]
+            return len(keys), timed(lambda k=k: indexed.get(k) for k in keys)
+    finally:
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+
+def bench_date_normalizer(ctx: BenchmarkContext):
+    import pandas as pd
+    normalizer = DateNormalizer()
+    count = 0
+    for field in ('Creation_Date', 'Active Date', 'Termination Date'):
+        values = pd.Series([r[field] for r in ctx.records])
+        normalizer.normalize_column(values, field)
+        count += len(values)
+    return count, None
+
+
+def bench_compare_tables(ctx: BenchmarkContext):
+    opensearch_records = ctx.opensearch_copy(ctx.records)
+    DataComparator().compare_tables(ctx.records, opensearch_records)
+    return len(ctx.records), None
+
+
+def bench_compare_records(ctx: BenchmarkContext):
+    comparator = DataComparator()
+    sample = ctx.sample()
+    pairs = list(zip(sample, ctx.opensearch_copy(sample)))
+    return len(pairs), timed(lambda a=a, b=b: comparator.get_comparison_report(a, b) for a, b in pairs)
+
+
+def bench_resolve_entities(ctx: BenchmarkContext):
+    records = ctx.records[:ctx.resolve_rows]
+    DataComparator().resolve_entities(records, ctx.opensearch_copy(records))
+    return len(records), None
+
+
+def bench_name_keys(ctx: BenchmarkContext):
+    # Python mirror of the Glue job's name key and alias derivation
+    for record in ctx.records:
+        name_keys(DataComparator.record_name(record))
+        alias_keys(record['Cross-Reference'])
+    return len(ctx.records), None
+
+
+def bench_local_screening(ctx: BenchmarkContext):
+    engine = LocalScreeningEngine()
+    engine.add_records(ctx.records)
+    names = [DataComparator.record_name(r) for r in ctx.sample()]
+    return len(names), timed(lambda n=n: engine.screen(n) for n in names)
+
+
+def bench_template_queries(ctx: BenchmarkContext, client):
+    names = [DataComparator.record_name(r) for r in ctx.sample()]
+    queries = [{"id": "name_key_search",
+                "params": {"name_key": name_keys(n)['name_key'], "phonetic_key": name_keys(n)['phonetic_key'],
+                           "from": 0, "size": 10}} for n in names]
+    batches = [queries[i:i + 100] for i in range(0, len(queries), 100)]
+    return len(queries), timed(lambda b=b: list(client.msearch_template(b, batch_size=100)) for b in batches)
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'csv_reader_load': bench_csv_reader_load,
+    'csv_reader_lookup': bench_csv_reader_lookup,
+    'indexed_csv_lookup': bench_indexed_csv_lookup,
+    'date_normalizer': bench_date_normalizer,
+    'compare_tables': bench_compare_tables,
+    'compare_records': bench_compare_records,
+    'resolve_entities': bench_resolve_entities,
+    'name_keys': bench_name_keys,
+    'local_screening': bench_local_screening
+}
+
+
+def run_benchmark(name: str, benchmark: Callable, measure_memory: bool) -> Dict:
+    """
+    Times one benchmark, then runs it again under tracemalloc for peak memory so the tracing
+    overhead does not distort the timings.
+    """
+    started = time.perf_counter()
+    items, latencies = benchmark()
+    elapsed = time.perf_counter() - started
+    # Per-operation benchmarks report throughput over the timed operations, excluding setup
+    measured = sum(latencies) / 1000 if latencies else elapsed
+    result = {
+        'items': items,
+        'seconds': round(elapsed, 4),
+        'throughput': round(items / measured, 2) if measured else 0.0
+    }
+    if latencies:
+        result.update({f'p{p}_ms': round(percentile(latencies, p), 4) for p in (50, 95, 99)})
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            benchmark()
+            result['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 2)
+        finally:
+            tracemalloc.stop()
+    print(f"{name:20s} {result}")
+    return result
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Lists regressions: throughput down, or latency or peak memory up, by more than tolerance.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous.get('throughput') and result['throughput'] < previous['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput']} < baseline {previous['throughput']}")
+        for metric in ('p95_ms', 'peak_mb'):
+            if previous.get(metric) and result.get(metric, 0) > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {result[metric]} > baseline {previous[metric]}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the functional test utilities')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows in the synthetic extract')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--csv', help='Existing extract to benchmark instead of generating one')
+    parser.add_argument('--data-dir', default='benchmark_data', help='Where generated extracts are cached')
+    parser.add_argument('--only', help='Comma-separated benchmark names')
+    parser.add_argument('--resolve-rows', type=int, default=50000, help='Rows used by resolve_entities')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory pass')
+    parser.add_argument('--host', help='OpenSearch host for the template query benchmark')
+    parser.add_argument('--scheme', default='https')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default=os.environ.get('OPENSEARCH_PASSWORD', ''))
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', help='Write results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    csv_path = args.csv
+    if not csv_path:
+        os.makedirs(args.data_dir, exist_ok=True)
+        csv_path = os.path.join(args.data_dir, f"extract_{args.rows}_{args.seed}.csv")
+        if not os.path.exists(csv_path):
+            print(f"Generating {args.rows} rows to {csv_path}")
+            SyntheticExtractGenerator(seed=args.seed).write_csv(csv_path, args.rows)
+
+    ctx = BenchmarkContext(csv_path, args.seed, args.resolve_rows)
+    benchmarks = dict(BENCHMARKS)
+    client = None
+    if args.host:
+        from utilities.api_client import OpenSearchClient
+        client = OpenSearchClient(host=args.host, auth=(args.user, args.password), scheme=args.scheme)
+        benchmarks['template_queries'] = lambda c: bench_template_queries(c, client)
+    if args.only:
+        selected = args.only.split(',')
+        unknown = set(selected) - set(benchmarks)
+        if unknown:
+            parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+        benchmarks = {name: benchmarks[name] for name in selected}
+
+    print(f"Loaded {len(ctx.records)} records from {csv_path}")
+    results = {}
+    try:
+        for name, benchmark in benchmarks.items():
+            ctx.rng.seed(args.seed)
+            results[name] = run_benchmark(name, lambda: benchmark(ctx), not args.no_memory)
+    finally:
+        if client is not None:
+            client.close()
+
+    report = {
+        'metadata': {
+            'csv': csv_path,
+            'rows': len(ctx.records),
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        },
+        'results': results
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['metadata'].get('rows') != report['metadata']['rows']:
+            print(f"Warning: baseline has {baseline['metadata'].get('rows')} rows, this run {report['metadata']['rows']}")
+        regressions = compare_to_baseline(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
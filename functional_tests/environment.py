@@ -8,6 +8,7 @@ def after_scenario(context, scenario):
     if hasattr(context, 'csv_reader'):
         del context.csv_reader
     if hasattr(context, 'api_client'):
+        context.api_client.close()
         del context.api_client
 
 
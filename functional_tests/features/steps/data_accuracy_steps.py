@@ -3,6 +3,34 @@ from behave import given, when, then
 from utilities.csv_reader import CSVReader
 from utilities.api_client import OpenSearchClient
 from utilities.data_comparator import DataComparator
+from utilities.local_opensearch import LocalIndex, LocalOpenSearchServer
+
+# Confidence a search hit needs to be compared with the CSV record, as in resolve_entities
+MIN_MATCH_CONFIDENCE = 0.5
+
+# Stand-in started on first use and shared by every scenario of the run
+_local_opensearch = None
+
+
+def get_local_opensearch(context):
+    """
+    With behave -D opensearch=local the suite runs against an in-process stand-in serving
+    test_data/sample_data.csv and the repo's search templates instead of the live domain.
+    -D opensearch_latency_ms=5 and -D opensearch_error_rate=0.05 inject latency and errors.
+    """
+    global _local_opensearch
+    if _local_opensearch is None:
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        userdata = context.config.userdata
+        latency = float(userdata.get('opensearch_latency_ms', 0))
+        server = LocalOpenSearchServer(
+            LocalIndex.from_csv(os.path.join(base_dir, 'test_data', 'sample_data.csv')),
+            latency_ms=(latency, latency),
+            error_rate=float(userdata.get('opensearch_error_rate', 0))
+        )
+        server.load_templates_file(os.path.join(base_dir, '..', 'src', 'OpenSearch', 'query_tempaltes,.json'))
+        _local_opensearch = server.start()
+    return _local_opensearch
 
 
 @given('I have access to the source CSV file')
@@ -33,10 +61,17 @@ def step_impl(context):
 
 @given('I have access to the OpenSearch API')
 def step_impl(context):
-    context.api_client = OpenSearchClient(
-        host="search-mfcodeblooded-public-2pyd6s6pv5mkpug4ostdgfqltu.aos.us-east-1.on.aws",
-        auth=("admin", "Mfcodeblooded@123")
-    )
+    if context.config.userdata.get('opensearch') == 'local':
+        context.api_client = OpenSearchClient(
+            host=get_local_opensearch(context).address,
+            auth=("admin", "admin"),
+            scheme="http"
+        )
+    else:
+        context.api_client = OpenSearchClient(
+            host="search-mfcodeblooded-public-2pyd6s6pv5mkpug4ostdgfqltu.aos.us-east-1.on.aws",
+            auth=("admin", "Mfcodeblooded@123")
+        )
     assert context.api_client.is_accessible(), "OpenSearch API not accessible"
 
 
@@ -48,24 +83,21 @@ def step_impl(context, classification):
 
 @when('I search for this record in OpenSearch')
 def step_impl(context):
-    # Use the CSV record to build a query string, for example combining first and last names
-    query_string = f"{context.csv_record['First']} {context.csv_record['Last']}".strip()
-    if not query_string:
-        # Fallback if record doesn't have first/last, adapt as needed
-        query_string = context.csv_record['Classification']
+    # Name for firms, First/Middle/Last for individuals, without the extract's quote artifacts
+    name = ' '.join(DataComparator.record_name(context.csv_record).replace('"', '').split())
+    assert name, f"CSV record has no name to search for: {context.csv_record}"
 
-    search_params = {
-        "id": "basic_person_search",
-        "params": {
-            "query_string": query_string,
-            "from": 0,
-            "size": 10
-        }
-    }
-    response = context.api_client.search_template(search_params)
+    response = context.api_client.search_name(name)
     hits = response.get('hits', {}).get('hits', [])
-    assert hits, f"No matching record found in OpenSearch for query_string: {query_string}"
-    context.opensearch_record = hits[0].get('_source', {})
+    assert hits, f"No matching record found in OpenSearch for name: {name}"
+    # Take the hit that resolves to the CSV record rather than the top-scored one
+    candidates = [hit.get('_source', {}) for hit in hits]
+    best, confidence = DataComparator().best_match(context.csv_record, candidates,
+                                                   min_confidence=MIN_MATCH_CONFIDENCE)
+    assert best is not None, \
+        f"No hit for '{name}' matches the CSV record (best confidence {confidence:.2f} < {MIN_MATCH_CONFIDENCE})"
+    print(f"Best match: hit {best} with confidence {confidence:.2f}")
+    context.opensearch_record = candidates[best]
     assert context.opensearch_record, "No _source found in the returned OpenSearch record"
 
 
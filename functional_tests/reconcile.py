@@ -0,0 +1,248 @@
+"""
+Reconciles every record of the source CSV against OpenSearch.
+
+The CSV's keys are sorted and split into contiguous key ranges, and a process pool verifies
+one range per task: records are read through the persisted offset index, looked up in
+OpenSearch one batch at a time through batched _msearch/template term queries on the id, and
+compared with DataComparator.compare_tables. The Glue job keeps one document per id, so when a
+SAM Number is repeated in the CSV the document is compared with the row it matches best and
+only counts as a mismatch when it matches none of them. Each finished batch is written to the checkpoint directory,
+so an interrupted run resumes where it stopped. The batch results are then merged into one
+mismatch report and a summary with counts per comparison type and field.
+
+    python reconcile.py test_data/sample_data.csv --host <domain> --workers 8
+    python reconcile.py test_data/sample_data.csv --local --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from utilities.api_client import OpenSearchClient
+from utilities.csv_reader import IndexedCSVFile
+from utilities.data_comparator import DataComparator, MISMATCH_COLUMNS
+
+PLAN_FILE = 'plan.json'
+# Bumped when batch results change meaning, so old checkpoints are not merged with new ones
+PLAN_VERSION = 3
+
+
+def clean_value(value: str) -> Optional[str]:
+    # Same cleaning the Glue job applies to every column: quotes removed and trimmed. Spark reads
+    # empty CSV fields as null, so an empty value is missing rather than an empty string.
+    return value.replace('"', '').strip() or None
+
+
+def source_fingerprint(csv_path: str) -> Dict:
+    stat = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def plan_shards(csv_path: str, shards: int, key_field: str) -> List[Dict]:
+    """
+    Splits the sorted distinct keys into `shards` contiguous ranges of about equal size.
+    """
+    with IndexedCSVFile(csv_path, key_field) as indexed:
+        keys = sorted(k for k in indexed.keys() if clean_value(k))
+    size = -(-len(keys) // shards) if keys else 0
+    ranges = []
+    for shard_id, start in enumerate(range(0, len(keys), size or 1)):
+        chunk = keys[start:start + size]
+        ranges.append({'shard': shard_id, 'low': chunk[0], 'high': chunk[-1], 'count': len(chunk)})
+    return ranges
+
+
+def write_json_atomic(path: str, payload: Dict):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(temp_path, path)
+
+
+def closest_rows(comparator: DataComparator, rows_by_key: Dict[str, List[Dict]], found: Dict[str, Dict],
+                 key_field: str) -> List[Dict]:
+    """
+    Picks one CSV row per key to compare with the indexed document: the only row when the key
+    is unique, otherwise the row with the fewest mismatching fields, the first one on ties.
+    """
+    chosen = {key: rows[0] for key, rows in rows_by_key.items()}
+    candidates, documents = [], []
+    for key, rows in rows_by_key.items():
+        if len(rows) > 1 and key in found:
+            # Each candidate pair gets its own join key so one compare_tables call scores them all
+            for position, row in enumerate(rows):
+                pair_key = f"{key}\x00{position}"
+                candidates.append(dict(row, **{key_field: pair_key}))
+                documents.append(dict(found[key], **{key_field: pair_key}))
+    if candidates:
+        counts = comparator.compare_tables(candidates, documents, key_field=key_field)['key'].value_counts()
+        for key, rows in rows_by_key.items():
+            if len(rows) > 1 and key in found:
+                best = min(range(len(rows)), key=lambda position: counts.get(f"{key}\x00{position}", 0))
+                chosen[key] = rows[best]
+    return list(chosen.values())
+
+
+def reconcile_shard(task: Dict) -> Dict:
+    """
+    Verifies one key range. Runs in a worker process, so everything it needs is in `task`.
+    Batches that already have a result file in the checkpoint directory are skipped.
+    """
+    shard_dir = os.path.join(task['checkpoint_dir'], f"shard-{task['shard']:05d}")
+    os.makedirs(shard_dir, exist_ok=True)
+    comparator = DataComparator(fuzzy_threshold=task['fuzzy_threshold'])
+    client = OpenSearchClient(host=task['host'], auth=tuple(task['auth']), index=task['index'],
+                              scheme=task['scheme'])
+    done = skipped = 0
+    started = time.time()
+    try:
+        with IndexedCSVFile(task['csv_path'], task['key_field']) as indexed:
+            keys = sorted(k for k in indexed.keys() if clean_value(k) and task['low'] <= k <= task['high'])
+            for batch_number, start in enumerate(range(0, len(keys), task['batch_size'])):
+                result_path = os.path.join(shard_dir, f"batch-{batch_number:06d}.json")
+                if os.path.exists(result_path):
+                    skipped += 1
+                    continue
+                batch_keys = keys[start:start + task['batch_size']]
+                rows_by_key = {}
+                for key in batch_keys:
+                    rows = rows_by_key.setdefault(clean_value(key), [])
+                    for row in indexed.get_all(key):
+                        record = {field: clean_value(value) if isinstance(value, str) else value
+                                  for field, value in row.items()}
+                        record[task['key_field']] = clean_value(key)
+                        rows.append(record)
+                found = {}
+                for key, document in client.get_documents_by_ids(list(rows_by_key), task['id_field']).items():
+                    # Cleaned like the CSV side, so an empty string in the index is missing too
+                    found[key] = {field: clean_value(value) if isinstance(value, str) else value
+                                  for field, value in document.items()}
+                csv_records = closest_rows(comparator, rows_by_key, found, task['key_field'])
+                opensearch_records = list(found.values()) or pd.DataFrame(columns=[task['key_field']])
+                mismatches = comparator.compare_tables(csv_records, opensearch_records, key_field=task['key_field'])
+                write_json_atomic(result_path, {
+                    'records': len(batch_keys),
+                    'mismatches': mismatches.astype(object).where(mismatches.notna(), None).to_dict('records')
+                })
+                done += 1
+    finally:
+        client.close()
+    return {'shard': task['shard'], 'batches': done, 'skipped': skipped, 'seconds': round(time.time() - started, 2)}
+
+
+def merge_results(checkpoint_dir: str) -> Tuple[int, pd.DataFrame]:
+    """
+    Reads every batch result in the checkpoint directory.
+
+    Returns:
+        Tuple of (records verified, DataFrame of all mismatches)
+    """
+    records, frames = 0, []
+    for shard in sorted(os.listdir(checkpoint_dir)):
+        shard_dir = os.path.join(checkpoint_dir, shard)
+        if not shard.startswith('shard-') or not os.path.isdir(shard_dir):
+            continue
+        for name in sorted(os.listdir(shard_dir)):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(shard_dir, name), 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            records += result['records']
+            if result['mismatches']:
+                frames.append(pd.DataFrame(result['mismatches'], columns=MISMATCH_COLUMNS))
+    mismatches = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=MISMATCH_COLUMNS)
+    return records, mismatches
+
+
+def load_or_create_plan(args) -> List[Dict]:
+    """
+    Reuses the checkpoint directory's plan when it was made for the same file and settings,
+    so a resumed run sees the same shards and batches.
+    """
+    plan_path = os.path.join(args.checkpoint_dir, PLAN_FILE)
+    settings = {
+        'version': PLAN_VERSION,
+        'source': source_fingerprint(args.csv),
+        'key_field': args.key_field,
+        'batch_size': args.batch_size
+    }
+    if os.path.exists(plan_path) and not args.restart:
+        with open(plan_path, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+        if plan['settings'] != settings:
+            raise SystemExit(f"{plan_path} was created for a different file or settings; use --restart")
+        print(f"Resuming from {plan_path}")
+        return plan['shards']
+
+    if args.restart and os.path.isdir(args.checkpoint_dir):
+        import shutil
+        shutil.rmtree(args.checkpoint_dir)
+    os.makedirs(args.checkpoint_dir, exist_ok=True)
+    shards = plan_shards(args.csv, args.shards or args.workers * 4, args.key_field)
+    write_json_atomic(plan_path, {'settings': settings, 'shards': shards})
+    return shards
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Reconcile every CSV record against OpenSearch')
+    parser.add_argument('csv', help='Source CSV extract')
+    parser.add_argument('--host', help='OpenSearch host')
+    parser.add_argument('--scheme', default='https')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default=os.environ.get('OPENSEARCH_PASSWORD', ''))
+    parser.add_argument('--index', default='event-data-index', help='Index or alias to verify')
+    parser.add_argument('--local', action='store_true', help='Verify against a local stand-in loaded from the CSV')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shards', type=int, help='Key ranges to split the file into, default 4 per worker')
+    parser.add_argument('--batch-size', type=int, default=500, help='Records looked up per checkpointed batch')
+    parser.add_argument('--key-field', default='SAM Number')
+    parser.add_argument('--id-field', default='id.keyword', help='OpenSearch field holding the key')
+    parser.add_argument('--fuzzy-threshold', type=int, default=85)
+    parser.add_argument('--checkpoint-dir', default='reconcile_checkpoint')
+    parser.add_argument('--restart', action='store_true', help='Discard existing checkpoints')
+    parser.add_argument('--output', default='reconcile_mismatches.csv', help='Merged mismatch report')
+    parser.add_argument('--fail-on-mismatch', action='store_true')
+    args = parser.parse_args(argv)
+    if not args.host and not args.local:
+        parser.error('--host or --local is required')
+
+    local_server = None
+    if args.local:
+        from utilities.local_opensearch import LocalIndex, LocalOpenSearchServer
+        local_server = LocalOpenSearchServer(LocalIndex.from_csv(args.csv)).start()
+        args.host, args.scheme = local_server.address, 'http'
+
+    started = time.time()
+    try:
+        shards = load_or_create_plan(args)
+        tasks = [dict(shard, csv_path=args.csv, key_field=args.key_field, id_field=args.id_field,
+                      batch_size=args.batch_size, checkpoint_dir=args.checkpoint_dir, host=args.host,
+                      scheme=args.scheme, auth=[args.user, args.password], index=args.index,
+                      fuzzy_threshold=args.fuzzy_threshold) for shard in shards]
+        print(f"Verifying {sum(s['count'] for s in shards)} keys in {len(shards)} shards with {args.workers} workers")
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(reconcile_shard, task) for task in tasks]
+            for future in as_completed(futures):
+                result = future.result()
+                print(f"Shard {result['shard']}: {result['batches']} batches verified, "
+                      f"{result['skipped']} already done ({result['seconds']}s)")
+    finally:
+        if local_server is not None:
+            local_server.stop()
+
+    records, mismatches = merge_results(args.checkpoint_dir)
+    mismatches.to_csv(args.output, index=False)
+    summary = DataComparator().summarize_mismatches(mismatches) if len(mismatches) else {}
+    print(f"Verified {records} records in {time.time() - started:.1f}s, {len(mismatches)} mismatches")
+    print(f"Mismatch report written to {args.output}")
+    print(json.dumps(summary, indent=2))
+    return 1 if args.fail_on_mismatch and len(mismatches) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
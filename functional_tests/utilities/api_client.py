@@ -1,99 +1,454 @@
 import requests
-from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Optional, Tuple, Union, Iterable, Iterator, List
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from itertools import islice
 import json
+import logging
+import queue
+import threading
+from utilities.name_keys import name_keys
+
+# Read alias; full rebuilds (src/OpenSearch/rebuild_index.py) move it between versioned indices
+DEFAULT_INDEX = "event-data-index"
+
+# Array-valued document fields; must stay in sync with SNAPSHOT_ARRAY_COLUMNS in src/glue/load_data.py
+ARRAY_FIELDS = ('name_tokens', 'name_phonetic', 'aliases', 'alias_keys', 'alias_phonetic')
+
 
 class OpenSearchClient:
-    def __init__(self, host: str, auth: tuple):
-        self.base_url = f"https://{host}"
+    def __init__(
+            self,
+            host: str,
+            auth: tuple,
+            index: str = DEFAULT_INDEX,
+            pool_size: int = 10,
+            max_retries: int = 3,
+            backoff_factor: float = 0.3,
+            timeout: Union[float, Tuple[float, float]] = (5, 30),
+            scheme: str = "https",
+            logger: Optional[logging.Logger] = None
+    ):
+        """
+        Client for the OpenSearch REST API built on a single pooled keep-alive session, so
+        repeated lookups reuse TLS connections instead of opening one per request.
+
+        Args:
+            host: OpenSearch domain host name
+            auth: (user, password) for basic auth
+            index: Index or alias searched by the search methods
+            pool_size: Maximum number of pooled connections kept open to the host
+            max_retries: Retries for connection errors and 429/502/503/504 responses
+            backoff_factor: Exponential backoff factor between retries, in seconds
+            timeout: Request timeout in seconds, or a (connect, read) tuple
+            scheme: 'https' for a real domain, 'http' for a local stand-in
+        """
+        self.base_url = f"{scheme}://{host}"
         self.auth = auth
+        self.index = index
         self.headers = {'Content-Type': 'application/json'}
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+        # Searches are read-only, so POST is safe to retry alongside GET
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'POST']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.auth = auth
+        self.session.headers.update(self.headers)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _post(self, path: str, payload: Dict, label: str) -> Dict:
+        """
+        Serializes the payload once, posts it and returns the parsed JSON response.
+        The payload is only rendered for the log when debug logging is enabled.
+        """
+        url = f"{self.base_url}/{path}"
+        body = json.dumps(payload)
+        self.logger.debug("Executing %s: %s", label, url)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Payload: %s", body)
+        response = self.session.post(url, data=body, timeout=self.timeout)
+        self.logger.debug("%s response status: %s", label, response.status_code)
+        if response.status_code != 200:
+            self.logger.debug("%s response text: %s", label, response.text)
+        response.raise_for_status()
+        return response.json()
 
     def is_accessible(self) -> bool:
         health_url = f"{self.base_url}/_cluster/health"
-        print(f"[DEBUG] Checking OpenSearch health: {health_url}")
+        self.logger.debug("Checking OpenSearch health: %s", health_url)
         try:
-            response = requests.get(
-                health_url,
-                auth=self.auth,
-                headers=self.headers
-            )
-            print(f"[DEBUG] OpenSearch health response: {response.status_code} {response.text}")
+            response = self.session.get(health_url, timeout=self.timeout)
+            self.logger.debug("OpenSearch health response: %s %s", response.status_code, response.text)
             return response.status_code == 200
         except Exception as e:
-            print(f"[ERROR] Error checking OpenSearch accessibility: {str(e)}")
+            self.logger.error("Error checking OpenSearch accessibility: %s", e)
             return False
 
     def search_template(self, query: Dict) -> Dict:
-        url = f"{self.base_url}/event-data-index_v1/_search/template"
-        print(f"[DEBUG] Executing search template: {url}")
-        print(f"[DEBUG] Payload: {json.dumps(query, indent=2)}")
         try:
-            response = requests.post(url, auth=self.auth, headers=self.headers, data=json.dumps(query))
-            print(f"[DEBUG] Search template response status: {response.status_code}")
-            if response.status_code != 200:
-                print(f"[DEBUG] Search template response text: {response.text}")
-            response.raise_for_status()
-            data = response.json()
-            print(f"[DEBUG] Resposne Json: {data}")
-            print(f"[DEBUG] Search template response hits: {len(data.get('hits', {}).get('hits', []))}")
+            data = self._post(f"{self.index}/_search/template", query, "Search template")
+            self.logger.debug("Search template response hits: %d", len(data.get('hits', {}).get('hits', [])))
             return data
         except Exception as e:
-            print(f"[ERROR] Search template error: {str(e)}")
+            self.logger.error("Search template error: %s", e)
             return {"hits": {"hits": []}}
 
-    def search(self, query: Dict) -> Dict:
-        url = f"{self.base_url}/event-data-index_v1/_search"
-        print(f"[DEBUG] Executing search: {url}")
-        print(f"[DEBUG] Payload: {json.dumps(query, indent=2)}")
+    def _msearch_template_batch(self, batch: List[Dict]) -> List[Dict]:
+        """
+        Sends one _msearch/template request. A failed request is reported as an error on every
+        item of the batch so callers can still line results up with their queries.
+        """
+        header = json.dumps({"index": self.index})
+        body = "".join(f"{header}\n{json.dumps(query)}\n" for query in batch)
+        url = f"{self.base_url}/_msearch/template"
+        self.logger.debug("Executing msearch template: %s (%d queries)", url, len(batch))
         try:
-            response = requests.post(url, auth=self.auth, headers=self.headers, data=json.dumps(query))
-            print(f"[DEBUG] Search response status: {response.status_code}")
-            if response.status_code != 200:
-                print(f"[DEBUG] Search response text: {response.text}")
+            response = self.session.post(
+                url,
+                data=body,
+                headers={'Content-Type': 'application/x-ndjson'},
+                timeout=self.timeout
+            )
             response.raise_for_status()
-            data = response.json()
-            print(f"[DEBUG] Search response hits: {len(data.get('hits', {}).get('hits', []))}")
+            responses = response.json().get('responses', [])
+        except Exception as e:
+            self.logger.error("Msearch template error: %s", e)
+            return [{"error": str(e), "hits": {"hits": []}} for _ in batch]
+
+        if len(responses) != len(batch):
+            error = f"Expected {len(batch)} responses, got {len(responses)}"
+            self.logger.error("Msearch template error: %s", error)
+            return [{"error": error, "hits": {"hits": []}} for _ in batch]
+        return responses
+
+    def msearch_template(
+            self,
+            queries: Iterable[Dict],
+            batch_size: int = 100,
+            max_in_flight: int = 4
+    ) -> Iterator[Dict]:
+        """
+        Runs many search template queries through batched _msearch/template requests.
+
+        Up to max_in_flight batches run concurrently on the pooled session while results are
+        yielded in input order. Queries are consumed lazily, so the iterable can be a generator
+        over a large extract.
+
+        Args:
+            queries: Template queries in the same {"id": ..., "params": ...} form as search_template
+            batch_size: Queries per _msearch/template request
+            max_in_flight: Batches sent concurrently; keep at or below pool_size
+
+        Yields:
+            One response per query. Failed items carry an 'error' key and an empty hit list.
+        """
+        queries = iter(queries)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            while True:
+                while len(pending) < max_in_flight:
+                    batch = list(islice(queries, batch_size))
+                    if not batch:
+                        break
+                    pending.append(executor.submit(self._msearch_template_batch, batch))
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+
+    def _open_point_in_time(self, keep_alive: str) -> str:
+        url = f"{self.base_url}/{self.index}/_search/point_in_time"
+        response = self.session.post(url, params={"keep_alive": keep_alive}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["pit_id"]
+
+    def _close_point_in_time(self, pit_id: str):
+        try:
+            self.session.delete(
+                f"{self.base_url}/_search/point_in_time",
+                data=json.dumps({"pit_id": [pit_id]}),
+                timeout=self.timeout
+            )
+        except Exception as e:
+            self.logger.error("Error closing point in time: %s", e)
+
+    def _scan_slice(
+            self,
+            pit_id: str,
+            keep_alive: str,
+            page_size: int,
+            sort_field: str,
+            source_includes: Optional[List[str]],
+            slice_id: Optional[int] = None,
+            slices: int = 1
+    ) -> Iterator[Dict]:
+        """
+        Pages through one slice of a point in time with search_after on sort_field.
+        """
+        search_after = None
+        while True:
+            query = {
+                "size": page_size,
+                "pit": {"id": pit_id, "keep_alive": keep_alive},
+                "sort": [{sort_field: "asc"}],
+                "track_total_hits": False
+            }
+            if source_includes:
+                query["_source"] = source_includes
+            if slices > 1:
+                query["slice"] = {"id": slice_id, "max": slices}
+            if search_after is not None:
+                query["search_after"] = search_after
+            hits = self._post("_search", query, "Export page").get('hits', {}).get('hits', [])
+            for hit in hits:
+                yield hit.get('_source', {})
+            if len(hits) < page_size:
+                return
+            search_after = hits[-1]["sort"]
+
+    def export_documents(
+            self,
+            page_size: int = 1000,
+            slices: int = 1,
+            keep_alive: str = "2m",
+            sort_field: str = "id.keyword",
+            source_includes: Optional[List[str]] = None
+    ) -> Iterator[Dict]:
+        """
+        Streams every document of the index without the 10k from/size window.
+
+        A point in time is opened so the export sees one consistent view of the index while it
+        pages with search_after on sort_field, which must be unique per document. With slices > 1
+        the slices are scanned in parallel threads and documents arrive in no particular order;
+        at most a few pages are buffered at any time.
+
+        Args:
+            page_size: Documents per search request
+            slices: Number of parallel sliced scans
+            keep_alive: Point in time keep-alive between pages
+            sort_field: Unique field used as the search_after key
+            source_includes: Optional list of _source fields to return
+
+        Yields:
+            The _source of each document
+        """
+        pit_id = self._open_point_in_time(keep_alive)
+        try:
+            if slices <= 1:
+                yield from self._scan_slice(pit_id, keep_alive, page_size, sort_field, source_includes)
+                return
+
+            # Bounded hand-off from the slice threads keeps memory flat however large the index is
+            buffer = queue.Queue(maxsize=page_size * slices)
+            done = object()
+            stop = threading.Event()
+
+            def scan(slice_id):
+                try:
+                    for doc in self._scan_slice(pit_id, keep_alive, page_size, sort_field,
+                                                source_includes, slice_id, slices):
+                        if stop.is_set():
+                            return
+                        buffer.put(doc)
+                except Exception as e:
+                    buffer.put(e)
+                finally:
+                    buffer.put(done)
+
+            threads = [threading.Thread(target=scan, args=(i,), daemon=True) for i in range(slices)]
+            for thread in threads:
+                thread.start()
+            remaining = slices
+            try:
+                while remaining:
+                    item = buffer.get()
+                    if item is done:
+                        remaining -= 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                stop.set()
+                # Drain so blocked slice threads can observe the stop flag and exit
+                while any(thread.is_alive() for thread in threads):
+                    try:
+                        buffer.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+        finally:
+            self._close_point_in_time(pit_id)
+
+    def export_to_jsonl(self, path: str, **export_args) -> int:
+        """
+        Writes every document to a JSON Lines file. Takes the same arguments as export_documents.
+
+        Returns:
+            int: Number of documents written
+        """
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for doc in self.export_documents(**export_args):
+                f.write(json.dumps(doc))
+                f.write("\n")
+                count += 1
+        self.logger.info("Exported %d documents to %s", count, path)
+        return count
+
+    def get_mapped_fields(self) -> List[str]:
+        """
+        Top-level fields in the index mapping, in mapping order. For an alias, the fields of
+        every index it points at.
+        """
+        response = self.session.get(f"{self.base_url}/{self.index}/_mapping", timeout=self.timeout)
+        response.raise_for_status()
+        fields = {}
+        for metadata in response.json().values():
+            fields.update(dict.fromkeys(metadata.get('mappings', {}).get('properties', {})))
+        return list(fields)
+
+    def export_to_parquet(self, path: str, row_group_size: int = 10000, **export_args) -> int:
+        """
+        Writes every document to a Parquet file in row groups of row_group_size, so memory is
+        bounded by one row group. The schema is built from the index mapping: one column per
+        mapped field, a list of strings for ARRAY_FIELDS and a string otherwise. A single value
+        in an array column is stored as a one-element list, as OpenSearch treats it. Requires
+        pyarrow.
+
+        Returns:
+            int: Number of documents written
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("export_to_parquet requires pyarrow: pip install pyarrow") from e
+
+        fields = self.get_mapped_fields()
+        if not fields:
+            raise ValueError(f"No mapped fields in {self.index}, cannot build the Parquet schema")
+        schema = pa.schema([
+            (name, pa.list_(pa.string()) if name in ARRAY_FIELDS else pa.string()) for name in fields
+        ])
+
+        def to_column(value, is_array: bool):
+            if value is None:
+                return None
+            if is_array:
+                values = value if isinstance(value, list) else [value]
+                return [None if v is None else str(v) for v in values]
+            return json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+
+        count = 0
+        with pq.ParquetWriter(path, schema, compression="snappy") as writer:
+            docs = self.export_documents(**export_args)
+            while True:
+                batch = list(islice(docs, row_group_size))
+                if not batch:
+                    break
+                columns = {
+                    name: [to_column(doc.get(name), name in ARRAY_FIELDS) for doc in batch] for name in schema.names
+                }
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                count += len(batch)
+        self.logger.info("Exported %d documents to %s", count, path)
+        return count
+
+    def search_name(self, name: str, size: int = 10) -> Dict:
+        """
+        Screens a name with the cheap name_key_search template first and only falls back to the
+        fuzzy basic_person_search template when the exact and phonetic keys find nothing.
+        """
+        keys = name_keys(name)
+        if keys['name_key']:
+            data = self.search_template({
+                "id": "name_key_search",
+                "params": {
+                    "name_key": keys['name_key'],
+                    "phonetic_key": keys['phonetic_key'],
+                    "from": 0,
+                    "size": size
+                }
+            })
+            if data.get('hits', {}).get('hits'):
+                return data
+        self.logger.debug("No name key match for '%s', falling back to fuzzy search", name)
+        return self.search_template({
+            "id": "basic_person_search",
+            "params": {"query_string": name, "from": 0, "size": size}
+        })
+
+    def get_documents_by_ids(self, ids: List[str], field: str = "id.keyword") -> Dict[str, Dict]:
+        """
+        Fetches the document whose `field` equals each of ids, one term query per id sent through
+        batched _msearch/template requests.
+
+        Unlike the search methods, errors are raised rather than returned as an empty result, so
+        a failed lookup is not mistaken for missing documents.
+
+        Returns:
+            Dict of id -> _source for the documents found
+        """
+        # Inline template, so the lookup needs nothing deployed on the domain
+        template = {"size": 1, "query": {"term": {field: "{{id}}"}}}
+        queries = ({"source": template, "params": {"id": doc_id}} for doc_id in ids)
+        found = {}
+        for doc_id, response in zip(ids, self.msearch_template(queries)):
+            if 'error' in response:
+                raise RuntimeError(f"Id lookup failed for {doc_id}: {response['error']}")
+            hits = response.get('hits', {}).get('hits', [])
+            if hits:
+                found[doc_id] = hits[0]['_source']
+        return found
+
+    def search(self, query: Dict) -> Dict:
+        try:
+            data = self._post(f"{self.index}/_search", query, "Search")
+            self.logger.debug("Search response hits: %d", len(data.get('hits', {}).get('hits', [])))
             return data
         except Exception as e:
-            print(f"[ERROR] Search error: {str(e)}")
+            self.logger.error("Search error: %s", e)
             return {"hits": {"hits": []}}
 
     def get_total_count(self) -> int:
-        url = f"{self.base_url}/event-data-index_v1/_count"
         query = {"query": {"match_all": {}}}
-        print(f"[DEBUG] Executing count: {url}")
-        print(f"[DEBUG] Payload: {json.dumps(query, indent=2)}")
         try:
-            response = requests.post(url, auth=self.auth, headers=self.headers, data=json.dumps(query))
-            print(f"[DEBUG] Count response status: {response.status_code}")
-            if response.status_code != 200:
-                print(f"[DEBUG] Count response text: {response.text}")
-            response.raise_for_status()
-            data = response.json()
-            print(f"[DEBUG] Count: {data.get('count', 0)}")
+            data = self._post(f"{self.index}/_count", query, "Count")
+            self.logger.debug("Count: %s", data.get('count', 0))
             return data.get('count', 0)
         except Exception as e:
-            print(f"[ERROR] Count error: {str(e)}")
+            self.logger.error("Count error: %s", e)
             return 0
 
     def get_latest_record(self) -> Optional[Dict]:
-        url = f"{self.base_url}/event-data-index_v1/_search"
         query = {
             "sort": [{"Creation_Date": {"order": "desc"}}],
             "size": 1
         }
-        print(f"[DEBUG] Getting latest record: {url}")
-        print(f"[DEBUG] Payload: {json.dumps(query, indent=2)}")
         try:
-            response = requests.post(url, auth=self.auth, headers=self.headers, data=json.dumps(query))
-            print(f"[DEBUG] Latest record response status: {response.status_code}")
-            if response.status_code != 200:
-                print(f"[DEBUG] Latest record response text: {response.text}")
-            response.raise_for_status()
-            data = response.json()
+            data = self._post(f"{self.index}/_search", query, "Latest record")
             hits = data.get('hits', {}).get('hits', [])
-            print(f"[DEBUG] Latest record hits: {len(hits)}")
+            self.logger.debug("Latest record hits: %d", len(hits))
             return hits[0].get('_source', {}) if hits else None
         except Exception as e:
-            print(f"[ERROR] Error getting latest record: {str(e)}")
+            self.logger.error("Error getting latest record: %s", e)
             return None
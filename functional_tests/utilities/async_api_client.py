@@ -0,0 +1,230 @@
+import aiohttp
+import asyncio
+from typing import Dict, Optional, Iterable, List, Any
+import json
+import logging
+from utilities.api_client import DEFAULT_INDEX
+from utilities.name_keys import name_keys
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class AsyncOpenSearchClient:
+    def __init__(
+            self,
+            host: str,
+            auth: tuple,
+            index: str = DEFAULT_INDEX,
+            pool_size: int = 50,
+            concurrency: int = 20,
+            max_retries: int = 3,
+            backoff_factor: float = 0.3,
+            timeout: float = 30,
+            scheme: str = "https",
+            logger: Optional[logging.Logger] = None
+    ):
+        """
+        asyncio counterpart of OpenSearchClient for fanning out large numbers of independent
+        screening requests from one process.
+
+        All requests share one keep-alive connection pool and are limited by a semaphore, so
+        `concurrency` is the number of requests the cluster sees at once however many are queued.
+
+        Args:
+            host: OpenSearch domain host name
+            auth: (user, password) for basic auth
+            index: Index or alias searched by the search methods
+            pool_size: Maximum number of pooled connections
+            concurrency: Maximum number of requests in flight
+            max_retries: Retries for connection errors, timeouts and 429/502/503/504 responses
+            backoff_factor: Exponential backoff factor between retries, in seconds
+            timeout: Total timeout per request attempt, in seconds
+            scheme: 'https' for a real domain, 'http' for a local stand-in
+        """
+        self.base_url = f"{scheme}://{host}"
+        self.auth = aiohttp.BasicAuth(*auth)
+        self.index = index
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.logger = logger or logging.getLogger(__name__)
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session and semaphore bind to the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                auth=self.auth,
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _request(self, method: str, path: str, body: Optional[str] = None,
+                       headers: Optional[Dict] = None) -> Any:
+        """
+        Sends one request under the concurrency semaphore, retrying transient failures with
+        exponential backoff. Cancelling the calling task cancels the request.
+        """
+        url = f"{self.base_url}/{path}"
+        attempt = 0
+        while True:
+            try:
+                async with self.semaphore:
+                    async with self.session.request(method, url, data=body, headers=headers) as response:
+                        if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, response.history, status=response.status)
+                        if response.status != 200:
+                            self.logger.debug("%s %s response text: %s", method, url, await response.text())
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in RETRY_STATUSES
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+
+    async def _post(self, path: str, payload: Dict, label: str) -> Dict:
+        body = json.dumps(payload)
+        self.logger.debug("Executing %s: %s/%s", label, self.base_url, path)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Payload: %s", body)
+        return await self._request("POST", path, body)
+
+    async def is_accessible(self) -> bool:
+        try:
+            await self._request("GET", "_cluster/health")
+            return True
+        except Exception as e:
+            self.logger.error("Error checking OpenSearch accessibility: %s", e)
+            return False
+
+    async def search_template(self, query: Dict) -> Dict:
+        try:
+            return await self._post(f"{self.index}/_search/template", query, "Search template")
+        except Exception as e:
+            self.logger.error("Search template error: %s", e)
+            return {"error": str(e), "hits": {"hits": []}}
+
+    async def search_name(self, name: str, size: int = 10) -> Dict:
+        """
+        Async version of OpenSearchClient.search_name: name key lookup first, fuzzy fallback on a miss.
+        """
+        keys = name_keys(name)
+        if keys['name_key']:
+            data = await self.search_template({
+                "id": "name_key_search",
+                "params": {
+                    "name_key": keys['name_key'],
+                    "phonetic_key": keys['phonetic_key'],
+                    "from": 0,
+                    "size": size
+                }
+            })
+            if data.get('hits', {}).get('hits'):
+                return data
+        return await self.search_template({
+            "id": "basic_person_search",
+            "params": {"query_string": name, "from": 0, "size": size}
+        })
+
+    async def search(self, query: Dict) -> Dict:
+        try:
+            return await self._post(f"{self.index}/_search", query, "Search")
+        except Exception as e:
+            self.logger.error("Search error: %s", e)
+            return {"error": str(e), "hits": {"hits": []}}
+
+    async def get_total_count(self) -> int:
+        try:
+            data = await self._post(f"{self.index}/_count", {"query": {"match_all": {}}}, "Count")
+            return data.get('count', 0)
+        except Exception as e:
+            self.logger.error("Count error: %s", e)
+            return 0
+
+    async def get_latest_record(self) -> Optional[Dict]:
+        query = {
+            "sort": [{"Creation_Date": {"order": "desc"}}],
+            "size": 1
+        }
+        try:
+            data = await self._post(f"{self.index}/_search", query, "Latest record")
+            hits = data.get('hits', {}).get('hits', [])
+            return hits[0].get('_source', {}) if hits else None
+        except Exception as e:
+            self.logger.error("Error getting latest record: %s", e)
+            return None
+
+    async def _msearch_template_batch(self, batch: List[Dict]) -> List[Dict]:
+        header = json.dumps({"index": self.index})
+        body = "".join(f"{header}\n{json.dumps(query)}\n" for query in batch)
+        try:
+            data = await self._request(
+                "POST", "_msearch/template", body, headers={'Content-Type': 'application/x-ndjson'})
+            responses = data.get('responses', [])
+        except Exception as e:
+            self.logger.error("Msearch template error: %s", e)
+            return [{"error": str(e), "hits": {"hits": []}} for _ in batch]
+        if len(responses) != len(batch):
+            error = f"Expected {len(batch)} responses, got {len(responses)}"
+            return [{"error": error, "hits": {"hits": []}} for _ in batch]
+        return responses
+
+    async def _gather(self, coroutines: List) -> List:
+        """
+        Runs coroutines concurrently and returns their results in order. If the caller is
+        cancelled, every outstanding request is cancelled with it.
+        """
+        tasks = [asyncio.ensure_future(c) for c in coroutines]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def search_template_many(self, queries: Iterable[Dict]) -> List[Dict]:
+        """
+        Runs one search template request per query, at most `concurrency` at a time.
+
+        Returns:
+            Responses in input order; failed items carry an 'error' key and an empty hit list
+        """
+        return await self._gather([self.search_template(query) for query in queries])
+
+    async def msearch_template(self, queries: Iterable[Dict], batch_size: int = 100) -> List[Dict]:
+        """
+        Batch search: sends the queries as _msearch/template requests of batch_size, with
+        batches running concurrently under the same semaphore.
+
+        Returns:
+            Responses in input order; failed items carry an 'error' key and an empty hit list
+        """
+        queries = list(queries)
+        batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+        results = await self._gather([self._msearch_template_batch(batch) for batch in batches])
+        return [response for batch in results for response in batch]
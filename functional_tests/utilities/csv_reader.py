@@ -1,16 +1,234 @@
 import csv
-from typing import Dict, Optional, List
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+from datetime import datetime
+from typing import Dict, Optional, List, Iterator, Tuple
+
+CREATION_DATE_FORMATS = ('%m/%d/%y', '%m/%d/%Y', '%Y-%m-%d')
+
+
+def parse_creation_date(value: str) -> Optional[datetime]:
+    """
+    Parses the extract's M/D/YY Creation_Date (and the ISO form used by OpenSearch).
+    Returns None for empty or unparseable values.
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+    for date_format in CREATION_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+# Bytes hashed from each end of the file to fingerprint it for the offset index
+FINGERPRINT_SAMPLE_BYTES = 64 * 1024
+OFFSET_INDEX_VERSION = 1
+
+
+class IndexedCSVFile:
+    def __init__(self, file_path: str, key_field: str = 'SAM Number', index_path: Optional[str] = None):
+        """
+        Random access to single records of a large CSV by key.
+
+        The file is memory-mapped and a sidecar index of record byte offsets per key is persisted
+        next to it, so after the first run a lookup is one index load plus one seek-and-parse.
+        Record boundaries follow quote balance, so quoted multiline fields are handled.
+
+        The index is rebuilt when the file's size, mtime or fingerprint (SHA-256 of the first
+        and last 64 KiB) no longer match the values stored with it.
+
+        Args:
+            file_path: Path to the CSV file
+            key_field: Column used as the lookup key
+            index_path: Sidecar index location, defaults to <file>.<key>.idx.json
+        """
+        self.file_path = file_path
+        self.key_field = key_field
+        slug = re.sub(r'[^a-z0-9]+', '_', key_field.lower()).strip('_')
+        self.index_path = index_path or f"{file_path}.{slug}.idx.json"
+        self._file = open(file_path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.header: List[str] = []
+        self.offsets: Dict[str, List[List[int]]] = {}
+        self._load_or_build_index()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.offsets
+
+    def _fingerprint(self) -> Dict:
+        stat = os.stat(self.file_path)
+        digest = hashlib.sha256()
+        if self._mmap is not None:
+            digest.update(self._mmap[:FINGERPRINT_SAMPLE_BYTES])
+            digest.update(self._mmap[-FINGERPRINT_SAMPLE_BYTES:])
+        return {
+            'version': OFFSET_INDEX_VERSION,
+            'key_field': self.key_field,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sample_sha256': digest.hexdigest()
+        }
+
+    def _load_or_build_index(self):
+        fingerprint = self._fingerprint()
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('fingerprint') == fingerprint:
+                self.header = stored['header']
+                self.offsets = stored['offsets']
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        self._build_index()
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint, 'header': self.header, 'offsets': self.offsets}, f)
+
+    def _iter_record_spans(self) -> Iterator[Tuple[int, int]]:
+        """
+        Yields (start, end) byte spans of each CSV record, header included. A newline ends a
+        record only when the quotes seen since the record started are balanced.
+        """
+        data = self._mmap
+        if data is None:
+            return
+        size = len(data)
+        start = position = 0
+        quotes = 0
+        while position < size:
+            end = data.find(b'\n', position)
+            end = size if end < 0 else end + 1
+            quotes += data[position:end].count(b'"')
+            position = end
+            if quotes % 2 == 0:
+                yield start, end
+                start = end
+                quotes = 0
+        if start < size:
+            yield start, size
+
+    def _parse(self, start: int, end: int) -> List[str]:
+        text = self._mmap[start:end].decode('utf-8')
+        return next(csv.reader(io.StringIO(text, newline='')), [])
+
+    def _build_index(self):
+        spans = self._iter_record_spans()
+        first = next(spans, None)
+        self.header = self._parse(*first) if first else []
+        if first and self.header and self.header[0].startswith('\ufeff'):
+            self.header[0] = self.header[0][1:]
+        self.offsets = {}
+        if self.key_field not in self.header:
+            raise ValueError(f"Key field '{self.key_field}' not found in {self.file_path}")
+        key_position = self.header.index(self.key_field)
+        for start, end in spans:
+            row = self._parse(start, end)
+            if not row or row == ['']:
+                continue
+            key = row[key_position] if key_position < len(row) else ''
+            self.offsets.setdefault(key, []).append([start, end])
+
+    def _record_at(self, span: List[int]) -> Dict:
+        row = self._parse(*span)
+        row += [''] * (len(self.header) - len(row))
+        return dict(zip(self.header, row))
+
+    def get(self, key: str) -> Optional[Dict]:
+        spans = self.offsets.get(key)
+        return self._record_at(spans[0]) if spans else None
+
+    def get_all(self, key: str) -> List[Dict]:
+        return [self._record_at(span) for span in self.offsets.get(key, [])]
+
+    def keys(self) -> List[str]:
+        return list(self.offsets)
+
 
 class CSVReader:
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, preload: bool = True, index_fields: Tuple[str, ...] = (),
+                 key_field: Optional[str] = None):
+        """
+        Reads the exclusion extract.
+
+        Rows are kept as tuples against one shared header instead of a dict per row, and lookups
+        go through hash indexes that are built the first time a field is queried. With
+        preload=False nothing is held in memory and iter_records() streams from the file.
+
+        With preload=False and a key_field, lookups on that field go through an IndexedCSVFile
+        (memory-mapped file plus persisted offset index) instead of scanning the file.
+
+        Args:
+            file_path: Path to the CSV file
+            preload: Load all rows into memory for indexed lookups
+            index_fields: Fields to index eagerly at load time
+            key_field: Field served from the persisted offset index when not preloading
+        """
         self.file_path = file_path
-        self.data = []
-        self._load_data()
+        self.preload = preload
+        self.header: List[str] = []
+        self.rows: List[tuple] = []
+        self._positions: Dict[str, int] = {}
+        self._indexes: Dict[str, Dict[str, List[int]]] = {}
+        self._latest_position: Optional[int] = None
+        self.offset_index: Optional[IndexedCSVFile] = None
+        if key_field and not preload:
+            self.offset_index = IndexedCSVFile(file_path, key_field)
+        if preload:
+            self._load_data()
+            for field in index_fields:
+                self._get_index(field)
 
     def _load_data(self):
-        with open(self.file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            self.data = list(reader)
+        with open(self.file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            self._set_header(next(reader, []))
+            width = len(self.header)
+            # Pad short rows so every tuple lines up with the header
+            self.rows = [tuple(row) if len(row) == width else tuple((row + [''] * width)[:width])
+                         for row in reader]
+
+    def _set_header(self, header: List[str]):
+        self.header = header
+        self._positions = {name: i for i, name in enumerate(header)}
+
+    def _to_dict(self, row: tuple) -> Dict:
+        return dict(zip(self.header, row))
+
+    def _get_index(self, field: str) -> Dict[str, List[int]]:
+        """
+        Returns the value -> row positions index for a field, building it on first use.
+        """
+        index = self._indexes.get(field)
+        if index is None:
+            index = {}
+            position = self._positions.get(field)
+            if position is not None:
+                for i, row in enumerate(self.rows):
+                    index.setdefault(row[position], []).append(i)
+            self._indexes[field] = index
+        return index
 
     def is_accessible(self) -> bool:
         try:
@@ -19,25 +237,65 @@ class CSVReader:
         except:
             return False
 
+    def iter_records(self) -> Iterator[Dict]:
+        """
+        Yields records one at a time. Without preload the file is streamed, so memory does not
+        grow with the size of the extract.
+        """
+        if self.preload:
+            for row in self.rows:
+                yield self._to_dict(row)
+            return
+        with open(self.file_path, 'r', encoding='utf-8', newline='') as f:
+            yield from csv.DictReader(f)
+
     def get_record_by_classification(self, classification: str) -> Optional[Dict]:
-        for record in self.data:
-            if record['Classification'] == classification:
-                return record
-        return None
+        return self.get_record_by_field('Classification', classification)
 
     def get_record_by_field(self, field: str, value: str) -> Optional[Dict]:
-        for record in self.data:
-            if record.get(field) == value:
-                return record
-        return None
+        if self.offset_index is not None and field == self.offset_index.key_field:
+            return self.offset_index.get(value)
+        if not self.preload:
+            return next((r for r in self.iter_records() if r.get(field) == value), None)
+        positions = self._get_index(field).get(value)
+        return self._to_dict(self.rows[positions[0]]) if positions else None
+
+    def get_records_by_field(self, field: str, value: str) -> List[Dict]:
+        if self.offset_index is not None and field == self.offset_index.key_field:
+            return self.offset_index.get_all(value)
+        if not self.preload:
+            return [r for r in self.iter_records() if r.get(field) == value]
+        return [self._to_dict(self.rows[i]) for i in self._get_index(field).get(value, [])]
 
     def get_all_records(self) -> List[Dict]:
-        return self.data
+        return list(self.iter_records())
 
     def get_record_count(self) -> int:
-        return len(self.data)
+        if not self.preload:
+            return sum(1 for _ in self.iter_records())
+        return len(self.rows)
 
     def get_latest_record(self) -> Optional[Dict]:
-        if not self.data:
+        """
+        Returns the record with the most recent Creation_Date, comparing parsed dates rather than
+        M/D/YY strings. The position is computed once and cached.
+        """
+        if not self.preload:
+            latest, latest_date = None, None
+            for record in self.iter_records():
+                parsed = parse_creation_date(record.get('Creation_Date'))
+                if latest is None or (parsed is not None and (latest_date is None or parsed > latest_date)):
+                    latest, latest_date = record, parsed
+            return latest
+        if not self.rows:
             return None
-        return max(self.data, key=lambda x: x.get('Creation_Date', ''))
\ No newline at end of file
+        if self._latest_position is None:
+            self._latest_position = 0
+            position = self._positions.get('Creation_Date')
+            latest_date = None
+            if position is not None:
+                for i, row in enumerate(self.rows):
+                    parsed = parse_creation_date(row[position])
+                    if parsed is not None and (latest_date is None or parsed > latest_date):
+                        self._latest_position, latest_date = i, parsed
+        return self._to_dict(self.rows[self._latest_position])
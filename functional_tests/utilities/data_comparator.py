@@ -1,18 +1,40 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Union, List, Optional
 from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz as rapid_fuzz, utils as rapid_utils
+from rapidfuzz.process import cpdist
 from datetime import datetime
+import pandas as pd
 import re
+from utilities.date_normalizer import DateNormalizer
+from utilities.name_keys import name_keys
+
+MISMATCH_COLUMNS = ['key', 'field', 'comparison_type', 'csv_value', 'opensearch_value']
+RESOLUTION_COLUMNS = ['csv_position', 'key', 'opensearch_position', 'opensearch_key', 'confidence', 'blocks']
+
+# Identifier fields used both as blocking keys and as match evidence, with their score weights
+IDENTIFIER_WEIGHTS = {
+    'SAM Number': 0.4,
+    'CAGE': 0.2,
+    'Unique Entity ID': 0.2
+}
+NAME_WEIGHT = 0.3
+ATTRIBUTE_WEIGHT = 0.1
+# Characters of the sorted name key used as the name prefix block
+NAME_PREFIX_LENGTH = 4
 
 
 class DataComparator:
-    def __init__(self, fuzzy_threshold: int = 85):
+    def __init__(self, fuzzy_threshold: int = 85, date_normalizer: Optional[DateNormalizer] = None):
         """
         Initialize the DataComparator with configurable settings.
 
         Args:
             fuzzy_threshold (int): Minimum score for fuzzy text matching (0-100)
+            date_normalizer: Shared date parser, so its cache and learned formats carry over
+                between comparators
         """
         self.fuzzy_threshold = fuzzy_threshold
+        self.date_normalizer = date_normalizer or DateNormalizer()
         self.date_fields = ['Creation_Date', 'Active Date', 'Termination Date']
         self.exact_match_fields = [
             'Classification',
@@ -61,7 +83,7 @@ class DataComparator:
 
         # Compare date fields
         for field in self.date_fields:
-            if not self.compare_dates(csv_record.get(field), opensearch_record.get(field)):
+            if not self.compare_dates(csv_record.get(field), opensearch_record.get(field), field):
                 print(f"Date comparison failed for field {field}")
                 print(f"CSV value: {csv_record.get(field)}")
                 print(f"OpenSearch value: {opensearch_record.get(field)}")
@@ -126,13 +148,17 @@ class DataComparator:
 
         return max_score >= self.fuzzy_threshold
 
-    def compare_dates(self, csv_date: str, opensearch_date: str) -> bool:
+    def compare_dates(self, csv_date: str, opensearch_date: str, field: Optional[str] = None) -> bool:
         """
         Compare dates accounting for different formats.
 
+        Sentinel values such as "Indefinite" match the same sentinel on the other side instead
+        of failing to parse. Empty values do not parse, so they never match.
+
         Args:
             csv_date: Date string from CSV
             opensearch_date: Date string from OpenSearch
+            field: Date field being compared, so its format is tried first
 
         Returns:
             bool: True if dates match
@@ -142,18 +168,7 @@ class DataComparator:
         if csv_date is None or opensearch_date is None:
             return False
 
-        try:
-            # Clean date strings
-            csv_date = self._clean_date(csv_date)
-            opensearch_date = self._clean_date(opensearch_date)
-
-            # Parse dates
-            csv_dt = self._parse_date(csv_date)
-            opensearch_dt = self._parse_date(opensearch_date)
-
-            return csv_dt == opensearch_dt
-        except ValueError:
-            return False
+        return self.date_normalizer.equal(csv_date, opensearch_date, field)
 
     def _clean_date(self, date_str: str) -> str:
         """
@@ -176,21 +191,10 @@ class DataComparator:
         Raises:
             ValueError: If date string cannot be parsed
         """
-        date_formats = [
-            '%Y-%m-%d',
-            '%m/%d/%y',
-            '%m/%d/%Y',
-            '%Y-%m-%dT%H:%M:%S.%fZ',
-            '%Y-%m-%dT%H:%M:%SZ'
-        ]
-
-        for date_format in date_formats:
-            try:
-                return datetime.strptime(date_str, date_format)
-            except ValueError:
-                continue
-
-        raise ValueError(f"Unable to parse date string: {date_str}")
+        parsed = self.date_normalizer.normalize(date_str)
+        if not isinstance(parsed, datetime):
+            raise ValueError(f"Unable to parse date string: {date_str}")
+        return parsed
 
     def get_comparison_report(self, csv_record: Dict[str, Any], opensearch_record: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -238,7 +242,7 @@ class DataComparator:
 
         # Check date fields
         for field in self.date_fields:
-            matches = self.compare_dates(csv_record.get(field), opensearch_record.get(field))
+            matches = self.compare_dates(csv_record.get(field), opensearch_record.get(field), field)
             if matches:
                 report['date_matches'][field] = True
             else:
@@ -249,4 +253,300 @@ class DataComparator:
                     'comparison_type': 'date'
                 })
 
-        return report
\ No newline at end of file
+        return report
+
+    def compare_tables(
+            self,
+            csv_records: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+            opensearch_records: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+            key_field: str = 'SAM Number'
+    ) -> pd.DataFrame:
+        """
+        Compare two whole tables of records aligned on key_field, column by column.
+
+        Applies the same rules as compare_records, but each field is compared for all records at
+        once: exact fields with vectorized normalization and equality, fuzzy fields with
+        rapidfuzz scoring only the pairs that are not already equal, and date fields through the
+        DateNormalizer's bulk mode.
+
+        Args:
+            csv_records: Records from the CSV file, as a DataFrame or iterable of dicts
+            opensearch_records: Records from OpenSearch (_source), as a DataFrame or iterable of dicts
+            key_field: Field both sides are joined on
+
+        Returns:
+            DataFrame with one row per mismatch and columns key, field, comparison_type,
+            csv_value and opensearch_value. Records present on only one side are reported
+            with comparison_type 'missing_in_opensearch' or 'missing_in_csv'.
+        """
+        fields = self.exact_match_fields + self.fuzzy_match_fields + self.date_fields
+        csv_df = self._to_frame(csv_records, key_field, fields)
+        opensearch_df = self._to_frame(opensearch_records, key_field, fields)
+        merged = csv_df.merge(opensearch_df, on=key_field, how='outer',
+                              suffixes=('_csv', '_os'), indicator=True)
+
+        mismatches = []
+        for side, comparison_type in (('left_only', 'missing_in_opensearch'), ('right_only', 'missing_in_csv')):
+            missing = merged[merged['_merge'] == side]
+            if len(missing):
+                mismatches.append(pd.DataFrame({
+                    'key': missing[key_field],
+                    'field': key_field,
+                    'comparison_type': comparison_type,
+                    'csv_value': missing[key_field] if side == 'left_only' else None,
+                    'opensearch_value': missing[key_field] if side == 'right_only' else None
+                }))
+
+        both = merged[merged['_merge'] == 'both']
+        comparisons = [(f, 'exact', self._match_exact_columns) for f in self.exact_match_fields] + \
+                      [(f, 'fuzzy', self._match_fuzzy_columns) for f in self.fuzzy_match_fields] + \
+                      [(f, 'date', lambda c, o, f=f: self._match_date_columns(c, o, f)) for f in self.date_fields]
+        for field, comparison_type, matcher in comparisons:
+            csv_values, opensearch_values = both[f"{field}_csv"], both[f"{field}_os"]
+            failed = ~matcher(csv_values, opensearch_values)
+            if failed.any():
+                mismatches.append(pd.DataFrame({
+                    'key': both.loc[failed, key_field],
+                    'field': field,
+                    'comparison_type': comparison_type,
+                    'csv_value': csv_values[failed],
+                    'opensearch_value': opensearch_values[failed]
+                }))
+
+        if not mismatches:
+            return pd.DataFrame(columns=MISMATCH_COLUMNS)
+        return pd.concat(mismatches, ignore_index=True)[MISMATCH_COLUMNS]
+
+    def summarize_mismatches(self, mismatches: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+        """
+        Count mismatches per comparison type and field.
+
+        Returns:
+            Dict of comparison_type -> {field: count}
+        """
+        counts = mismatches.groupby(['comparison_type', 'field']).size()
+        summary: Dict[str, Dict[str, int]] = {}
+        for (comparison_type, field), count in counts.items():
+            summary.setdefault(comparison_type, {})[field] = int(count)
+        return summary
+
+    @staticmethod
+    def _to_frame(records, key_field: str, fields: List[str]) -> pd.DataFrame:
+        frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame.from_records(list(records))
+        if key_field not in frame.columns:
+            raise ValueError(f"Key field '{key_field}' is missing from the records")
+        columns = [key_field] + [f for f in dict.fromkeys(fields) if f != key_field]
+        # Fields absent from one side compare as missing values, like dict.get() in compare_records
+        return frame.reindex(columns=columns).drop_duplicates(subset=[key_field])
+
+    @staticmethod
+    def _normalize_columns(csv_values: pd.Series, opensearch_values: pd.Series):
+        csv_missing, opensearch_missing = csv_values.isna(), opensearch_values.isna()
+        csv_norm = csv_values.astype(str).str.strip().str.lower()
+        opensearch_norm = opensearch_values.astype(str).str.strip().str.lower()
+        both_missing = csv_missing & opensearch_missing
+        both_present = ~csv_missing & ~opensearch_missing
+        return csv_norm, opensearch_norm, both_missing, both_present
+
+    def _match_exact_columns(self, csv_values: pd.Series, opensearch_values: pd.Series) -> pd.Series:
+        csv_norm, opensearch_norm, both_missing, both_present = self._normalize_columns(csv_values, opensearch_values)
+        return both_missing | (both_present & (csv_norm == opensearch_norm))
+
+    def _match_fuzzy_columns(self, csv_values: pd.Series, opensearch_values: pd.Series) -> pd.Series:
+        csv_norm, opensearch_norm, both_missing, both_present = self._normalize_columns(csv_values, opensearch_values)
+        matches = both_missing | (both_present & (csv_norm == opensearch_norm))
+
+        # fuzzywuzzy rounds scores to integers, so a cutoff half a point lower gives the same
+        # decisions; score_cutoff lets rapidfuzz stop early on pairs that cannot reach it
+        cutoff = self.fuzzy_threshold - 0.5
+        pending = both_present & ~matches
+        if not pending.any():
+            return matches
+        csv_pending, opensearch_pending = csv_norm[pending].tolist(), opensearch_norm[pending].tolist()
+        scores = cpdist(csv_pending, opensearch_pending, scorer=rapid_fuzz.ratio,
+                        score_cutoff=cutoff, workers=-1)
+        passed = scores >= cutoff
+
+        # token_sort_ratio only for the pairs plain ratio rejected
+        retry = ~passed
+        if retry.any():
+            csv_retry = [v for v, r in zip(csv_pending, retry) if r]
+            opensearch_retry = [v for v, r in zip(opensearch_pending, retry) if r]
+            token_scores = cpdist(csv_retry, opensearch_retry, scorer=rapid_fuzz.token_sort_ratio,
+                                  processor=rapid_utils.default_process, score_cutoff=cutoff, workers=-1)
+            passed[retry] = token_scores >= cutoff
+
+        matches[pending] = passed
+        return matches
+
+    def _match_date_columns(self, csv_values: pd.Series, opensearch_values: pd.Series,
+                            field: Optional[str] = None) -> pd.Series:
+        csv_missing, opensearch_missing = csv_values.isna(), opensearch_values.isna()
+        csv_dates = self.date_normalizer.normalize_column(csv_values, field)
+        opensearch_dates = self.date_normalizer.normalize_column(opensearch_values, field)
+        parsed = csv_dates.notna() & opensearch_dates.notna()
+        return (csv_missing & opensearch_missing) | (parsed & (csv_dates == opensearch_dates))
+
+    @staticmethod
+    def record_name(record: Dict[str, Any]) -> str:
+        """
+        Name of the excluded party: Name for firms, otherwise First/Middle/Last.
+        """
+        name = record.get('Name') or ''
+        if not str(name).strip():
+            name = ' '.join(str(record.get(f) or '') for f in ('First', 'Middle', 'Last'))
+        return str(name)
+
+    def _blocking_keys(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cheap keys a candidate must share with a record to be scored against it.
+        """
+        keys = name_keys(self.record_name(record))
+        blocks = {}
+        for field in IDENTIFIER_WEIGHTS:
+            value = str(record.get(field) or '').strip().upper()
+            if value:
+                blocks[field] = value
+        if keys['name_key']:
+            blocks['name_prefix'] = keys['name_key'][:NAME_PREFIX_LENGTH]
+            blocks['phonetic'] = keys['phonetic_key']
+        return {'blocks': blocks, 'name_norm': keys['name_norm']}
+
+    def match_confidence(self, csv_record: Dict[str, Any], opensearch_record: Dict[str, Any],
+                         csv_name: Optional[str] = None, opensearch_name: Optional[str] = None) -> float:
+        """
+        Confidence (0-1) that two records describe the same excluded party.
+
+        A weighted average over the evidence both records carry: identifier equality
+        (SAM Number, CAGE, UEI), name similarity and agreement of the exact match fields.
+
+        Args:
+            csv_record: Record from CSV file
+            opensearch_record: Record from OpenSearch
+            csv_name: Precomputed normalized name of csv_record
+            opensearch_name: Precomputed normalized name of opensearch_record
+
+        Returns:
+            float: Confidence between 0 and 1
+        """
+        score, weight = 0.0, 0.0
+        for field, field_weight in IDENTIFIER_WEIGHTS.items():
+            csv_value = str(csv_record.get(field) or '').strip().upper()
+            opensearch_value = str(opensearch_record.get(field) or '').strip().upper()
+            if csv_value and opensearch_value:
+                weight += field_weight
+                score += field_weight * (csv_value == opensearch_value)
+
+        if csv_name is None:
+            csv_name = name_keys(self.record_name(csv_record))['name_norm']
+        if opensearch_name is None:
+            opensearch_name = name_keys(self.record_name(opensearch_record))['name_norm']
+        if csv_name and opensearch_name:
+            weight += NAME_WEIGHT
+            score += NAME_WEIGHT * rapid_fuzz.token_sort_ratio(csv_name, opensearch_name) / 100
+
+        agreeing = sum(self.compare_field_exact(csv_record.get(f), opensearch_record.get(f))
+                       for f in self.exact_match_fields)
+        weight += ATTRIBUTE_WEIGHT
+        score += ATTRIBUTE_WEIGHT * agreeing / len(self.exact_match_fields)
+        return score / weight
+
+    def best_match(self, csv_record: Dict[str, Any], candidates: List[Dict[str, Any]],
+                   min_confidence: float = 0.0):
+        """
+        Pick the candidate (e.g. the _source of each search hit) that best matches a CSV record.
+
+        Args:
+            csv_record: Record from CSV file
+            candidates: Records to choose from
+            min_confidence: Confidence the best candidate must reach to be returned
+
+        Returns:
+            Tuple of (candidate position, confidence). The position is None without candidates
+            or when the best confidence is below min_confidence.
+        """
+        csv_name = name_keys(self.record_name(csv_record))['name_norm']
+        best, best_confidence = None, 0.0
+        for position, candidate in enumerate(candidates):
+            confidence = self.match_confidence(csv_record, candidate, csv_name)
+            if best is None or confidence > best_confidence:
+                best, best_confidence = position, confidence
+        if best_confidence < min_confidence:
+            best = None
+        return best, best_confidence
+
+    def resolve_entities(
+            self,
+            csv_records: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+            opensearch_records: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+            key_field: str = 'SAM Number',
+            min_confidence: float = 0.5,
+            max_block_size: int = 100
+    ) -> pd.DataFrame:
+        """
+        Entity resolution: find the OpenSearch record that best matches each CSV record.
+
+        OpenSearch records are indexed by blocking keys (SAM Number, CAGE, UEI, sorted name
+        key prefix and phonetic key), and each CSV record is scored only against records that
+        share at least one key with it, so the work grows with the number of records rather
+        than with their product. Blocks larger than max_block_size are too unselective to help
+        and are skipped.
+
+        Args:
+            csv_records: Records from the CSV file, as a DataFrame or iterable of dicts
+            opensearch_records: Records from OpenSearch (_source), as a DataFrame or iterable of dicts
+            key_field: Field reported as the key of each side
+            min_confidence: Matches below this confidence are reported without an OpenSearch record
+            max_block_size: Largest block that is still used for candidate generation
+
+        Returns:
+            DataFrame with one row per CSV record and columns csv_position, key,
+            opensearch_position, opensearch_key, confidence and blocks (the blocking keys the
+            pair shared)
+        """
+        csv_records = self._to_records(csv_records)
+        opensearch_records = self._to_records(opensearch_records)
+
+        opensearch_keys = [self._blocking_keys(r) for r in opensearch_records]
+        index: Dict[tuple, List[int]] = {}
+        for position, keys in enumerate(opensearch_keys):
+            for block in keys['blocks'].items():
+                index.setdefault(block, []).append(position)
+
+        rows = []
+        for csv_position, csv_record in enumerate(csv_records):
+            csv_keys = self._blocking_keys(csv_record)
+            shared: Dict[int, List[str]] = {}
+            for block in csv_keys['blocks'].items():
+                members = index.get(block, [])
+                if len(members) > max_block_size:
+                    continue
+                for position in members:
+                    shared.setdefault(position, []).append(block[0])
+
+            best, best_confidence = None, 0.0
+            for position in shared:
+                confidence = self.match_confidence(csv_record, opensearch_records[position],
+                                                   csv_keys['name_norm'], opensearch_keys[position]['name_norm'])
+                if best is None or confidence > best_confidence:
+                    best, best_confidence = position, confidence
+            if best is not None and best_confidence < min_confidence:
+                best = None
+
+            rows.append({
+                'csv_position': csv_position,
+                'key': csv_record.get(key_field),
+                'opensearch_position': best,
+                'opensearch_key': opensearch_records[best].get(key_field) if best is not None else None,
+                'confidence': round(best_confidence, 4),
+                'blocks': shared[best] if best is not None else []
+            })
+        resolved = pd.DataFrame(rows, columns=RESOLUTION_COLUMNS)
+        resolved['opensearch_position'] = resolved['opensearch_position'].astype('Int64')
+        return resolved
+
+    @staticmethod
+    def _to_records(records) -> List[Dict[str, Any]]:
+        if isinstance(records, pd.DataFrame):
+            return records.astype(object).where(records.notna(), None).to_dict('records')
+        return list(records)
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+import re
+
+import pandas as pd
+
+# Non-date values that appear in date columns and compare equal to themselves. Empty values
+# are not sentinels: a date missing on both sides is a mismatch, as it always has been.
+INDEFINITE = 'INDEFINITE'
+DEFAULT_SENTINELS = {
+    'indefinite': INDEFINITE
+}
+
+# Each format is paired with the shape of the strings it accepts. The shapes do not overlap,
+# so trying formats in a learned order gives the same result as the fixed order.
+DATE_FORMATS = [
+    ('%Y-%m-%d', r'\d{4}-\d{1,2}-\d{1,2}'),
+    ('%m/%d/%y', r'\d{1,2}/\d{1,2}/\d{1,2}'),
+    ('%m/%d/%Y', r'\d{1,2}/\d{1,2}/\d{3,4}'),
+    ('%Y-%m-%dT%H:%M:%S.%fZ', r'\d{4}-\d{1,2}-\d{1,2}T\d{1,2}:\d{1,2}:\d{1,2}\.\d+Z'),
+    ('%Y-%m-%dT%H:%M:%SZ', r'\d{4}-\d{1,2}-\d{1,2}T\d{1,2}:\d{1,2}:\d{1,2}Z')
+]
+
+NormalizedDate = Union[datetime, str, None]
+
+
+class DateNormalizer:
+    def __init__(self, cache_size: int = 10000, sentinels: Optional[Dict[str, str]] = None):
+        """
+        Normalizes date strings to datetimes, with sentinel values such as "Indefinite" kept as
+        first-class values instead of parse failures.
+
+        Results are memoized in a bounded LRU cache because the same strings repeat across
+        thousands of rows, and the format that parsed a column's last value is tried first.
+
+        Args:
+            cache_size: Maximum number of distinct strings kept in the memo cache
+            sentinels: Lower-cased value -> sentinel marker, defaults to DEFAULT_SENTINELS
+        """
+        self.cache_size = cache_size
+        self.sentinels = DEFAULT_SENTINELS if sentinels is None else sentinels
+        self._cache: "OrderedDict[str, NormalizedDate]" = OrderedDict()
+        self._formats = [(date_format, re.compile(shape)) for date_format, shape in DATE_FORMATS]
+        self._column_formats: Dict[str, List] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, value: Any, column: Optional[str] = None) -> NormalizedDate:
+        """
+        Normalize one value.
+
+        Args:
+            value: Date string (or None)
+            column: Column the value came from, used to learn that column's format
+
+        Returns:
+            datetime for dates, a sentinel marker string for sentinel values, or None for
+            missing or unparseable values
+        """
+        if value is None:
+            return None
+        key = str(value)
+        cached = self._cache.get(key, self)
+        if cached is not self:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return cached
+
+        self.misses += 1
+        result = self._parse(key, column)
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def _parse(self, value: str, column: Optional[str]) -> NormalizedDate:
+        cleaned = re.sub(r'\s+', ' ', value).strip()
+        sentinel = self.sentinels.get(cleaned.lower())
+        if sentinel is not None:
+            return sentinel
+
+        formats = self._column_formats.setdefault(column, list(self._formats)) if column else self._formats
+        for i, (date_format, shape) in enumerate(formats):
+            if not shape.fullmatch(cleaned):
+                continue
+            try:
+                parsed = datetime.strptime(cleaned, date_format)
+            except ValueError:
+                continue
+            if column and i:
+                # Move the winning format to the front for the next value of this column
+                formats.insert(0, formats.pop(i))
+            return parsed
+        return None
+
+    def normalize_column(self, values: Union[pd.Series, Iterable[Any]], column: Optional[str] = None):
+        """
+        Bulk mode: normalize a whole column, parsing each distinct value once.
+
+        Returns:
+            A Series aligned with the input when given a Series, otherwise a list
+        """
+        if isinstance(values, pd.Series):
+            distinct = {v: self.normalize(v, column) for v in values.dropna().unique()}
+            return values.map(distinct).astype(object).where(values.notna(), None)
+        return [self.normalize(v, column) for v in values]
+
+    def equal(self, a: Any, b: Any, column: Optional[str] = None) -> bool:
+        """
+        True when both values normalize to the same date or the same sentinel.
+        """
+        left, right = self.normalize(a, column), self.normalize(b, column)
+        return left is not None and left == right
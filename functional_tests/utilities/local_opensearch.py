@@ -0,0 +1,898 @@
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from fnmatch import fnmatch
+from functools import cmp_to_key
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from rapidfuzz.distance import Levenshtein
+from utilities.csv_reader import CSVReader
+from utilities.data_comparator import DataComparator
+from utilities.date_normalizer import DateNormalizer
+from utilities.local_screening import auto_fuzziness
+from utilities.name_keys import alias_keys, name_keys
+from utilities.snapshot_reader import SNAPSHOT_FIELDS, iter_snapshot_documents
+
+# {{param}}, {{{param}}} and {{#toJson}}param{{/toJson}} are the mustache forms the templates use
+MUSTACHE_TO_JSON = re.compile(r'\{\{#toJson\}\}(\w+)\{\{/toJson\}\}')
+MUSTACHE_VARIABLE = re.compile(r'\{\{\{?(\w+)\}?\}\}')
+
+
+def render_template(source: str, params: Dict[str, Any]) -> Dict:
+    """
+    Renders a stored mustache search template the way OpenSearch does for these templates:
+    values are JSON-escaped into the surrounding string, missing params render empty.
+    """
+    def to_json(match):
+        return json.dumps(params.get(match.group(1)))
+
+    def variable(match):
+        value = params.get(match.group(1))
+        if value is None:
+            return ''
+        return json.dumps(value if isinstance(value, str) else json.dumps(value))[1:-1]
+
+    return json.loads(MUSTACHE_VARIABLE.sub(variable, MUSTACHE_TO_JSON.sub(to_json, source)))
+
+
+def to_index_document(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Mirrors the Glue job's cleaning for one extract row: quotes removed and values trimmed,
+    id taken from SAM Number, and the name and alias key fields added.
+    """
+    doc = {SNAPSHOT_FIELDS.get(k, k): (v.replace('"', '').strip() if isinstance(v, str) else v)
+           for k, v in record.items()}
+    doc['id'] = doc.get('SAM Number') or ''
+    keys = name_keys(DataComparator.record_name(doc))
+    doc.update({k: keys[k] for k in ('name_norm', 'name_tokens', 'name_key', 'name_phonetic')})
+    if 'Cross-Reference' in doc:
+        doc.update(alias_keys(doc['Cross-Reference'] or ''))
+    return doc
+
+
+def analyze(value: Any) -> List[str]:
+    """
+    Standard analyzer stand-in: lower case, split on anything that is not a letter or digit.
+    """
+    values = value if isinstance(value, list) else [value]
+    return [t for v in values if v is not None for t in re.split(r'[^0-9a-z]+', str(v).lower()) if t]
+
+
+def _field(name: str) -> str:
+    # Keyword sub-fields hold the same value, compared without analysis
+    return name[:-len('.keyword')] if name.endswith('.keyword') else name
+
+
+def _int(value: Any, default: int) -> int:
+    # Rendered templates pass from/size as strings, empty when the param was not given
+    return default if value in (None, '') else int(value)
+
+
+def _values(doc: Dict, field: str) -> List[Any]:
+    value = doc.get(_field(field))
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class LocalIndex:
+    def __init__(self, documents: Iterable[Dict[str, Any]] = ()):
+        """
+        In-memory index answering the subset of the query DSL used by the search templates:
+        match_all, match, multi_match (with fuzziness AUTO), term, terms, range and bool, with
+        sort, from/size, search_after, slices and terms aggregations. Scores are simple sums
+        of clause boosts, enough to order results but not Lucene-compatible.
+        """
+        self.documents: List[Dict[str, Any]] = []
+        self.settings: Dict[str, Any] = {'number_of_shards': '1', 'number_of_replicas': '0'}
+        self.mappings: Dict[str, Any] = {}
+        self.dates = DateNormalizer()
+        self._term_indexes: Dict[str, Dict[str, List[int]]] = {}
+        self._positions: Optional[Dict[str, int]] = None
+        self.add(documents)
+
+    def add(self, documents: Iterable[Dict[str, Any]]) -> int:
+        before = len(self.documents)
+        self.documents.extend(documents)
+        self._term_indexes = {}
+        self._positions = None
+        return len(self.documents) - before
+
+    def put(self, doc_id: str, doc: Dict[str, Any]) -> bool:
+        """
+        Indexes a document under doc_id, replacing the document with that id.
+
+        Returns:
+            True when the document was created, False when it replaced one
+        """
+        if self._positions is None:
+            self._positions = {str(d.get('id', '')): p for p, d in enumerate(self.documents)}
+        doc = dict(doc, id=doc.get('id', doc_id))
+        position = self._positions.get(doc_id)
+        if position is None:
+            self._positions[doc_id] = len(self.documents)
+            self.documents.append(doc)
+        else:
+            self.documents[position] = doc
+        self._term_indexes = {}
+        return position is None
+
+    def delete(self, doc_id: str) -> bool:
+        kept = [d for d in self.documents if str(d.get('id', '')) != doc_id]
+        deleted = len(kept) != len(self.documents)
+        self.documents = kept
+        self._term_indexes = {}
+        self._positions = None
+        return deleted
+
+    def _candidates(self, query: Dict) -> List[Dict[str, Any]]:
+        """
+        Documents a top-level term or terms query can match, looked up in a value index built
+        on first use of the field, so id lookups do not scan the whole index. Any other query
+        is evaluated against every document.
+        """
+        kind = next(iter(query), None)
+        if kind not in ('term', 'terms'):
+            return self.documents
+        (field, options), = ((k, v) for k, v in query[kind].items() if k != 'boost')
+        if kind == 'term':
+            values = [options.get('value') if isinstance(options, dict) else options]
+        else:
+            values = options
+        index = self._term_indexes.get(field)
+        if index is None:
+            index = {}
+            for position, doc in enumerate(self.documents):
+                for value in _values(doc, field):
+                    index.setdefault(str(value), []).append(position)
+            self._term_indexes[field] = index
+        positions = sorted({p for v in values for p in index.get(str(v), [])})
+        return [self.documents[p] for p in positions]
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'LocalIndex':
+        # The Glue job keeps one document per id
+        docs = {}
+        for record in CSVReader(path, preload=False).iter_records():
+            doc = to_index_document(record)
+            if doc['id']:
+                docs.setdefault(doc['id'], doc)
+        return cls(docs.values())
+
+    @classmethod
+    def from_parquet(cls, path: str, load_date: Optional[str] = None) -> 'LocalIndex':
+        # One load_date partition, the latest by default, read the way rebuild_index.py does
+        docs = (doc if 'name_key' in doc else to_index_document(doc)
+                for doc in iter_snapshot_documents(path, load_date))
+        return cls(docs)
+
+    # Query evaluation: each clause returns a score, or None when the document does not match
+
+    def _match_tokens(self, query_tokens: List[str], doc_tokens: List[str], fuzzy: bool, operator: str):
+        if not query_tokens:
+            return None
+        matched = 0
+        for query_token in query_tokens:
+            allowed = auto_fuzziness(query_token) if fuzzy else 0
+            if any(Levenshtein.distance(query_token, t, score_cutoff=allowed) <= allowed for t in doc_tokens):
+                matched += 1
+        if matched == 0 or (operator == 'and' and matched < len(query_tokens)):
+            return None
+        return matched / len(query_tokens)
+
+    def _score(self, doc: Dict, query: Dict) -> Optional[float]:
+        if not query:
+            return 1.0
+        (kind, spec), = query.items()
+        if kind == 'match_all':
+            return float(spec.get('boost', 1.0))
+        if kind == 'match':
+            (field, options), = spec.items()
+            options = options if isinstance(options, dict) else {'query': options}
+            score = self._match_tokens(analyze(options.get('query')), analyze(_values(doc, field)),
+                                       'fuzziness' in options, str(options.get('operator', 'or')).lower())
+            return None if score is None else score * float(options.get('boost', 1.0))
+        if kind == 'multi_match':
+            query_tokens = analyze(spec.get('query'))
+            operator = str(spec.get('operator', 'or')).lower()
+            best = None
+            for field in spec.get('fields', []):
+                field, _, boost = field.partition('^')
+                score = self._match_tokens(query_tokens, analyze(_values(doc, field)), 'fuzziness' in spec, operator)
+                if score is not None:
+                    score *= float(boost or 1.0)
+                    best = score if best is None else max(best, score)
+            return best
+        if kind in ('term', 'terms'):
+            spec = dict(spec)
+            boost = float(spec.pop('boost', 1.0))
+            (field, options), = spec.items()
+            if kind == 'term':
+                if isinstance(options, dict):
+                    boost = float(options.get('boost', 1.0))
+                    options = options.get('value')
+                wanted = {str(options)}
+            else:
+                wanted = {str(v) for v in options}
+            return boost if any(str(v) in wanted for v in _values(doc, field)) else None
+        if kind == 'range':
+            (field, options), = spec.items()
+            values = _values(doc, field)
+            return float(options.get('boost', 1.0)) if any(self._in_range(v, options) for v in values) else None
+        if kind == 'bool':
+            return self._score_bool(doc, spec)
+        raise ValueError(f"Unsupported query clause: {kind}")
+
+    def _score_bool(self, doc: Dict, spec: Dict) -> Optional[float]:
+        def clauses(name):
+            value = spec.get(name, [])
+            return value if isinstance(value, list) else [value]
+
+        score = 0.0
+        for clause in clauses('filter'):
+            if self._score(doc, clause) is None:
+                return None
+        for clause in clauses('must_not'):
+            if self._score(doc, clause) is not None:
+                return None
+        for clause in clauses('must'):
+            clause_score = self._score(doc, clause)
+            if clause_score is None:
+                return None
+            score += clause_score
+        should = clauses('should')
+        default_minimum = 0 if clauses('must') or clauses('filter') else min(1, len(should))
+        minimum = int(spec.get('minimum_should_match', default_minimum))
+        matched = 0
+        for clause in should:
+            clause_score = self._score(doc, clause)
+            if clause_score is not None:
+                matched += 1
+                score += clause_score
+        if matched < minimum:
+            return None
+        # Filter-only matches score 0, as in OpenSearch
+        return score * float(spec.get('boost', 1.0))
+
+    def _comparable(self, value: Any):
+        """
+        Sort and range key: dates compare as dates, numbers as numbers, anything else as text.
+        """
+        parsed = self.dates.normalize(value) if isinstance(value, str) else None
+        if isinstance(parsed, datetime):
+            return (0, parsed.timestamp())
+        try:
+            return (0, float(value))
+        except (TypeError, ValueError):
+            return (1, str(value))
+
+    def _in_range(self, value: Any, options: Dict) -> bool:
+        key = self._comparable(value)
+        checks = {'gte': lambda b: key >= b, 'gt': lambda b: key > b, 'lte': lambda b: key <= b, 'lt': lambda b: key < b}
+        return all(check(self._comparable(options[op])) for op, check in checks.items()
+                   if op in options and options[op] not in (None, ''))
+
+    @staticmethod
+    def _sort_fields(sort: List) -> List[Tuple[str, str]]:
+        fields = []
+        for entry in sort:
+            field, order = (entry, 'asc') if isinstance(entry, str) else next(iter(entry.items()))
+            fields.append((field, order.get('order', 'asc') if isinstance(order, dict) else order))
+        return fields
+
+    def _sort_key(self, doc: Dict, score: float, sort: List[Tuple[str, str]]) -> Tuple[list, list]:
+        keys, values = [], []
+        for field, order in sort:
+            if field == '_score':
+                value, key = score, (0, score)
+            else:
+                found = _values(doc, field)
+                value = found[0] if found else None
+                key = self._comparable(value) if value is not None else None
+            values.append(value)
+            keys.append((key, order))
+        return keys, values
+
+    @staticmethod
+    def _compare(left: list, right: list) -> int:
+        """
+        Compares two sort keys entry by entry; missing values sort last in either order.
+        """
+        for (a, order), (b, _) in zip(left, right):
+            if a == b:
+                continue
+            if a is None or b is None:
+                return 1 if a is None else -1
+            result = -1 if a < b else 1
+            return -result if order == 'desc' else result
+        return 0
+
+    def search(self, body: Dict) -> Dict:
+        started = time.perf_counter()
+        body = body or {}
+        query = body.get('query') or {'match_all': {}}
+        hits = []
+        sliced = body.get('slice')
+        for doc in self._candidates(query):
+            if sliced and zlib.crc32(str(doc.get('id')).encode()) % int(sliced['max']) != int(sliced['id']):
+                continue
+            score = self._score(doc, query)
+            if score is not None:
+                hits.append((doc, score))
+
+        sort = body.get('sort')
+        if sort:
+            sort = self._sort_fields(sort if isinstance(sort, list) else [sort])
+            keyed = [(doc, score, *self._sort_key(doc, score, sort)) for doc, score in hits]
+            keyed.sort(key=cmp_to_key(lambda a, b: self._compare(a[2], b[2])))
+            if body.get('search_after') is not None:
+                after = [(self._comparable(v) if v is not None else None, order)
+                         for v, (_, order) in zip(body['search_after'], sort)]
+                keyed = [k for k in keyed if self._compare(k[2], after) > 0]
+        else:
+            keyed = [(doc, score, None, None) for doc, score in sorted(hits, key=lambda h: -h[1])]
+
+        start, size = _int(body.get('from'), 0), _int(body.get('size'), 10)
+        source = body.get('_source', True)
+        page = []
+        for doc, score, _, sort_values in keyed[start:start + size]:
+            if isinstance(source, list):
+                doc = {k: v for k, v in doc.items() if k in source}
+            hit = {'_index': 'local', '_id': str(doc.get('id', '')), '_score': None if sort else score,
+                   '_source': doc if source is not False else {}}
+            if sort:
+                hit['sort'] = sort_values
+            page.append(hit)
+
+        response = {
+            'took': int((time.perf_counter() - started) * 1000),
+            'timed_out': False,
+            'hits': {
+                'total': {'value': len(keyed), 'relation': 'eq'},
+                'max_score': max((h[1] for h in hits), default=None) if not sort else None,
+                'hits': page
+            }
+        }
+        aggs = body.get('aggs') or body.get('aggregations')
+        if aggs:
+            aggs_started = time.perf_counter_ns()
+            response['aggregations'] = self._aggregate([k[0] for k in keyed], aggs)
+            aggs_time = time.perf_counter_ns() - aggs_started
+        if body.get('profile'):
+            candidates = self._candidates(query)
+            response['profile'] = {'shards': [{
+                'id': '[local][local][0]',
+                'searches': [{'query': [self._profile(candidates, query)], 'rewrite_time': 0, 'collector': []}],
+                'aggregations': [{'type': 'TermsAggregator', 'description': name, 'time_in_nanos': aggs_time,
+                                  'children': []} for name in aggs] if aggs else []
+            }]}
+        return response
+
+    def _profile(self, docs: List[Dict], query: Dict) -> Dict:
+        """
+        Profile tree in the shape of the profile API: each clause is timed by evaluating it
+        alone over the candidate documents, and bool clauses list their sub-clauses.
+        """
+        (kind, spec), = query.items()
+        started = time.perf_counter_ns()
+        for doc in docs:
+            self._score(doc, query)
+        node = {'type': kind, 'description': json.dumps(spec)[:200],
+                'time_in_nanos': time.perf_counter_ns() - started, 'children': []}
+        if kind == 'bool':
+            for occur in ('must', 'filter', 'should', 'must_not'):
+                clauses = spec.get(occur, [])
+                for clause in clauses if isinstance(clauses, list) else [clauses]:
+                    node['children'].append(self._profile(docs, clause))
+        return node
+
+    def _aggregate(self, docs: List[Dict], aggs: Dict) -> Dict:
+        results = {}
+        for name, spec in aggs.items():
+            terms = spec.get('terms')
+            if not terms:
+                raise ValueError(f"Unsupported aggregation: {name}")
+            groups: Dict[str, List[Dict]] = {}
+            for doc in docs:
+                for value in _values(doc, terms['field']):
+                    groups.setdefault(str(value), []).append(doc)
+            ordered = sorted(groups.items(), key=lambda g: (-len(g[1]), g[0]))
+            buckets = []
+            for key, members in ordered[:int(terms.get('size', 10))]:
+                bucket = {'key': key, 'doc_count': len(members)}
+                if spec.get('aggs'):
+                    bucket.update(self._aggregate(members, spec['aggs']))
+                buckets.append(bucket)
+            results[name] = {'buckets': buckets}
+        return results
+
+    def mapping(self) -> Dict:
+        """
+        The explicit mappings plus a dynamic text field, with a keyword sub-field, for every
+        other document key, as OpenSearch maps unseen fields on first write.
+        """
+        properties = dict(self.mappings.get('properties', {}))
+        for doc in self.documents:
+            for key in doc:
+                if key not in properties:
+                    properties[key] = {'type': 'text', 'fields': {'keyword': {'type': 'keyword', 'ignore_above': 256}}}
+        return {**self.mappings, 'properties': properties}
+
+    def count(self, body: Optional[Dict]) -> Dict:
+        query = (body or {}).get('query') or {'match_all': {}}
+        count = sum(1 for doc in self.documents if self._score(doc, query) is not None)
+        return {'count': count}
+
+
+class LocalOpenSearchServer:
+    def __init__(
+            self,
+            index: LocalIndex,
+            index_name: str = '*',
+            host: str = '127.0.0.1',
+            port: int = 0,
+            latency_ms: Tuple[float, float] = (0, 0),
+            error_rate: float = 0.0,
+            error_status: int = 503,
+            seed: Optional[int] = None,
+            logger: Optional[logging.Logger] = None
+    ):
+        """
+        Local stand-in for the OpenSearch domain, for offline functional tests and load tests.
+
+        Serves the endpoints OpenSearchClient and AsyncOpenSearchClient use: _cluster/health,
+        _search, _search/template, _msearch, _msearch/template, _count and point in time, plus
+        _scripts and _render/template so OpenSearchTemplateManager can load templates into it.
+        Index creation, _settings (including index.blocks.write), _bulk, _reindex, _refresh,
+        _forcemerge and _aliases are served too, so OpenSearchIndexBuilder can migrate to the
+        alias, build a versioned index and swap the alias onto it.
+        Each request can be delayed by a random latency and failed with error_status at
+        error_rate, to exercise client concurrency and retries.
+
+        Args:
+            index: Documents to serve
+            index_name: Name of the served index, '*' to serve it under any name that is not
+                a created index or an alias
+            host: Interface to bind
+            port: Port to bind, 0 for a free port
+            latency_ms: (min, max) latency added to each request, in milliseconds
+            error_rate: Share of requests failed with error_status
+            error_status: Status returned for injected errors, e.g. 429 or 503
+            seed: Seed for the injected latency and errors
+        """
+        self.index = index
+        self.index_name = index_name
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.logger = logger or logging.getLogger(__name__)
+        self.indices: Dict[str, LocalIndex] = {} if index_name == '*' else {index_name: index}
+        self.aliases: Dict[str, Dict[str, Dict]] = {}
+        self.scripts: Dict[str, Dict] = {}
+        self.point_in_times: Dict[str, float] = {}
+        self.request_count = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> 'LocalOpenSearchServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.logger.info("Local OpenSearch listening on http://%s (%d documents)",
+                         self.address, len(self.index.documents))
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def load_templates_file(self, path: str) -> int:
+        """
+        Stores the templates of a {"templates": {id: {"template": ...}}} file, as
+        OpenSearchTemplateManager.deploy_templates would.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            templates = json.load(f)['templates']
+        for template_id, info in templates.items():
+            self.scripts[template_id] = {'lang': 'mustache', 'source': json.dumps(info['template'])}
+        return len(templates)
+
+    # Request routing
+
+    def _injected_fault(self) -> Optional[int]:
+        with self._lock:
+            self.request_count += 1
+            delay = self._rng.uniform(*self.latency_ms) / 1000
+            failed = self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return self.error_status if failed else None
+
+    def _render(self, body: Dict) -> Dict:
+        if 'source' in body:
+            source = body['source'] if isinstance(body['source'], str) else json.dumps(body['source'])
+        else:
+            script = self.scripts.get(body.get('id'))
+            if script is None:
+                raise KeyError(f"unable to find script [{body.get('id')}]")
+            source = script['source']
+        return render_template(source, body.get('params') or {})
+
+    def _resolve(self, name: Optional[str]) -> Optional[LocalIndex]:
+        if name is None:
+            return self.index
+        if name in self.indices:
+            return self.indices[name]
+        if name in self.aliases:
+            return self.indices[next(iter(self.aliases[name]))]
+        return self.index if self.index_name == '*' else None
+
+    def _expand(self, pattern: str) -> List[str]:
+        # Comma-separated names and wildcards; aliases expand to their indices
+        names = []
+        for part in pattern.split(','):
+            for name in self.indices:
+                if fnmatch(name, part):
+                    names.append(name)
+            for alias, targets in self.aliases.items():
+                if fnmatch(alias, part):
+                    names.extend(targets)
+        return list(dict.fromkeys(names))
+
+    @staticmethod
+    def _flat_settings(settings: Dict) -> Dict:
+        # {"index": {"refresh_interval": "-1"}}, {"index.refresh_interval": "-1"} and
+        # {"refresh_interval": "-1"} all mean the same setting
+        flat = {}
+        for key, value in (settings or {}).items():
+            if key == 'index' and isinstance(value, dict):
+                flat.update(LocalOpenSearchServer._flat_settings(value))
+            else:
+                flat[key[len('index.'):] if key.startswith('index.') else key] = value
+        return flat
+
+    def _index_metadata(self, name: str) -> Dict:
+        index = self.indices[name]
+        aliases = {alias: options for alias, targets in self.aliases.items()
+                   for target, options in targets.items() if target == name}
+        return {'aliases': aliases, 'mappings': index.mapping(), 'settings': {'index': dict(index.settings)}}
+
+    def _create_index(self, name: str, body: Optional[Dict]) -> Tuple[int, Dict]:
+        if name in self.indices or name in self.aliases:
+            return 400, {'error': {'type': 'resource_already_exists_exception',
+                                   'reason': f"index [{name}] already exists"}, 'status': 400}
+        index = LocalIndex()
+        index.settings.update(self._flat_settings((body or {}).get('settings')))
+        index.mappings = (body or {}).get('mappings') or {}
+        self.indices[name] = index
+        for alias, options in ((body or {}).get('aliases') or {}).items():
+            self.aliases.setdefault(alias, {})[name] = options
+        return 200, {'acknowledged': True, 'shards_acknowledged': True, 'index': name}
+
+    def _delete_index(self, name: str):
+        del self.indices[name]
+        for alias in list(self.aliases):
+            self.aliases[alias].pop(name, None)
+            if not self.aliases[alias]:
+                del self.aliases[alias]
+
+    def _update_aliases(self, actions: List[Dict]) -> Tuple[int, Dict]:
+        """
+        Applies add, remove and remove_index actions together, after all of them validated,
+        so readers never see the alias on neither or both indices.
+        """
+        planned = []
+        for action in actions:
+            (kind, spec), = action.items()
+            names = self._expand(','.join(spec.get('indices') or [spec['index']]))
+            if not names:
+                return 404, {'error': {'type': 'index_not_found_exception',
+                                       'reason': f"no such index [{spec.get('index')}]"}, 'status': 404}
+            aliases = spec.get('aliases') or [spec.get('alias')]
+            present = [a for a in self.aliases
+                       if any(fnmatch(a, p) for p in aliases) and set(names) & set(self.aliases[a])]
+            if kind == 'remove' and not present:
+                return 404, {'error': {'type': 'aliases_not_found_exception',
+                                       'reason': f"aliases {aliases} missing"}, 'status': 404}
+            planned.append((kind, names, aliases, {k: v for k, v in spec.items()
+                                                   if k in ('is_write_index', 'filter', 'routing')}))
+        for kind, names, aliases, options in planned:
+            for name in names:
+                if kind == 'add':
+                    for alias in aliases:
+                        self.aliases.setdefault(alias, {})[name] = options
+                elif kind == 'remove':
+                    for alias in [a for a in self.aliases if any(fnmatch(a, p) for p in aliases)]:
+                        self.aliases[alias].pop(name, None)
+                        if not self.aliases[alias]:
+                            del self.aliases[alias]
+                elif kind == 'remove_index':
+                    self._delete_index(name)
+        return 200, {'acknowledged': True}
+
+    @staticmethod
+    def _write_blocked(index: LocalIndex) -> bool:
+        return str(index.settings.get('blocks.write', '')).lower() == 'true'
+
+    def _reindex(self, body: Dict) -> Tuple[int, Dict]:
+        started = time.perf_counter()
+        source = self._resolve(body['source']['index'])
+        dest = self._resolve(body['dest']['index'])
+        if source is None or dest is None:
+            missing = body['dest']['index'] if source is not None else body['source']['index']
+            return 404, {'error': {'type': 'index_not_found_exception', 'reason': f"no such index [{missing}]"},
+                         'status': 404}
+        if self._write_blocked(dest):
+            return 403, {'error': {'type': 'cluster_block_exception',
+                                   'reason': f"index [{body['dest']['index']}] blocked: [FORBIDDEN/8/index write]"},
+                         'status': 403}
+        with self._lock:
+            documents = list(source.documents)
+            created = sum(dest.put(str(doc.get('id') or uuid.uuid4().hex), doc) for doc in documents)
+        return 200, {'took': int((time.perf_counter() - started) * 1000), 'total': len(documents),
+                     'created': created, 'updated': len(documents) - created, 'failures': []}
+
+    def _bulk(self, ndjson: str, default_name: Optional[str]) -> Tuple[int, Dict]:
+        started = time.perf_counter()
+        lines = [line for line in ndjson.splitlines() if line.strip()]
+        items, position = [], 0
+        while position < len(lines):
+            (action, meta), = json.loads(lines[position]).items()
+            position += 1
+            source = None
+            if action != 'delete':
+                source = json.loads(lines[position])
+                position += 1
+            name = meta.get('_index', default_name)
+            doc_id = str(meta.get('_id') or uuid.uuid4().hex)
+            index = self._resolve(name)
+            if index is None:
+                item = {'status': 404, 'error': {'type': 'index_not_found_exception',
+                                                 'reason': f"no such index [{name}]"}}
+            elif self._write_blocked(index):
+                item = {'status': 403, 'error': {'type': 'cluster_block_exception',
+                                                 'reason': f"index [{name}] blocked: [FORBIDDEN/8/index write]"}}
+            elif action in ('index', 'create'):
+                with self._lock:
+                    created = index.put(doc_id, source)
+                item = {'status': 201 if created else 200, 'result': 'created' if created else 'updated'}
+            elif action == 'delete':
+                with self._lock:
+                    deleted = index.delete(doc_id)
+                item = {'status': 200 if deleted else 404, 'result': 'deleted' if deleted else 'not_found'}
+            else:
+                item = {'status': 400, 'error': {'type': 'illegal_argument_exception',
+                                                 'reason': f"unsupported bulk action [{action}]"}}
+            items.append({action: dict(item, _index=name, _id=doc_id)})
+        return 200, {'took': int((time.perf_counter() - started) * 1000),
+                     'errors': any('error' in next(iter(i.values())) for i in items), 'items': items}
+
+    def _search_template(self, index: LocalIndex, body: Dict) -> Dict:
+        query = self._render(body)
+        if body.get('profile'):
+            query['profile'] = True
+        return index.search(query)
+
+    def _msearch(self, ndjson: str, templated: bool, default_name: Optional[str]) -> Dict:
+        lines = [line for line in ndjson.splitlines() if line.strip()]
+        responses = []
+        for header, body in zip(lines[0::2], lines[1::2]):
+            try:
+                index = self._resolve(json.loads(header).get('index', default_name))
+                if index is None:
+                    raise KeyError(f"no such index [{json.loads(header).get('index')}]")
+                query = json.loads(body)
+                response = self._search_template(index, query) if templated else index.search(query)
+                response['status'] = 200
+            except Exception as e:
+                response = {'error': {'type': type(e).__name__, 'reason': str(e)}, 'status': 400}
+            responses.append(response)
+        return {'took': 0, 'responses': responses}
+
+    def route(self, method: str, path: str, body: str) -> Tuple[int, Any]:
+        parts = [p for p in urlsplit(path).path.split('/') if p]
+        name = None
+        if parts and not parts[0].startswith('_'):
+            name, parts = parts[0], parts[1:]
+        endpoint = '/'.join(parts)
+        # _bulk and _msearch bodies are NDJSON and parsed per line
+        ndjson = endpoint.startswith('_msearch') or endpoint == '_bulk'
+        payload = json.loads(body) if body and not ndjson else None
+
+        if endpoint == '_cluster/health' or endpoint.startswith('_cluster/health/'):
+            return 200, {'cluster_name': 'local', 'status': 'green', 'number_of_nodes': 1}
+        if endpoint == '_aliases' and method in ('POST', 'PUT'):
+            with self._lock:
+                return self._update_aliases(payload['actions'])
+        if parts[:1] == ['_alias'] and name is None:
+            pattern = parts[1] if len(parts) > 1 else '*'
+            found: Dict[str, Dict] = {}
+            for alias, targets in self.aliases.items():
+                if fnmatch(alias, pattern):
+                    for target, options in targets.items():
+                        found.setdefault(target, {'aliases': {}})['aliases'][alias] = options
+            if not found and '*' not in pattern:
+                return 404, {'error': f"alias [{pattern}] missing", 'status': 404}
+            return 200, found
+        if endpoint == '_bulk':
+            return self._bulk(body, name)
+        if endpoint == '_reindex' and method == 'POST':
+            return self._reindex(payload)
+        if endpoint == '_mapping' and method == 'GET' and self.index_name == '*' and not self._expand(name or '*'):
+            # The served index answers to any name
+            return 200, {name or self.index_name: {'mappings': self.index.mapping()}}
+        if name is not None and endpoint in ('', '_settings', '_mapping'):
+            if method == 'PUT' and endpoint == '':
+                with self._lock:
+                    return self._create_index(name, payload)
+            names = self._expand(name)
+            if not names and '*' not in name:
+                return 404, {'error': {'type': 'index_not_found_exception', 'reason': f"no such index [{name}]"},
+                             'status': 404}
+            if method == 'DELETE':
+                with self._lock:
+                    for target in names:
+                        self._delete_index(target)
+                return 200, {'acknowledged': True}
+            if method == 'PUT' and endpoint == '_mapping':
+                for target in names:
+                    self.indices[target].mappings.setdefault('properties', {}).update(payload.get('properties', {}))
+                return 200, {'acknowledged': True}
+            if method == 'PUT':
+                for target in names:
+                    self.indices[target].settings.update(self._flat_settings(payload))
+                return 200, {'acknowledged': True}
+            metadata = {target: self._index_metadata(target) for target in names}
+            if endpoint == '_settings':
+                metadata = {target: {'settings': meta['settings']} for target, meta in metadata.items()}
+            elif endpoint == '_mapping':
+                metadata = {target: {'mappings': meta['mappings']} for target, meta in metadata.items()}
+            return 200, metadata
+        if endpoint in ('_refresh', '_forcemerge', '_flush'):
+            return 200, {'_shards': {'total': 1, 'successful': 1, 'failed': 0}}
+
+        index = self._resolve(name)
+        if index is None:
+            return 404, {'error': {'type': 'index_not_found_exception', 'reason': f"no such index [{name}]"},
+                         'status': 404}
+        if endpoint == '_search' and method in ('GET', 'POST'):
+            return 200, index.search(payload or {})
+        if endpoint == '_count':
+            return 200, index.count(payload)
+        if endpoint == '_search/template':
+            return 200, self._search_template(index, payload)
+        if endpoint in ('_msearch', '_msearch/template'):
+            return 200, self._msearch(body, endpoint.endswith('template'), name)
+        if endpoint == '_render/template':
+            return 200, {'template_output': self._render(payload)}
+        if endpoint == '_search/point_in_time':
+            if method == 'DELETE':
+                for pit_id in (payload or {}).get('pit_id', []):
+                    self.point_in_times.pop(pit_id, None)
+                return 200, {'pits': []}
+            pit_id = uuid.uuid4().hex
+            self.point_in_times[pit_id] = time.time()
+            return 200, {'pit_id': pit_id}
+        if parts[:1] == ['_scripts'] and len(parts) == 2:
+            script_id = parts[1]
+            if method in ('PUT', 'POST'):
+                self.scripts[script_id] = payload['script']
+                return 200, {'acknowledged': True}
+            if script_id not in self.scripts:
+                return 404, {'_id': script_id, 'found': False}
+            if method == 'DELETE':
+                del self.scripts[script_id]
+                return 200, {'acknowledged': True}
+            return 200, {'_id': script_id, 'found': True, 'script': self.scripts[script_id]}
+        return 400, {'error': {'type': 'unsupported_endpoint', 'reason': f"{method} /{endpoint} is not supported"},
+                     'status': 400}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; with Nagle on, every keep-alive response
+            # waits out the client's delayed ACK (~40ms)
+            disable_nagle_algorithm = True
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+                status = server._injected_fault()
+                if status is not None:
+                    payload = {'error': {'type': 'injected_fault', 'reason': 'injected by local stand-in'},
+                               'status': status}
+                else:
+                    try:
+                        status, payload = server.route(self.command, self.path, body)
+                    except KeyError as e:
+                        status, payload = 404, {'error': {'type': 'resource_not_found_exception',
+                                                          'reason': str(e)}, 'status': 404}
+                    except Exception as e:
+                        status, payload = 400, {'error': {'type': type(e).__name__, 'reason': str(e)},
+                                                'status': 400}
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+            def do_HEAD(self):
+                # Existence checks such as indices.exists: the GET status, no body
+                try:
+                    status, _ = server.route('GET', self.path, '')
+                except KeyError:
+                    status = 404
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                server.logger.debug("%s - %s", self.address_string(), format % args)
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Serve an exclusion extract through a local OpenSearch stand-in')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help='Extract CSV to index')
+    source.add_argument('--parquet', help='Glue Parquet snapshot to index')
+    parser.add_argument('--load-date', help='Snapshot load_date partition to index; default the latest')
+    parser.add_argument('--templates', help='Search templates file to store, e.g. src/OpenSearch/query_tempaltes,.json')
+    parser.add_argument('--index-name', default='*',
+                        help="Serve the extract as this index, e.g. event-data-index_v1; default any name")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9200)
+    parser.add_argument('--latency-ms', type=float, nargs=2, default=(0, 0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    index = LocalIndex.from_csv(args.csv) if args.csv else LocalIndex.from_parquet(args.parquet, args.load_date)
+    server = LocalOpenSearchServer(index, index_name=args.index_name, host=args.host, port=args.port,
+                                   latency_ms=tuple(args.latency_ms), error_rate=args.error_rate,
+                                   error_status=args.error_status, seed=args.seed)
+    if args.templates:
+        print(f"Stored {server.load_templates_file(args.templates)} templates")
+    server.start()
+    print(f"Serving {len(index.documents)} documents on http://{server.address} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import pickle
+import time
+
+import numpy as np
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein
+from utilities.csv_reader import CSVReader
+from utilities.data_comparator import DataComparator
+from utilities.name_keys import name_keys, parse_aliases
+from utilities.snapshot_reader import SNAPSHOT_FIELDS, iter_snapshot_documents
+
+INDEX_VERSION = 1
+
+
+def auto_fuzziness(token: str) -> int:
+    """
+    Edits allowed for a token under OpenSearch's fuzziness AUTO: 0 up to 2 characters,
+    1 up to 5, 2 beyond.
+    """
+    if len(token) <= 2:
+        return 0
+    return 1 if len(token) <= 5 else 2
+
+
+def trigrams(name_norm: str) -> List[str]:
+    """
+    Distinct character trigrams of a normalized name, with each token padded so short tokens
+    and token boundaries still produce trigrams.
+    """
+    grams = []
+    for token in name_norm.split():
+        padded = f"  {token} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return list(dict.fromkeys(grams))
+
+
+class LocalScreeningEngine:
+    def __init__(self, max_candidates: int = 200, logger: Optional[logging.Logger] = None):
+        """
+        Offline name screening against an in-memory copy of the exclusion data.
+
+        Every record's name and each Cross-Reference alias is an index entry. Entries are
+        indexed by character trigram and by phonetic key; a query scores only the entries that
+        share the most trigrams with it, with a bonus for sharing its phonetic key, so a lookup
+        scores at most max_candidates entries however large the data is.
+
+        Scores follow the basic_person_search template's multi_match with fuzziness AUTO: a
+        query token matches a name token within AUTO edit distance, and the score (0-100) is
+        the share of query tokens matched, weighted by how close each match is.
+
+        Args:
+            max_candidates: Most entries scored per query, by trigram and phonetic overlap
+        """
+        self.max_candidates = max_candidates
+        self.logger = logger or logging.getLogger(__name__)
+        self.records: List[Dict[str, Any]] = []
+        # Parallel entry arrays: normalized name, owning record, whether it is an alias
+        self.entry_names: List[str] = []
+        self.entry_records = array('I')
+        self.entry_alias = array('b')
+        self.trigram_index: Dict[str, array] = {}
+        self.phonetic_index: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _add_entry(self, name: str, record_position: int, is_alias: bool):
+        keys = name_keys(name)
+        if not keys['name_norm']:
+            return
+        entry = len(self.entry_names)
+        self.entry_names.append(keys['name_norm'])
+        self.entry_records.append(record_position)
+        self.entry_alias.append(is_alias)
+        for gram in trigrams(keys['name_norm']):
+            self.trigram_index.setdefault(gram, array('I')).append(entry)
+        self.phonetic_index.setdefault(keys['phonetic_key'], array('I')).append(entry)
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index records in extract format ('Name', 'First', ..., 'Cross-Reference'). Records
+        from the Parquet snapshot may use its snake_case columns and precomputed 'aliases'.
+
+        Returns:
+            int: Number of records added
+        """
+        added = 0
+        for record in records:
+            record = {SNAPSHOT_FIELDS.get(k, k): v for k, v in record.items()}
+            position = len(self.records)
+            self.records.append(record)
+            self._add_entry(DataComparator.record_name(record), position, False)
+            aliases = record.get('aliases')
+            if aliases is None:
+                aliases = parse_aliases(record.get('Cross-Reference') or '')
+            for alias in aliases:
+                self._add_entry(alias, position, True)
+            added += 1
+        return added
+
+    @classmethod
+    def from_csv(cls, path: str, **kwargs) -> 'LocalScreeningEngine':
+        engine = cls(**kwargs)
+        started = time.time()
+        count = engine.add_records(CSVReader(path, preload=False).iter_records())
+        engine.logger.info("Indexed %d records (%d names) from %s in %.1fs",
+                           count, len(engine.entry_names), path, time.time() - started)
+        return engine
+
+    @classmethod
+    def from_parquet(cls, path: str, load_date: Optional[str] = None, **kwargs) -> 'LocalScreeningEngine':
+        """
+        Builds the engine from the Glue job's cleaned Parquet snapshot (a file or directory).
+        Only one load_date partition is read, the latest by default, so each record is
+        indexed once.
+        """
+        engine = cls(**kwargs)
+        count = engine.add_records(iter_snapshot_documents(path, load_date))
+        engine.logger.info("Indexed %d records (%d names) from %s", count, len(engine.entry_names), path)
+        return engine
+
+    def save(self, path: str):
+        """
+        Serializes the records and the built index so a later start skips indexing.
+        """
+        state = {
+            'version': INDEX_VERSION,
+            'records': self.records,
+            'entry_names': self.entry_names,
+            'entry_records': self.entry_records,
+            'entry_alias': self.entry_alias,
+            'trigram_index': self.trigram_index,
+            'phonetic_index': self.phonetic_index
+        }
+        with open(path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'LocalScreeningEngine':
+        """
+        Loads an index written by save(). The file is a pickle: only load files you wrote.
+        """
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported screening index version in {path}: {state.get('version')}")
+        engine = cls(**kwargs)
+        for name in ('records', 'entry_names', 'entry_records', 'entry_alias', 'trigram_index', 'phonetic_index'):
+            setattr(engine, name, state[name])
+        return engine
+
+    @staticmethod
+    def _score(query_tokens: List[str], names: List[str]) -> np.ndarray:
+        """
+        Scores names against the query tokens in one pass: the edit distances between every
+        query token and every name token are computed together by rapidfuzz, then reduced
+        to each query token's best match per name.
+        """
+        name_tokens = [name.split() for name in names]
+        flat = [token for tokens in name_tokens for token in tokens]
+        allowed = np.array([auto_fuzziness(token) for token in query_tokens])[:, None]
+        distance = process.cdist(query_tokens, flat, scorer=Levenshtein.distance, dtype=np.int32,
+                                 score_cutoff=int(allowed.max()))
+        lengths = np.maximum(np.array([len(token) for token in query_tokens])[:, None],
+                             np.fromiter(map(len, flat), dtype=np.int32, count=len(flat))[None, :])
+        similarity = np.where(distance <= allowed, 1 - distance / lengths, 0.0)
+        # Entries are never empty, so every name owns at least one column
+        starts = np.cumsum([0] + [len(tokens) for tokens in name_tokens[:-1]])
+        best = np.maximum.reduceat(similarity, starts, axis=1)
+        return 100 * best.sum(axis=0) / len(query_tokens)
+
+    def screen(self, name: str, size: int = 10, min_score: float = 50) -> List[Dict[str, Any]]:
+        """
+        Screen one name.
+
+        Returns:
+            Up to `size` matches, best first, one per record, each with score, matched_name,
+            is_alias and the record itself
+        """
+        keys = name_keys(name)
+        query_tokens = keys['name_tokens']
+        if not query_tokens:
+            return []
+
+        # Count shared trigrams per entry over the zero-copy posting arrays, keep the top entries
+        postings = [np.frombuffer(self.trigram_index[gram], dtype=np.uint32)
+                    for gram in trigrams(keys['name_norm']) if gram in self.trigram_index]
+        # Entries with the query's phonetic key compete for the same max_candidates slots, with a
+        # bonus of half the query's trigrams; phonetic buckets grow with the data, so they are
+        # ranked rather than scored in full
+        phonetic_bonus = max(len(postings) // 2, 1)
+        phonetic = self.phonetic_index.get(keys['phonetic_key'])
+        if phonetic is not None:
+            phonetic = np.frombuffer(phonetic, dtype=np.uint32)
+            postings.append(phonetic)
+        candidates = []
+        if postings:
+            combined = np.concatenate(postings)
+            if len(self.entry_names) <= 8 * len(combined):
+                # A dense count over all entries is cheaper than sorting the postings
+                counts = np.bincount(combined, minlength=len(self.entry_names))
+                if phonetic is not None:
+                    # Each entry has one phonetic key, and the concatenation counted it once
+                    counts[phonetic] += phonetic_bonus - 1
+                # Scanning a boolean mask is several times faster than scanning the counts
+                entries = np.flatnonzero(counts > 0)
+                overlap = counts[entries]
+            else:
+                entries, overlap = np.unique(combined, return_counts=True)
+                if phonetic is not None:
+                    overlap[np.searchsorted(entries, phonetic)] += phonetic_bonus - 1
+            if len(entries) > self.max_candidates:
+                entries = entries[np.argpartition(-overlap, self.max_candidates)[:self.max_candidates]]
+            candidates = entries.tolist()
+
+        best: Dict[int, tuple] = {}
+        if not candidates:
+            return []
+        scores = self._score(query_tokens, [self.entry_names[entry] for entry in candidates])
+        for entry, score in zip(candidates, scores.tolist()):
+            if score < min_score:
+                continue
+            record_position = self.entry_records[entry]
+            if record_position not in best or score > best[record_position][0]:
+                best[record_position] = (score, entry)
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[0]))[:size]
+        return [{
+            'score': round(score, 2),
+            'matched_name': self.entry_names[entry],
+            'is_alias': bool(self.entry_alias[entry]),
+            'record': self.records[record_position]
+        } for record_position, (score, entry) in ranked]
+
+    def screen_many(self, names: Iterable[str], size: int = 10, min_score: float = 50) -> List[List[Dict[str, Any]]]:
+        """
+        Screen a batch of names; results are in input order.
+        """
+        return [self.screen(name, size, min_score) for name in names]
+
+    def search_name(self, name: str, size: int = 10) -> Dict:
+        """
+        Same response shape as OpenSearchClient.search_name, so callers can fall back to the
+        local engine when the domain is unavailable.
+        """
+        matches = self.screen(name, size)
+        return {
+            'hits': {
+                'total': {'value': len(matches), 'relation': 'eq'},
+                'hits': [{'_score': m['score'], '_source': m['record']} for m in matches]
+            }
+        }
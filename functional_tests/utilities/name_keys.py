@@ -0,0 +1,167 @@
+"""
+Name keys and Cross-Reference aliases. The Glue job (src/glue/load_data.py) imports this
+module too, shipped with --extra-py-files, so the keys it writes and the keys the screening
+clients query with come from the same code. Keep it free of non-standard-library imports.
+"""
+import re
+from typing import Dict, List
+
+# Accented characters folded to their ASCII base letter when building name keys
+ACCENTED_CHARS = "ÀÁÂÃÄÅàáâãäåÇçÈÉÊËèéêëÌÍÎÏìíîïÑñÒÓÔÕÖØòóôõöøÙÚÛÜùúûüÝýÿŠšŽž"
+UNACCENTED_CHARS = "AAAAAAaaaaaaCcEEEEeeeeIIIIiiiiNnOOOOOOooooooUUUUuuuuYyySsZz"
+_FOLD_TABLE = str.maketrans(ACCENTED_CHARS, UNACCENTED_CHARS)
+
+# Leading markers in Cross-Reference alias lists, e.g. "(also X, Y)" or "X (a.k.a. Y)"
+ALIAS_PREFIX = re.compile(r"^(also|a\.?k\.?a\.?|f\.?k\.?a\.?|d\.?b\.?a\.?)\s+", re.IGNORECASE)
+
+# Soundex digit for A-Z as used by Spark; '7' marks H and W, which do not separate equal codes
+_SOUNDEX_CODES = "01230127022455012623017202"
+
+
+def normalize_name(name: str) -> str:
+    """
+    Folds a name the same way the Glue job builds name_norm: diacritics to ASCII, lower case,
+    apostrophes dropped, other punctuation and quote artifacts to a space, whitespace collapsed.
+    """
+    if not name:
+        return ""
+    folded = name.translate(_FOLD_TABLE).lower()
+    folded = re.sub(r"['`’]", "", folded)
+    folded = re.sub(r"[^a-z0-9]+", " ", folded)
+    return folded.strip()
+
+
+def name_tokens(name: str) -> List[str]:
+    """
+    Distinct tokens of the normalized name, in order of first appearance.
+    """
+    return list(dict.fromkeys(t for t in normalize_name(name).split(" ") if t))
+
+
+def soundex(token: str) -> str:
+    """
+    Soundex code of a token, matching Spark's soundex() so query-side codes line up with
+    the name_phonetic values computed at load time.
+    """
+    if not token:
+        return ""
+    first = token[0].upper()
+    if not "A" <= first <= "Z":
+        return token
+    code = [first]
+    last = _SOUNDEX_CODES[ord(first) - ord("A")]
+    for char in token[1:]:
+        char = char.upper()
+        if not "A" <= char <= "Z":
+            last = "0"
+            continue
+        digit = _SOUNDEX_CODES[ord(char) - ord("A")]
+        if digit == "7":
+            continue
+        if digit != "0" and digit != last:
+            code.append(digit)
+            if len(code) == 4:
+                break
+        last = digit
+    return "".join(code).ljust(4, "0")
+
+
+def _split_top_level(text: str) -> List[str]:
+    """
+    Splits text on commas that are not inside parentheses.
+    """
+    parts, current, depth = [], [], 0
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+def _top_level_groups(text: str):
+    """
+    Separates the outermost parenthesized groups from the surrounding text. A group left open
+    at the end of the string (truncated extracts) is closed implicitly.
+    """
+    outside, groups, current, depth = [], [], [], 0
+    for char in text:
+        if char == "(":
+            if depth:
+                current.append(char)
+            depth += 1
+        elif char == ")" and depth:
+            depth -= 1
+            if depth:
+                current.append(char)
+            else:
+                groups.append("".join(current))
+                current = []
+        elif depth:
+            current.append(char)
+        else:
+            outside.append(char)
+    if current:
+        groups.append("".join(current))
+    return "".join(outside), groups
+
+
+def parse_aliases(text: str) -> List[str]:
+    """
+    Parses a Cross-Reference value such as '(also A B, ""C"", D (a.k.a. E))' or
+    'X, Y (f.k.a. Z)' into a list of aliases, in order and without duplicates. Quote artifacts
+    and "also"/"a.k.a." prefixes are removed. Names outside parentheses are kept, and aliases
+    in parentheses are returned after the name they follow.
+    """
+    if not text:
+        return []
+    aliases = []
+    for part in _split_top_level(text.replace('"', '')):
+        name, groups = _top_level_groups(part)
+        name = ALIAS_PREFIX.sub("", name.strip()).strip()
+        if name:
+            aliases.append(name)
+        for group in groups:
+            aliases.extend(parse_aliases(group))
+    return list(dict.fromkeys(aliases))
+
+
+def name_keys(name: str) -> Dict[str, object]:
+    """
+    Builds all precomputed name keys for a name, mirroring the fields written by the Glue job.
+
+    Returns:
+        Dict with name_norm, name_tokens, name_key, name_phonetic and phonetic_key (the sorted
+        codes joined by a space, as stored per alias in alias_phonetic)
+    """
+    tokens = name_tokens(name)
+    phonetic = list(dict.fromkeys(soundex(t) for t in tokens))
+    return {
+        "name_norm": normalize_name(name),
+        "name_tokens": tokens,
+        "name_key": " ".join(sorted(tokens)),
+        "name_phonetic": phonetic,
+        "phonetic_key": " ".join(sorted(phonetic))
+    }
+
+
+def alias_keys(cross_reference: str) -> Dict[str, List[str]]:
+    """
+    Builds the alias fields the Glue job derives from a Cross-Reference value.
+
+    Returns:
+        Dict with aliases, alias_keys and alias_phonetic
+    """
+    aliases = parse_aliases(cross_reference)
+    keys = [name_keys(alias) for alias in aliases]
+    return {
+        "aliases": aliases,
+        "alias_keys": list(dict.fromkeys(k["name_key"] for k in keys if k["name_key"])),
+        "alias_phonetic": list(dict.fromkeys(k["phonetic_key"] for k in keys if k["phonetic_key"]))
+    }
@@ -0,0 +1,60 @@
+"""
+Reads the Glue job's Parquet snapshot as documents, for the local screening engine and the
+local OpenSearch stand-in. Must stay in sync with the reader in src/OpenSearch/rebuild_index.py.
+"""
+from typing import Dict, Iterator, Optional
+
+# Parquet snapshot column -> document field, the reverse of SNAPSHOT_COLUMNS in
+# src/glue/load_data.py, so documents match what the stream writes from DynamoDB
+SNAPSHOT_FIELDS = {
+    'name': 'Name',
+    'prefix': 'Prefix',
+    'first': 'First',
+    'middle': 'Middle',
+    'last': 'Last',
+    'suffix': 'Suffix',
+    'address_1': 'Address 1',
+    'address_2': 'Address 2',
+    'address_3': 'Address 3',
+    'address_4': 'Address 4',
+    'city': 'City',
+    'state_province': 'State / Province',
+    'country': 'Country',
+    'zip_code': 'Zip Code',
+    'open_data_flag': 'Open Data Flag',
+    'unique_entity_id': 'Unique Entity ID',
+    'exclusion_program': 'Exclusion Program',
+    'excluding_agency': 'Excluding Agency',
+    'ct_code': 'CT Code',
+    'exclusion_type': 'Exclusion Type',
+    'additional_comments': 'Additional Comments',
+    'active_date': 'Active Date',
+    'termination_date': 'Termination Date',
+    'record_status': 'Record Status',
+    'cross_reference': 'Cross-Reference',
+    'sam_number': 'SAM Number',
+    'cage': 'CAGE',
+    'npi': 'NPI',
+    'creation_date': 'Creation_Date',
+    'classification': 'Classification'
+}
+SNAPSHOT_DROP_COLUMNS = ('load_date', 'row_hash')
+
+
+def iter_snapshot_documents(path: str, load_date: Optional[str] = None, batch_size: int = 10000) -> Iterator[Dict]:
+    """
+    Streams documents from the Glue job's Parquet snapshot (local path or s3://), one record
+    batch at a time. The snapshot is partitioned by classification and load_date; only the
+    given load_date is read, the latest one by default.
+    """
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    if 'load_date' in dataset.schema.names:
+        if load_date is None:
+            load_date = max(dataset.to_table(columns=['load_date']).column('load_date').to_pylist())
+        dataset = dataset.filter(ds.field('load_date') == load_date)
+    for batch in dataset.to_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            # DynamoDB items carry no null attributes, so neither do the documents
+            yield {SNAPSHOT_FIELDS.get(k, k): v for k, v in row.items()
+                   if v is not None and k not in SNAPSHOT_DROP_COLUMNS}
@@ -0,0 +1,206 @@
+import argparse
+import csv
+import random
+import string
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional
+
+# Column layout of the SAM.gov exclusion extract, as in test_data/sample_data.csv
+EXTRACT_COLUMNS = [
+    'Classification', 'Name', 'Prefix', 'First', 'Middle', 'Last', 'Suffix',
+    'Address 1', 'Address 2', 'Address 3', 'Address 4', 'City', 'State / Province', 'Country',
+    'Zip Code', 'Open Data Flag', 'Blank (Deprecated)', 'Unique Entity ID', 'Exclusion Program',
+    'Excluding Agency', 'CT Code', 'Exclusion Type', 'Additional Comments', 'Active Date',
+    'Termination Date', 'Record Status', 'Cross-Reference', 'SAM Number', 'CAGE', 'NPI',
+    'Creation_Date'
+]
+
+CLASSIFICATIONS = [('Individual', 0.6), ('Firm', 0.25), ('Entity', 0.1), ('Special Entity Designation', 0.03),
+                   ('Vessel', 0.02)]
+AGENCIES = [('TREAS-OFAC', 0.5), ('HHS', 0.25), ('OPM', 0.1), ('GSA', 0.05), ('DOJ', 0.05), ('EPA', 0.05)]
+CT_CODES = ['03-SDNTK-01', '03-SDGT-01', '03-SDN-01', 'Z1', 'Z2', 'A', 'B', '']
+EXCLUSION_TYPES = [('Prohibition/Restriction', 0.6), ('Ineligible (Proceedings Completed)', 0.3),
+                   ('Ineligible (Proceedings Pending)', 0.05), ('Voluntary Exclusion', 0.05)]
+EXCLUSION_PROGRAMS = [('Reciprocal', 0.8), ('NonProcurement', 0.15), ('Procurement', 0.05)]
+COUNTRIES = [('USA', 0.4), ('XUN', 0.35), ('MMR', 0.05), ('PAK', 0.05), ('MEX', 0.05), ('COL', 0.05),
+             ('IRN', 0.05)]
+STATES = ['NY', 'CA', 'TX', 'FL', 'IL', 'PA', 'OH', 'XX']
+CITIES = ['JAMAICA', 'KEW GARDENS', 'BROOKLYN', 'HOUSTON', 'MIAMI', 'CHICAGO', 'LOS ANGELES', 'PHOENIX']
+STREETS = ['MAIN ST', 'OAK AVE', 'PARK BLVD', 'BROADWAY', 'MARKET ST', 'CEDAR LN']
+FIRM_SUFFIXES = ['LLC', 'INC', 'CORP', 'S.A.', 'LTD', 'TRADING CO', 'HOLDINGS', 'GROUP']
+SYLLABLES = ['a', 'ba', 'bar', 'da', 'del', 'fa', 'gha', 'ha', 'ja', 'ka', 'khal', 'la', 'li', 'ma', 'med',
+             'mo', 'na', 'ni', 'ra', 'ro', 'sa', 'sha', 'ta', 'tan', 'vi', 'ya', 'za', 'zo', 'el', 'an',
+             'ros', 'gon', 'mar', 'ez', 'ton', 'son', 'berg', 'man']
+COMMENTS = [
+    'PII data has been masked from view',
+    'Excluded by the Department of Health and Human Services from participation in all Federal health '
+    'care programs pursuant to 42 U.S.C. § 1320a-7 or other sections of the Social Security Act.',
+    'Debarred for a period of three years. See the agency decision for details.'
+]
+DATE_FORMATS = ['{d.month}/{d.day}/{yy:02d}', '{d.month:02d}/{d.day:02d}/{d.year}', '{d.year}-{d.month:02d}-{d.day:02d}']
+ALPHANUMERIC = string.ascii_uppercase + string.digits
+# SAM Numbers kept for reuse as duplicates; a fixed-size uniform sample of those generated
+DUPLICATE_POOL_SIZE = 10000
+
+
+class SyntheticExtractGenerator:
+    def __init__(
+            self,
+            seed: int = 42,
+            duplicate_sam_rate: float = 0.05,
+            alias_rate: float = 0.3,
+            max_aliases: int = 20,
+            quote_artifact_rate: float = 0.1,
+            multiline_rate: float = 0.05
+    ):
+        """
+        Seeded generator of synthetic exclusion extracts with the real column layout.
+
+        The rows reproduce the quirks of the SAM.gov extract: quoted multiline addresses and
+        comments, doubled-quote artifacts around names and aliases (e.g. ""NAME""), long
+        "(also ...)" Cross-Reference lists with nested "(a.k.a. ...)" groups, SAM Numbers shared
+        between rows and dates in M/D/YY, MM/DD/YYYY and ISO formats. The same seed always
+        produces the same rows.
+
+        Args:
+            seed: Random seed
+            duplicate_sam_rate: Share of rows reusing an earlier row's SAM Number
+            alias_rate: Share of rows with a Cross-Reference alias list
+            max_aliases: Longest alias list
+            quote_artifact_rate: Share of names and aliases wrapped in doubled quotes
+            multiline_rate: Share of rows with a multiline address or comment
+        """
+        self.seed = seed
+        self.duplicate_sam_rate = duplicate_sam_rate
+        self.alias_rate = alias_rate
+        self.max_aliases = max_aliases
+        self.quote_artifact_rate = quote_artifact_rate
+        self.multiline_rate = multiline_rate
+
+    @staticmethod
+    def _weighted(rng: random.Random, choices) -> str:
+        values, weights = zip(*choices)
+        return rng.choices(values, weights)[0]
+
+    def _word(self, rng: random.Random) -> str:
+        return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).upper()
+
+    def _quoted(self, rng: random.Random, name: str) -> str:
+        return f'""{name}""' if rng.random() < self.quote_artifact_rate else name
+
+    def _date(self, rng: random.Random, start_year: int = 1995) -> str:
+        d = date(start_year, 1, 1) + timedelta(days=rng.randint(0, 365 * 30))
+        return rng.choice(DATE_FORMATS).format(d=d, yy=d.year % 100)
+
+    def _code(self, rng: random.Random, length: int) -> str:
+        return ''.join(rng.choice(ALPHANUMERIC) for _ in range(length))
+
+    def _aliases(self, rng: random.Random, base: str) -> str:
+        aliases = []
+        for _ in range(rng.randint(1, self.max_aliases)):
+            words = base.split() if rng.random() < 0.5 else []
+            alias = ' '.join(words[:rng.randint(1, len(words))] if words else
+                             [self._word(rng) for _ in range(rng.randint(1, 3))])
+            if rng.random() < 0.1:
+                alias = f"{alias} (a.k.a. {self._word(rng)} {self._word(rng)})"
+            aliases.append(self._quoted(rng, alias))
+        return f"(also {', '.join(aliases)})"
+
+    def rows(self, count: int) -> Iterator[Dict[str, str]]:
+        """
+        Yields `count` rows as dicts keyed by EXTRACT_COLUMNS. Rows are generated one at a time,
+        so memory does not grow with count.
+        """
+        rng = random.Random(self.seed)
+        # Reservoir sample of the SAM Numbers generated so far, so duplicates are drawn from the
+        # whole extract without keeping every number
+        sam_numbers: List[str] = []
+        generated = 0
+        for _ in range(count):
+            row = dict.fromkeys(EXTRACT_COLUMNS, '')
+            classification = self._weighted(rng, CLASSIFICATIONS)
+            row['Classification'] = classification
+            if classification == 'Individual':
+                row['First'] = self._word(rng)
+                row['Middle'] = self._word(rng) if rng.random() < 0.3 else ''
+                row['Last'] = self._word(rng)
+                if rng.random() < self.quote_artifact_rate:
+                    # The extract sometimes carries the whole name in Last, wrapped in quotes
+                    full_name = ' '.join(n for n in (row['First'], row['Middle'], row['Last']) if n)
+                    row['Last'] = f'""{full_name}""'
+                    row['First'] = row['Middle'] = ''
+                base = f"{row['First']} {row['Last']}".strip()
+            else:
+                base = ' '.join(self._word(rng) for _ in range(rng.randint(1, 3)))
+                if classification in ('Firm', 'Entity'):
+                    base = f"{base} {rng.choice(FIRM_SUFFIXES)}"
+                row['Name'] = self._quoted(rng, base)
+                row['CAGE'] = self._code(rng, 5) if rng.random() < 0.5 else ''
+                row['Unique Entity ID'] = self._code(rng, 12) if rng.random() < 0.6 else ''
+
+            country = self._weighted(rng, COUNTRIES)
+            row['Country'] = country
+            if country == 'USA':
+                row['State / Province'] = rng.choice(STATES)
+                row['City'] = rng.choice(CITIES)
+                row['Zip Code'] = f"{rng.randint(501, 99950):05d}"
+                row['Address 1'] = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}"
+                if rng.random() < self.multiline_rate:
+                    row['Address 1'] += f"\nSUITE {rng.randint(100, 999)}"
+            row['Exclusion Program'] = self._weighted(rng, EXCLUSION_PROGRAMS)
+            row['Excluding Agency'] = self._weighted(rng, AGENCIES)
+            row['CT Code'] = rng.choice(CT_CODES)
+            row['Exclusion Type'] = self._weighted(rng, EXCLUSION_TYPES)
+            comment = rng.choice(COMMENTS) if rng.random() < 0.9 else ''
+            if comment and rng.random() < self.multiline_rate:
+                comment += '\nContact the excluding agency for more information.'
+            row['Additional Comments'] = comment
+            row['Active Date'] = self._date(rng) if rng.random() < 0.4 else ''
+            row['Termination Date'] = 'Indefinite' if rng.random() < 0.8 else self._date(rng, 2020)
+            if rng.random() < self.alias_rate:
+                row['Cross-Reference'] = self._aliases(rng, base)
+            if sam_numbers and rng.random() < self.duplicate_sam_rate:
+                row['SAM Number'] = rng.choice(sam_numbers)
+            else:
+                row['SAM Number'] = f"S4MR{self._code(rng, 5)}"
+                generated += 1
+                if len(sam_numbers) < DUPLICATE_POOL_SIZE:
+                    sam_numbers.append(row['SAM Number'])
+                else:
+                    slot = rng.randrange(generated)
+                    if slot < DUPLICATE_POOL_SIZE:
+                        sam_numbers[slot] = row['SAM Number']
+            row['NPI'] = str(rng.randint(10 ** 9, 10 ** 10 - 1)) if row['Excluding Agency'] == 'HHS' else ''
+            d = date(2000, 1, 1) + timedelta(days=rng.randint(0, 365 * 25))
+            row['Creation_Date'] = f"{d.month}/{d.day}/{d.year % 100:02d}"
+            yield row
+
+    def write_csv(self, path: str, count: int) -> int:
+        """
+        Writes `count` rows to a CSV extract at path.
+
+        Returns:
+            int: Number of rows written
+        """
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=EXTRACT_COLUMNS)
+            writer.writeheader()
+            written = 0
+            for row in self.rows(count):
+                writer.writerow(row)
+                written += 1
+        return written
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic SAM exclusion extract')
+    parser.add_argument('output', help='CSV file to write')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    written = SyntheticExtractGenerator(seed=args.seed).write_csv(args.output, args.rows)
+    print(f"Wrote {written} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
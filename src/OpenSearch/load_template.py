@@ -1,9 +1,34 @@
 from opensearchpy import OpenSearch, RequestsHttpConnection, NotFoundError
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
+import hashlib
 import json
 import logging
+import re
+import time
 from pathlib import Path
 
+PARAM_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+
+
+@lru_cache(maxsize=None)
+def _params_for_source(source: str) -> tuple:
+    # Template sources repeat across deploys, so the regex runs once per distinct source
+    return tuple(dict.fromkeys(PARAM_PATTERN.findall(source)))
+
+
+def content_hash(source: str) -> str:
+    """
+    SHA-256 of a template source with key order and whitespace normalized, so a deployed
+    script only counts as changed when its content differs.
+    """
+    try:
+        source = json.dumps(json.loads(source), sort_keys=True, separators=(',', ':'))
+    except ValueError:
+        pass
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
 
 class OpenSearchTemplateManager:
     def __init__(
@@ -25,51 +50,154 @@ class OpenSearchTemplateManager:
 
     def load_templates(self, templates_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
-        Loads multiple templates from a dictionary. Updates existing templates if they exist.
+        Loads multiple templates from a dictionary through deploy_templates, so existing
+        templates are overwritten in place and unchanged ones are left alone.
 
         Args:
             templates_dict: Dictionary containing multiple templates
 
         Returns:
-            List of creation/update responses
+            List of creation/update responses, one per template that changed
         """
-        responses = []
-        for template_id, template_info in templates_dict["templates"].items():
+        applied = self.deploy_templates(templates_dict)['applied']
+        return [{template_id: response} for template_id, response in applied.items()]
+
+    def _extract_params(self, template_body: Dict[str, Any], source: Optional[str] = None) -> Dict[str, Any]:
+        source = source if source is not None else json.dumps(template_body)
+        return {param: None for param in _params_for_source(source)}
+
+    def fetch_deployed(self, template_ids: List[str], max_workers: int = 8) -> Dict[str, Optional[str]]:
+        """
+        Fetches the stored source of each template in parallel.
+
+        Returns:
+            Dict of template id -> deployed source, or None when the template does not exist
+        """
+        def fetch(template_id):
             try:
-                # Try to delete existing template first
-                try:
-                    self.client.delete_script(id=template_id)
-                    self.logger.info(f"Deleted existing template: {template_id}")
-                except NotFoundError:
-                    self.logger.info(f"No existing template found for: {template_id}")
-
-                # Create new template
+                return template_id, self.client.get_script(id=template_id)['script']['source']
+            except NotFoundError:
+                return template_id, None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(executor.map(fetch, template_ids))
+
+    def plan_templates(self, templates_dict: Dict[str, Any], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        Compares the templates with the deployed scripts by content hash.
+
+        Returns:
+            One entry per template with id, action ('create', 'update' or 'unchanged'), the
+            deployed and new hashes, and the serialized source to deploy
+        """
+        templates = templates_dict["templates"]
+        deployed = self.fetch_deployed(list(templates), max_workers)
+        plan = []
+        for template_id, template_info in templates.items():
+            source = json.dumps(template_info["template"])
+            new_hash = content_hash(source)
+            old_hash = content_hash(deployed[template_id]) if deployed[template_id] is not None else None
+            if old_hash is None:
+                action = 'create'
+            else:
+                action = 'unchanged' if old_hash == new_hash else 'update'
+            plan.append({'id': template_id, 'action': action, 'old_hash': old_hash, 'new_hash': new_hash,
+                         'source': source})
+        return plan
+
+    def validate_template(self, source: str) -> Dict[str, Any]:
+        """
+        Renders a template source with placeholder values through _render/template, without
+        storing it, so a template that does not render is caught before it goes live.
+
+        Returns:
+            The rendered template output
+        """
+        params = {param: "0" if param in ("from", "size") else "validate" for param in _params_for_source(source)}
+        response = self.client.render_search_template(body={"source": source, "params": params})
+        return response["template_output"]
+
+    def deploy_templates(
+            self,
+            templates_dict: Dict[str, Any],
+            dry_run: bool = False,
+            max_workers: int = 8
+    ) -> Dict[str, Any]:
+        """
+        Zero-downtime deploy: only templates whose content changed are written, and they are
+        overwritten in place (no delete), so searches never see a missing template.
+
+        Every changed template is validated with _render/template first; if any fails,
+        nothing is written. Writes then run in parallel.
+
+        Args:
+            templates_dict: Dictionary containing multiple templates
+            dry_run: Only compute and log the plan
+            max_workers: Concurrent requests for fetching, validating and writing
+
+        Returns:
+            Dict with the plan and, unless dry_run, the put_script responses and elapsed seconds
+        """
+        started = time.time()
+        plan = self.plan_templates(templates_dict, max_workers)
+        changes = [item for item in plan if item['action'] != 'unchanged']
+        for line in format_plan(plan):
+            self.logger.info(line)
+        if dry_run or not changes:
+            return {'plan': plan, 'applied': {}, 'seconds': round(time.time() - started, 2)}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            failures = {}
+            for item, outcome in zip(changes, executor.map(self._try_validate, [c['source'] for c in changes])):
+                if isinstance(outcome, Exception):
+                    failures[item['id']] = outcome
+            if failures:
+                for template_id, error in failures.items():
+                    self.logger.error(f"Template {template_id} failed validation: {error}")
+                raise ValueError(f"{len(failures)} template(s) failed validation, nothing was deployed: "
+                                 f"{', '.join(failures)}")
+
+            def put(item):
                 response = self.client.put_script(
-                    id=template_id,
+                    id=item['id'],
                     body={
                         "script": {
                             "lang": "mustache",
-                            "source": json.dumps(template_info["template"]),
-                            "params": self._extract_params(template_info["template"])
+                            "source": item['source'],
+                            "params": self._extract_params(None, item['source'])
                         }
                     }
                 )
-                self.logger.info(f"Successfully created template: {template_id}")
-                responses.append({template_id: response})
-            except Exception as e:
-                self.logger.error(f"Failed to create template {template_id}: {str(e)}")
-                raise
+                self.logger.info(f"Successfully {item['action']}d template: {item['id']}")
+                return item['id'], response
+
+            applied = dict(executor.map(put, changes))
+
+        seconds = round(time.time() - started, 2)
+        self.logger.info(f"Applied {len(applied)} change(s), {len(plan) - len(changes)} unchanged, in {seconds}s")
+        return {'plan': plan, 'applied': applied, 'seconds': seconds}
+
+    def _try_validate(self, source: str):
+        try:
+            return self.validate_template(source)
+        except Exception as e:
+            return e
 
-        return responses
 
-    def _extract_params(self, template_body: Dict[str, Any]) -> Dict[str, Any]:
-        params = {}
-        template_str = json.dumps(template_body)
-        import re
-        param_pattern = r'\{\{(\w+)\}\}'
-        for param in re.findall(param_pattern, template_str):
-            params[param] = None
-        return params
+def format_plan(plan: List[Dict[str, Any]]) -> List[str]:
+    """
+    One line per template: '+' create, '~' update, '=' unchanged, with short content hashes.
+    """
+    symbols = {'create': '+', 'update': '~', 'unchanged': '='}
+    lines = []
+    for item in plan:
+        hashes = (item['old_hash'] or '')[:8]
+        if item['action'] != 'unchanged':
+            hashes = f"{hashes or 'none'} -> {item['new_hash'][:8]}"
+        lines.append(f"{symbols[item['action']]} {item['action']:9s} {item['id']} ({hashes})")
+    counts = {action: sum(1 for item in plan if item['action'] == action) for action in symbols}
+    lines.append(f"Plan: {counts['create']} to create, {counts['update']} to update, {counts['unchanged']} unchanged")
+    return lines
 
 
 # Usage
@@ -80,61 +208,16 @@ if __name__ == "__main__":
         http_auth=("admin", "Mfcodeblooded@123")
     )
 
-    # Load templates from dictionary
-    templates = {
-        "templates":
-{
-  "classification_search": {
-    "description": "Search by classification with optional filters",
-    "template": {
-      "from": "{{from}}",
-      "size": "{{size}}",
-      "query": {
-        "bool": {
-          "must": [
-            {
-              "term": {
-                "Classification.keyword": "{{classification}}"
-              }
-            }
-          ],
-          "should": [
-            {
-              "multi_match": {
-                "query": "{{query_string}}",
-                "fields": ["First^2", "Last^2", "Cross-Reference"],
-                "operator": "and",
-                "fuzziness": "AUTO"
-              }
-            }
-          ],
-          "minimum_should_match": 0
-        }
-      },
-      "sort": [
-        {"Creation_Date": {"order": "desc"}}
-      ],
-      "aggs": {
-        "by_exclusion_type": {
-          "terms": {
-            "field": "Exclusion Type.keyword",
-            "size": 10
-          }
-        },
-        "by_excluding_agency": {
-          "terms": {
-            "field": "Excluding Agency.keyword",
-            "size": 10
-          }
-        }
-      }
-    }
-  }
-}
-    }
+    # Load templates from the templates file next to this script
+    templates_path = Path(__file__).resolve().parent / "query_tempaltes,.json"
+    with open(templates_path, 'r', encoding='utf-8') as f:
+        templates = json.load(f)
 
     try:
-        responses = manager.load_templates(templates)
-        print("Templates created successfully:", responses)
+        # Writes only the templates whose content changed, in place
+        result = manager.deploy_templates(templates)
+        for line in format_plan(result['plan']):
+            print(line)
+        print(f"Applied {len(result['applied'])} change(s) in {result['seconds']}s")
     except Exception as e:
-        print(f"Failed to create templates: {str(e)}")
\ No newline at end of file
+        print(f"Failed to deploy templates: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,244 @@
+from load_template import OpenSearchTemplateManager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+# Relative p95 increase over the baseline that fails the gate
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def load_corpus(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Reads a JSON Lines query corpus, one {"id": <template id>, "params": {...}} per line.
+
+    Returns:
+        Dict of template id -> list of params
+    """
+    corpus: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                query = json.loads(line)
+                corpus.setdefault(query['id'], []).append(query.get('params', {}))
+    return corpus
+
+
+def _walk_profile(nodes: List[Dict[str, Any]], totals: Dict[str, Dict[str, Any]], path: str = ''):
+    # Clauses are keyed by their position in the tree, so one template's queries aggregate
+    # together whatever parameter values they were rendered with
+    for position, node in enumerate(nodes):
+        key = f"{path} > {node['type']}[{position}]" if path else f"{node['type']}[{position}]"
+        entry = totals.setdefault(key, {'time_ns': 0, 'count': 0, 'example': node.get('description', '')[:100]})
+        entry['time_ns'] += node.get('time_in_nanos', 0)
+        entry['count'] += 1
+        _walk_profile(node.get('children', []), totals, key)
+
+
+def clause_timings(profiles: List[Dict[str, Any]], top: int = 10) -> List[Dict[str, Any]]:
+    """
+    Sums the time of each query clause and aggregation over all profiled responses and shards.
+
+    Returns:
+        The `top` most expensive clauses with total and mean milliseconds and an example description
+    """
+    totals: Dict[str, Dict[str, Any]] = {}
+    for profile in profiles:
+        for shard in profile.get('shards', []):
+            for search in shard.get('searches', []):
+                _walk_profile(search.get('query', []), totals, 'query')
+            _walk_profile(shard.get('aggregations', []), totals, 'aggs')
+    ranked = sorted(totals.items(), key=lambda item: -item[1]['time_ns'])[:top]
+    return [{
+        'clause': clause,
+        'total_ms': round(entry['time_ns'] / 1e6, 3),
+        'mean_ms': round(entry['time_ns'] / 1e6 / entry['count'], 3),
+        'example': entry['example']
+    } for clause, entry in ranked]
+
+
+class TemplateProfiler:
+    def __init__(
+            self,
+            manager: OpenSearchTemplateManager,
+            index: str,
+            concurrency: int = 4,
+            repeat: int = 1,
+            profile_samples: int = 20,
+            logger: Optional[logging.Logger] = None
+    ):
+        """
+        Replays a query corpus against stored search templates and measures them.
+
+        Latency is measured without the profile flag, since profiling adds its own overhead;
+        a separate pass over the first profile_samples queries collects the profile API's
+        per-clause timings.
+
+        Args:
+            manager: Template manager whose client is used for all requests
+            index: Index or alias searched
+            concurrency: Requests in flight per template
+            repeat: Times the corpus is replayed
+            profile_samples: Queries per template sent with "profile": true
+        """
+        self.manager = manager
+        self.client = manager.client
+        self.index = index
+        self.concurrency = concurrency
+        self.repeat = repeat
+        self.profile_samples = profile_samples
+        self.logger = logger or logging.getLogger(__name__)
+
+    def _timed_search(self, template_id: str, params: Dict[str, Any]):
+        started = time.perf_counter()
+        try:
+            response = self.client.search_template(index=self.index, body={"id": template_id, "params": params})
+            return (time.perf_counter() - started) * 1000, response.get('took'), None
+        except Exception as e:
+            return (time.perf_counter() - started) * 1000, None, str(e)
+
+    def profile_template(self, template_id: str, queries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        workload = queries * self.repeat
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(lambda params: self._timed_search(template_id, params), workload))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, _, error in results if error is None]
+        took = [t for _, t, error in results if error is None and t is not None]
+        errors = [error for _, _, error in results if error is not None]
+        for error in errors[:3]:
+            self.logger.error(f"Template {template_id} search failed: {error}")
+
+        profiles = []
+        for params in queries[:self.profile_samples]:
+            try:
+                response = self.client.search_template(
+                    index=self.index, body={"id": template_id, "params": params, "profile": True})
+                if 'profile' in response:
+                    profiles.append(response['profile'])
+            except Exception as e:
+                self.logger.error(f"Template {template_id} profile failed: {e}")
+
+        return {
+            'queries': len(workload),
+            'errors': len(errors),
+            'throughput': round(len(workload) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'took_p95_ms': round(percentile(took, 95), 3),
+            'clauses': clause_timings(profiles)
+        }
+
+    def run(self, corpus: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for template_id, queries in corpus.items():
+            results[template_id] = self.profile_template(template_id, queries)
+            result = results[template_id]
+            self.logger.info(f"{template_id}: p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms "
+                             f"p99 {result['p99_ms']}ms, {result['errors']} errors")
+        return results
+
+
+def check_regressions(
+        results: Dict[str, Dict[str, Any]],
+        baseline: Dict[str, Dict[str, Any]],
+        tolerance: float = DEFAULT_TOLERANCE,
+        max_p95_ms: Optional[float] = None
+) -> List[str]:
+    """
+    Lists templates whose p95 grew past the baseline by more than tolerance, exceeded
+    max_p95_ms, or returned errors.
+    """
+    failures = []
+    for template_id, result in results.items():
+        if result['errors']:
+            failures.append(f"{template_id}: {result['errors']} failed searches")
+        previous = baseline.get(template_id, {}).get('p95_ms')
+        if previous and result['p95_ms'] > previous * (1 + tolerance):
+            failures.append(f"{template_id}: p95 {result['p95_ms']}ms > baseline {previous}ms (+{tolerance:.0%})")
+        if max_p95_ms is not None and result['p95_ms'] > max_p95_ms:
+            failures.append(f"{template_id}: p95 {result['p95_ms']}ms > limit {max_p95_ms}ms")
+    return failures
+
+
+def print_report(results: Dict[str, Dict[str, Any]]):
+    for template_id, result in results.items():
+        print(f"\n{template_id}: {result['queries']} queries, {result['throughput']}/s, "
+              f"p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, p99 {result['p99_ms']}ms, "
+              f"{result['errors']} errors")
+        for clause in result['clauses']:
+            print(f"  {clause['total_ms']:>10.3f}ms total {clause['mean_ms']:>9.3f}ms mean  {clause['clause']}")
+            print(f"  {'':>36}{clause['example']}")
+
+
+# Usage
+#   python profile_templates.py --host https://<domain> --corpus profile_corpus.jsonl --save-baseline baseline.json
+#   python profile_templates.py --host https://<domain> --corpus profile_corpus.jsonl --baseline baseline.json
+# Against the local stand-in (functional_tests/utilities/local_opensearch.py):
+#   python profile_templates.py --host http://127.0.0.1:9200 --no-ssl --corpus profile_corpus.jsonl \
+#       --templates "query_tempaltes,.json"
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Profile search templates and gate on p95 latency')
+    parser.add_argument('--host', required=True, help='Domain URL, e.g. https://<domain> or http://127.0.0.1:9200')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default=os.environ.get('OPENSEARCH_PASSWORD', ''))
+    parser.add_argument('--no-ssl', action='store_true', help='Plain HTTP, e.g. for the local stand-in')
+    parser.add_argument('--index', default='event-data-index', help='Index or alias searched')
+    parser.add_argument('--corpus', default=os.path.join(here, 'profile_corpus.jsonl'))
+    parser.add_argument('--templates', help='Templates file to deploy before profiling (changed templates only)')
+    parser.add_argument('--only', help='Comma-separated template ids')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--profile-samples', type=int, default=20)
+    parser.add_argument('--output', help='Write results as JSON')
+    parser.add_argument('--baseline', help='Baseline JSON to gate against')
+    parser.add_argument('--save-baseline', help='Write results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--max-p95-ms', type=float, help='Absolute p95 limit for every template')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manager = OpenSearchTemplateManager(
+        hosts=[args.host],
+        http_auth=(args.user, args.password),
+        use_ssl=not args.no_ssl,
+        verify_certs=not args.no_ssl
+    )
+    if args.templates:
+        with open(args.templates, 'r', encoding='utf-8') as f:
+            manager.deploy_templates(json.load(f))
+
+    corpus = load_corpus(args.corpus)
+    if args.only:
+        corpus = {template_id: corpus[template_id] for template_id in args.only.split(',')}
+    results = TemplateProfiler(manager, args.index, args.concurrency, args.repeat, args.profile_samples).run(corpus)
+    print_report(results)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    else:
+        baseline = {}
+    failures = check_regressions(results, baseline, args.tolerance, args.max_p95_ms)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
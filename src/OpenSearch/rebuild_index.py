@@ -0,0 +1,494 @@
+from opensearchpy import OpenSearch, RequestsHttpConnection, TransportError
+from opensearchpy import ConnectionError as OpenSearchConnectionError
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+# Readers search the alias; each full rebuild creates <alias>_v<n> and moves the alias onto it
+DEFAULT_ALIAS = "event-data-index"
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Parquet snapshot column -> document field, the reverse of SNAPSHOT_COLUMNS in
+# src/glue/load_data.py, so documents match what the stream writes from DynamoDB.
+# Must stay in sync with functional_tests/utilities/snapshot_reader.py
+SNAPSHOT_FIELDS = {
+    'name': 'Name',
+    'prefix': 'Prefix',
+    'first': 'First',
+    'middle': 'Middle',
+    'last': 'Last',
+    'suffix': 'Suffix',
+    'address_1': 'Address 1',
+    'address_2': 'Address 2',
+    'address_3': 'Address 3',
+    'address_4': 'Address 4',
+    'city': 'City',
+    'state_province': 'State / Province',
+    'country': 'Country',
+    'zip_code': 'Zip Code',
+    'open_data_flag': 'Open Data Flag',
+    'unique_entity_id': 'Unique Entity ID',
+    'exclusion_program': 'Exclusion Program',
+    'excluding_agency': 'Excluding Agency',
+    'ct_code': 'CT Code',
+    'exclusion_type': 'Exclusion Type',
+    'additional_comments': 'Additional Comments',
+    'active_date': 'Active Date',
+    'termination_date': 'Termination Date',
+    'record_status': 'Record Status',
+    'cross_reference': 'Cross-Reference',
+    'sam_number': 'SAM Number',
+    'cage': 'CAGE',
+    'npi': 'NPI',
+    'creation_date': 'Creation_Date',
+    'classification': 'Classification'
+}
+SNAPSHOT_DROP_COLUMNS = ('load_date', 'row_hash')
+
+
+def iter_snapshot_documents(path: str, load_date: Optional[str] = None, batch_size: int = 10000) -> Iterator[Dict]:
+    """
+    Streams documents from the Glue job's Parquet snapshot (local path or s3://), one record
+    batch at a time. The snapshot is partitioned by classification and load_date; only the
+    given load_date is read, the latest one by default.
+    """
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    if 'load_date' in dataset.schema.names:
+        if load_date is None:
+            load_date = max(dataset.to_table(columns=['load_date']).column('load_date').to_pylist())
+        dataset = dataset.filter(ds.field('load_date') == load_date)
+    for batch in dataset.to_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            # DynamoDB items carry no null attributes, so neither do the documents
+            yield {SNAPSHOT_FIELDS.get(k, k): v for k, v in row.items()
+                   if v is not None and k not in SNAPSHOT_DROP_COLUMNS}
+
+
+def iter_jsonl_documents(path: str) -> Iterator[Dict]:
+    # One document per line, e.g. OpenSearchClient.export_to_jsonl of the current index
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class OpenSearchIndexBuilder:
+    def __init__(
+            self,
+            hosts: list[str],
+            http_auth: tuple[str, str],
+            alias: str = DEFAULT_ALIAS,
+            use_ssl: bool = True,
+            verify_certs: bool = True,
+            logger: Optional[logging.Logger] = None
+    ):
+        """
+        Blue/green full rebuilds: documents are bulk loaded into a new versioned index that no
+        reader sees, tuned for indexing (no replicas, no refresh), then the index is merged,
+        given its replicas back and swapped in behind the read alias in one atomic request.
+
+        Args:
+            hosts: OpenSearch domain URLs
+            http_auth: (user, password) for basic auth
+            alias: Alias readers search; versions are named <alias>_v<n>
+        """
+        connection = dict(
+            hosts=hosts,
+            http_auth=http_auth,
+            use_ssl=use_ssl,
+            verify_certs=verify_certs,
+            connection_class=RequestsHttpConnection,
+            timeout=60
+        )
+        self.client = OpenSearch(retry_on_status=RETRY_STATUSES, **connection)
+        # _bulk retries back off in bulk_load, so its client must not retry immediately
+        self.bulk_client = OpenSearch(max_retries=0, **connection)
+        self.alias = alias
+        self.logger = logger or logging.getLogger(__name__)
+        self._version_pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+
+    def versions(self) -> List[Tuple[int, str]]:
+        """
+        Returns:
+            Sorted (version, index name) pairs of the existing <alias>_v<n> indices
+        """
+        indices = self.client.indices.get(index=f"{self.alias}_v*")
+        found = []
+        for name in indices:
+            match = self._version_pattern.match(name)
+            if match:
+                found.append((int(match.group(1)), name))
+        return sorted(found)
+
+    def alias_targets(self) -> List[str]:
+        # Before the first swap the alias does not exist and the response is a 404 body
+        response = self.client.indices.get_alias(name=self.alias, params={'ignore': 404})
+        return sorted(name for name, info in response.items() if isinstance(info, dict) and 'aliases' in info)
+
+    def next_index_name(self) -> str:
+        versions = self.versions()
+        return f"{self.alias}_v{versions[-1][0] + 1 if versions else 1}"
+
+    def create_index(self, name: str, template_index: Optional[str] = None, shards: Optional[int] = None) -> Dict:
+        """
+        Creates the index with replicas=0 and refresh disabled. Mappings, analysis and the
+        shard count are copied from template_index, normally the index the alias points at.
+
+        Returns:
+            The template index's replica count and refresh interval, to restore after loading
+        """
+        mappings, settings = {}, {}
+        if template_index:
+            metadata = self.client.indices.get(index=template_index)[template_index]
+            mappings = metadata.get('mappings', {})
+            settings = metadata.get('settings', {}).get('index', {})
+        index_settings = {
+            'number_of_shards': shards or int(settings.get('number_of_shards', 1)),
+            'number_of_replicas': 0,
+            'refresh_interval': '-1'
+        }
+        if 'analysis' in settings:
+            index_settings['analysis'] = settings['analysis']
+        self.client.indices.create(index=name, body={'settings': {'index': index_settings}, 'mappings': mappings})
+        self.logger.info(f"Created {name} from {template_index or 'dynamic mappings'} "
+                         f"({index_settings['number_of_shards']} shards)")
+        return {
+            'number_of_replicas': int(settings.get('number_of_replicas', 1)),
+            'refresh_interval': settings.get('refresh_interval', '1s')
+        }
+
+    def bulk_load(
+            self,
+            index: str,
+            documents: Iterable[Dict],
+            workers: int = 4,
+            batch_docs: int = 1000,
+            batch_bytes: int = 5 * 1024 * 1024,
+            max_retries: int = 8,
+            id_field: str = 'id'
+    ) -> Dict[str, Any]:
+        """
+        Loads documents with parallel _bulk requests.
+
+        Batches are cut at batch_docs documents or batch_bytes of NDJSON. At most two batches
+        per worker are queued, so reading the source waits for the cluster instead of filling
+        memory. Rejected requests (429 and 5xx) and rejected items are retried with exponential
+        backoff, and every worker pauses for the backoff, so the cluster's write queue can
+        drain. Documents are indexed under their id, which makes retries idempotent.
+
+        Returns:
+            Dict with indexed (distinct ids written), failed, retries, seconds and the first errors
+        """
+        stats = {'indexed': 0, 'failed': 0, 'retries': 0, 'errors': []}
+        # A retried request may re-write documents whose first write succeeded, so successes
+        # are counted by id to compare with the index's count afterwards
+        indexed_ids = set()
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(workers * 2)
+        pause_until = [0.0]
+
+        def back_off(attempt: int):
+            delay = min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+            with lock:
+                stats['retries'] += 1
+                pause_until[0] = max(pause_until[0], time.monotonic() + delay)
+
+        def send(lines: List[str]):
+            try:
+                attempt = 0
+                while lines:
+                    wait = pause_until[0] - time.monotonic()
+                    if wait > 0:
+                        time.sleep(wait)
+                    try:
+                        response = self.bulk_client.bulk(
+                            index=index, body=''.join(lines),
+                            params={'filter_path': 'errors,items.*._id,items.*.status,items.*.error'})
+                    except TransportError as e:
+                        retryable = e.status_code in RETRY_STATUSES or isinstance(e, OpenSearchConnectionError)
+                        if retryable and attempt < max_retries:
+                            back_off(attempt)
+                            attempt += 1
+                            continue
+                        raise
+                    items = response.get('items', [])
+                    rejected, failed, succeeded = [], 0, []
+                    for position, item in enumerate(items):
+                        result = next(iter(item.values()))
+                        if 'error' not in result:
+                            succeeded.append(result['_id'])
+                            continue
+                        if result.get('status') in RETRY_STATUSES and attempt < max_retries:
+                            rejected.extend(lines[position * 2:position * 2 + 2])
+                        else:
+                            failed += 1
+                            with lock:
+                                if len(stats['errors']) < 10:
+                                    stats['errors'].append(result['error'])
+                    with lock:
+                        indexed_ids.update(succeeded)
+                        stats['failed'] += failed
+                    if rejected:
+                        back_off(attempt)
+                        attempt += 1
+                    lines = rejected
+            except Exception as e:
+                with lock:
+                    stats['failed'] += len(lines) // 2
+                    stats['errors'].append(str(e))
+                self.logger.error(f"Bulk request to {index} failed: {e}")
+            finally:
+                slots.release()
+
+        started = time.time()
+        last_report = started
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            batch, size = [], 0
+            for doc in documents:
+                action = json.dumps({'index': {'_id': doc[id_field]}}) + '\n'
+                source = json.dumps(doc) + '\n'
+                batch.extend((action, source))
+                size += len(action) + len(source)
+                if len(batch) // 2 >= batch_docs or size >= batch_bytes:
+                    slots.acquire()
+                    executor.submit(send, batch)
+                    batch, size = [], 0
+                    if time.time() - last_report > 10:
+                        last_report = time.time()
+                        self.logger.info(f"{len(indexed_ids)} documents indexed into {index}, "
+                                         f"{stats['failed']} failed, {stats['retries']} retries")
+            if batch:
+                slots.acquire()
+                executor.submit(send, batch)
+        stats['indexed'] = len(indexed_ids)
+        stats['seconds'] = round(time.time() - started, 2)
+        return stats
+
+    def finalize(self, index: str, replicas: int, refresh_interval: str, max_num_segments: int = 1,
+                 timeout: str = '30m'):
+        """
+        Merges the loaded index down before replicas exist, so each replica copies merged
+        segments instead of merging on its own, then restores replicas and refresh and waits
+        for the replicas to be allocated.
+        """
+        started = time.time()
+        self.client.indices.forcemerge(index=index, params={'max_num_segments': max_num_segments,
+                                                            'request_timeout': 3600})
+        self.logger.info(f"Force-merged {index} to {max_num_segments} segment(s) in {time.time() - started:.1f}s")
+        self.client.indices.put_settings(index=index, body={'index': {
+            'number_of_replicas': replicas,
+            'refresh_interval': refresh_interval
+        }})
+        self.client.indices.refresh(index=index)
+        health = self.client.cluster.health(index=index, params={
+            'wait_for_status': 'green', 'timeout': timeout, 'request_timeout': 3600})
+        if health.get('status') != 'green':
+            raise RuntimeError(f"{index} did not reach green within {timeout}: {health.get('status')}")
+
+    def swap_alias(self, index: str) -> List[str]:
+        """
+        Moves the alias onto index in one _aliases request, so every search sees either the
+        old index or the new one. The new index becomes the alias's write index.
+
+        Returns:
+            The indices the alias was removed from
+        """
+        previous = [name for name in self.alias_targets() if name != index]
+        actions = [{'remove': {'index': name, 'alias': self.alias}} for name in previous]
+        actions.append({'add': {'index': index, 'alias': self.alias, 'is_write_index': True}})
+        self.client.indices.update_aliases(body={'actions': actions})
+        self.logger.info(f"Alias {self.alias} now points at {index} (was {', '.join(previous) or 'unset'})")
+        return previous
+
+    def delete_old_versions(self, keep: int = 1, rollback: Iterable[str] = ()) -> List[str]:
+        """
+        Deletes versions the alias does not point at, except `keep` to swap back to: the
+        rollback indices first (those the alias was just moved off), then the newest others.
+        Builds that were never swapped in, e.g. after a failed load, go first.
+        """
+        live = set(self.alias_targets())
+        old = [name for _, name in self.versions() if name not in live]
+        rollback = [name for name in rollback if name in old]
+        ranked = rollback + [name for name in reversed(old) if name not in rollback]
+        deleted = ranked[keep:]
+        for name in deleted:
+            self.client.indices.delete(index=name)
+            self.logger.info(f"Deleted {name}")
+        return deleted
+
+    def migrate_to_alias(self, timeout: str = '30m') -> Optional[str]:
+        """
+        One-time move from a concrete index named like the alias to <alias>_v1 behind the
+        alias. The concrete index is write-blocked, so writes fail instead of being lost, and
+        copied with _reindex; once the copy is merged, replicated and its count matches, the
+        concrete index is deleted and the alias added in one _aliases request, so searches
+        never find the name missing. Safe to run on every deploy: it does nothing once the
+        alias exists or when neither exists (the first rebuild then creates the alias).
+
+        Returns:
+            The index the alias now points at, or None when nothing was migrated
+        """
+        if self.alias_targets() or not self.client.indices.exists(index=self.alias):
+            return None
+        source_count = self.client.count(index=self.alias)['count']
+        index = self.next_index_name()
+        restore = self.create_index(index, template_index=self.alias)
+        self.client.indices.put_settings(index=self.alias, body={'index': {'blocks.write': True}})
+        try:
+            started = time.time()
+            response = self.client.reindex(
+                body={'source': {'index': self.alias}, 'dest': {'index': index}},
+                params={'slices': 'auto', 'wait_for_completion': 'true', 'request_timeout': 3600})
+            if response.get('failures'):
+                raise RuntimeError(f"Reindex of {self.alias} into {index} failed: {response['failures'][:3]}")
+            self.logger.info(f"Reindexed {response.get('total')} documents from {self.alias} into {index} "
+                             f"in {time.time() - started:.1f}s")
+            self.finalize(index, restore['number_of_replicas'], restore['refresh_interval'], timeout=timeout)
+            count = self.client.count(index=index)['count']
+            if count != source_count:
+                raise RuntimeError(f"{index} holds {count} documents but {self.alias} holds {source_count}")
+        except Exception:
+            # Leave the concrete index serving and writable; the partial copy is kept for inspection
+            self.client.indices.put_settings(index=self.alias, body={'index': {'blocks.write': False}})
+            raise
+        self.client.indices.update_aliases(body={'actions': [
+            {'remove_index': {'index': self.alias}},
+            {'add': {'index': index, 'alias': self.alias, 'is_write_index': True}}
+        ]})
+        self.logger.info(f"Replaced index {self.alias} with alias {self.alias} -> {index}")
+        return index
+
+    def rebuild(
+            self,
+            documents: Iterable[Dict],
+            workers: int = 4,
+            batch_docs: int = 1000,
+            batch_bytes: int = 5 * 1024 * 1024,
+            shards: Optional[int] = None,
+            replicas: Optional[int] = None,
+            max_errors: int = 0,
+            swap: bool = True,
+            keep: int = 1
+    ) -> Dict[str, Any]:
+        """
+        Builds the next version from documents and swaps the alias onto it.
+
+        The alias is only moved once the load finished with at most max_errors failed
+        documents and the new index's count matches; otherwise the new index is left in
+        place, unaliased, for inspection.
+
+        Returns:
+            Summary with the new index, load stats and stage timings
+        """
+        timings = {}
+        live = self.alias_targets()
+        index = self.next_index_name()
+        restore = self.create_index(index, template_index=live[0] if live else None, shards=shards)
+        if replicas is not None:
+            restore['number_of_replicas'] = replicas
+
+        started = time.time()
+        stats = self.bulk_load(index, documents, workers=workers, batch_docs=batch_docs, batch_bytes=batch_bytes)
+        timings['load'] = round(time.time() - started, 2)
+        rate = stats['indexed'] / stats['seconds'] if stats['seconds'] else 0
+        self.logger.info(f"Loaded {stats['indexed']} documents into {index} in {stats['seconds']}s "
+                         f"({rate:.0f}/s), {stats['failed']} failed, {stats['retries']} retries")
+        if stats['failed'] > max_errors:
+            raise RuntimeError(f"{stats['failed']} documents failed to load into {index}, alias not moved: "
+                               f"{stats['errors'][:3]}")
+
+        started = time.time()
+        self.finalize(index, restore['number_of_replicas'], restore['refresh_interval'])
+        timings['finalize'] = round(time.time() - started, 2)
+
+        count = self.client.count(index=index)['count']
+        if count != stats['indexed']:
+            raise RuntimeError(f"{index} holds {count} documents but {stats['indexed']} were loaded, alias not moved")
+
+        summary = {'index': index, 'documents': count, 'load': stats, 'timings': timings, 'swapped': False}
+        if swap:
+            summary['previous'] = self.swap_alias(index)
+            summary['swapped'] = True
+            summary['deleted'] = self.delete_old_versions(keep, rollback=summary['previous'])
+        return summary
+
+
+# Usage
+#   Replace the concrete event-data-index with the alias (run by buildspec.yml on every deploy,
+#   a no-op once the alias exists); pause the DynamoDB stream pipeline while it copies
+#     python rebuild_index.py --host https://<domain> --migrate
+#   Full rebuild from the Glue job's Parquet snapshot (latest load_date)
+#     python rebuild_index.py --host https://<domain> --snapshot s3://<bucket>/snapshot/ --workers 8
+#   Roll back to the previous version
+#     python rebuild_index.py --host https://<domain> --swap-to event-data-index_v2
+#
+# Stream updates that arrive while a rebuild is loading go to the old index, so pause the
+# DynamoDB stream pipeline for the rebuild or rebuild from a snapshot taken after it resumes.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rebuild the search index as a new version and swap the alias')
+    parser.add_argument('--host', required=True, help='Domain URL, e.g. https://<domain> or http://127.0.0.1:9200')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default=os.environ.get('OPENSEARCH_PASSWORD', ''))
+    parser.add_argument('--no-ssl', action='store_true', help='Plain HTTP, e.g. for the local stand-in')
+    parser.add_argument('--alias', default=DEFAULT_ALIAS)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--snapshot', help='Parquet snapshot written by the Glue job (parquet_output_path)')
+    source.add_argument('--jsonl', help='JSON Lines documents, e.g. an export of the current index')
+    source.add_argument('--swap-to', help='Only point the alias at an existing index')
+    source.add_argument('--migrate', action='store_true',
+                        help='Replace a concrete index named like the alias with <alias>_v1 behind the alias')
+    parser.add_argument('--load-date', help='Snapshot load_date partition, default the latest')
+    parser.add_argument('--workers', type=int, default=4, help='Parallel _bulk requests')
+    parser.add_argument('--batch-docs', type=int, default=1000)
+    parser.add_argument('--batch-mb', type=float, default=5.0)
+    parser.add_argument('--shards', type=int, help='Primary shards, default same as the current index')
+    parser.add_argument('--replicas', type=int, help='Replicas to restore, default same as the current index')
+    parser.add_argument('--max-errors', type=int, default=0, help='Failed documents tolerated before aborting')
+    parser.add_argument('--no-swap', action='store_true', help='Build and verify the index without moving the alias')
+    parser.add_argument('--keep', type=int, default=1, help='Previous versions kept for rollback')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('opensearch').setLevel(logging.WARNING)
+    builder = OpenSearchIndexBuilder(
+        hosts=[args.host],
+        http_auth=(args.user, args.password),
+        alias=args.alias,
+        use_ssl=not args.no_ssl,
+        verify_certs=not args.no_ssl
+    )
+
+    try:
+        if args.migrate:
+            migrated = builder.migrate_to_alias()
+            print(f"Alias {args.alias} -> {migrated}" if migrated else f"Nothing to migrate for {args.alias}")
+        elif args.swap_to:
+            builder.swap_alias(args.swap_to)
+        else:
+            if args.snapshot:
+                documents = iter_snapshot_documents(args.snapshot, args.load_date)
+            else:
+                documents = iter_jsonl_documents(args.jsonl)
+            summary = builder.rebuild(
+                documents,
+                workers=args.workers,
+                batch_docs=args.batch_docs,
+                batch_bytes=int(args.batch_mb * 1024 * 1024),
+                shards=args.shards,
+                replicas=args.replicas,
+                max_errors=args.max_errors,
+                swap=not args.no_swap,
+                keep=args.keep
+            )
+            print(json.dumps(summary, indent=2, default=str))
+    except Exception as e:
+        print(f"Failed to rebuild index: {str(e)}")
+        raise SystemExit(1)
@@ -1,4 +1,10 @@
 import sys
+import json
+import time
+import random
+import boto3
+from botocore.exceptions import ClientError
+from datetime import datetime, timezone
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
 from pyspark.context import SparkContext
@@ -9,12 +15,343 @@ from pyspark.sql.functions import (
     col,
     regexp_replace,
     trim,
-    current_timestamp
+    current_timestamp,
+    sha2,
+    concat_ws,
+    coalesce,
+    lit,
+    when,
+    count,
+    countDistinct,
+    lower,
+    translate,
+    split,
+    soundex,
+    array_sort,
+    array_join,
+    array_distinct,
+    filter as array_filter,
+    transform as array_transform,
+    udf
 )
-from pyspark.sql.types import StringType
+from pyspark.sql.types import StringType, ArrayType
+from pyspark import StorageLevel
+# Shipped with --extra-py-files from functional_tests/utilities/name_keys.py, so the job and the
+# screening clients derive name keys and aliases from the same code
+from name_keys import ACCENTED_CHARS, UNACCENTED_CHARS, parse_aliases
+
+
+def get_optional_args(argv, defaults):
+    """
+    Resolves optional job arguments. getResolvedOptions fails on arguments that were not
+    passed, so only the ones present in argv are resolved and the rest keep their defaults.
+    """
+    resolved = dict(defaults)
+    present = [name for name in defaults if f"--{name}" in argv]
+    if present:
+        resolved.update(getResolvedOptions(argv, present))
+    return resolved
+
+
+stage_timings = []
+
+
+def start_stage(name):
+    """
+    Prints the stage header and closes the timing of the previous stage. Spark is lazy, so a
+    stage's time includes whatever work its actions (count, write) force from earlier stages.
+    """
+    now = time.time()
+    if stage_timings:
+        previous = stage_timings[-1]
+        previous['seconds'] = now - previous['start']
+        print(f"   {previous['name']} took {previous['seconds']:.1f}s")
+    if name:
+        print(name)
+        stage_timings.append({'name': name, 'start': now})
+
+
+def split_s3_path(path):
+    bucket, _, key = path.replace("s3://", "", 1).partition("/")
+    return bucket, key
+
+
+def normalize_name_expr(name):
+    """
+    Folds a name column for exact matching: diacritics to ASCII, lower case, apostrophes
+    dropped ("O'Brien" -> "obrien"), any other punctuation or leftover quotes to a space,
+    and whitespace collapsed.
+    """
+    folded = lower(translate(name, ACCENTED_CHARS, UNACCENTED_CHARS))
+    folded = regexp_replace(folded, "['`\u2019]", "")
+    folded = regexp_replace(folded, "[^a-z0-9]+", " ")
+    return trim(folded)
+
+
+def add_name_keys(frame):
+    """
+    Adds precomputed name keys so searches can use term lookups before falling back to fuzzy
+    matching. Entity rows only carry the Name column, so it is preferred when present.
+
+        name_norm     - normalized full name
+        name_tokens   - distinct tokens of name_norm
+        name_key      - sorted tokens joined by a space, an order-insensitive exact key
+        name_phonetic - Soundex code of each token
+
+    Soundex is used because it is built into Spark and runs without a Python UDF; the
+    screening clients compute the same codes for the query side.
+    """
+    source = concat_ws(" ", *[col(c) for c in ("First", "Middle", "Last") if c in frame.columns])
+    if "Name" in frame.columns:
+        source = when(col("Name").isNotNull() & (col("Name") != ""), col("Name")).otherwise(source)
+
+    frame = frame.withColumn("name_norm", normalize_name_expr(source))
+    tokens = array_distinct(array_filter(split(col("name_norm"), " "), lambda t: t != ""))
+    return frame \
+        .withColumn("name_tokens", tokens) \
+        .withColumn("name_key", array_join(array_sort(tokens), " ")) \
+        .withColumn("name_phonetic", array_distinct(array_transform(tokens, lambda t: soundex(t))))
+
+
+def add_aliases(frame):
+    """
+    Expands the Cross-Reference free text into structured alias fields so an alias hit is a
+    keyword term lookup rather than a fuzzy scan over the whole text.
+
+        aliases        - parsed aliases (see parse_aliases)
+        alias_keys     - name_key of each alias (sorted normalized tokens)
+        alias_phonetic - sorted Soundex codes of each alias, joined by a space
+    """
+    if "Cross-Reference" not in frame.columns:
+        return frame
+    parse_aliases_udf = udf(parse_aliases, ArrayType(StringType()))
+    frame = frame.withColumn("aliases", parse_aliases_udf(col("`Cross-Reference`")))
+
+    def alias_tokens(alias):
+        return array_filter(split(normalize_name_expr(alias), " "), lambda t: t != "")
+
+    return frame \
+        .withColumn("alias_keys", array_distinct(array_filter(
+            array_transform(col("aliases"), lambda a: array_join(array_sort(array_distinct(alias_tokens(a))), " ")),
+            lambda k: k != ""))) \
+        .withColumn("alias_phonetic", array_distinct(array_filter(
+            array_transform(col("aliases"), lambda a: array_join(
+                array_sort(array_distinct(array_transform(alias_tokens(a), lambda t: soundex(t)))), " ")),
+            lambda k: k != "")))
+
+
+# DynamoDB error codes that mean "slow down" rather than a bad request
+THROTTLE_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded')
+BATCH_WRITE_SIZE = 25
+MAX_BATCH_RETRIES = 10
+MIN_WRITE_RATE = 1.0
+
+
+def to_attribute_value(value):
+    if isinstance(value, (list, tuple)):
+        return {'L': [to_attribute_value(v) for v in value if v is not None]}
+    return {'S': str(value)}
+
+
+def to_write_request(row):
+    item = {k: to_attribute_value(v) for k, v in row.asDict().items() if v is not None}
+    return {'PutRequest': {'Item': item}}
+
+
+def to_delete_request(row):
+    return {'DeleteRequest': {'Key': {'id': {'S': row['id']}}}}
+
+
+def busiest_capacity_units(consumed_capacity):
+    """
+    Capacity units consumed on the busiest of the table and its GSIs, from a ConsumedCapacity
+    entry returned with ReturnConsumedCapacity='INDEXES'. The write budget is per table and per
+    index, so this is what pacing compares against it; the entry's CapacityUnits is their sum.
+    """
+    units = [consumed_capacity.get('Table', {}).get('CapacityUnits', 0)]
+    units += [gsi.get('CapacityUnits', 0) for gsi in consumed_capacity.get('GlobalSecondaryIndexes', {}).values()]
+    return max(units)
+
+
+def adaptive_batch_write(rows, table_name, region, to_request, initial_rate, max_rate):
+    """
+    Writes one partition with 25-item BatchWriteItem calls, pacing on consumed write capacity.
+
+    The rate (capacity units per second) follows additive-increase/multiplicative-decrease:
+    it grows by a fixed step after every fully processed batch and halves whenever DynamoDB
+    throttles or returns UnprocessedItems. Unprocessed items are retried with exponential
+    backoff and full jitter.
+
+    Yields a single stats dict for the partition.
+    """
+    client = boto3.client('dynamodb', region_name=region)
+    rate = initial_rate
+    step = max(initial_rate * 0.1, 1.0)
+    stats = {'items': 0, 'batches': 0, 'throttles': 0, 'consumed': 0.0}
+
+    def send(requests):
+        nonlocal rate
+        pending = requests
+        attempt = 0
+        while pending:
+            if attempt > MAX_BATCH_RETRIES:
+                raise RuntimeError(f"Gave up on {len(pending)} items after {MAX_BATCH_RETRIES} retries")
+            if attempt:
+                time.sleep(random.uniform(0, min(0.05 * 2 ** attempt, 10)))
+            started = time.time()
+            try:
+                response = client.batch_write_item(
+                    RequestItems={table_name: pending},
+                    ReturnConsumedCapacity='INDEXES'
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] not in THROTTLE_ERRORS:
+                    raise
+                stats['throttles'] += 1
+                rate = max(rate / 2, MIN_WRITE_RATE)
+                attempt += 1
+                continue
+
+            consumed_capacity = response.get('ConsumedCapacity', [])
+            consumed = sum(c.get('CapacityUnits', 0) for c in consumed_capacity)
+            paced = sum(busiest_capacity_units(c) for c in consumed_capacity)
+            unprocessed = response.get('UnprocessedItems', {}).get(table_name, [])
+            stats['items'] += len(pending) - len(unprocessed)
+            stats['batches'] += 1
+            stats['consumed'] += consumed
+            if unprocessed:
+                stats['throttles'] += 1
+                rate = max(rate / 2, MIN_WRITE_RATE)
+                attempt += 1
+            else:
+                rate = min(rate + step, max_rate)
+            pending = unprocessed
+
+            # Pace so this partition consumes at most `rate` capacity units per second on the
+            # table and on each of its indexes
+            delay = paced / rate - (time.time() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+    started = time.time()
+    batch = []
+    for row in rows:
+        batch.append(to_request(row))
+        if len(batch) == BATCH_WRITE_SIZE:
+            send(batch)
+            batch = []
+    if batch:
+        send(batch)
+    stats['seconds'] = time.time() - started
+    stats['final_rate'] = rate
+    yield stats
+
+
+def get_write_capacity(table_name, region):
+    """
+    Returns the provisioned write capacity the writer can use, which is the smallest of the
+    table and its GSIs since every put also writes each index. Returns 0 for on-demand tables.
+    """
+    table = boto3.client('dynamodb', region_name=region).describe_table(TableName=table_name)['Table']
+    if table.get('BillingModeSummary', {}).get('BillingMode') == 'PAY_PER_REQUEST':
+        return 0
+    capacities = [table['ProvisionedThroughput']['WriteCapacityUnits']]
+    capacities += [gsi['ProvisionedThroughput']['WriteCapacityUnits'] for gsi in table.get('GlobalSecondaryIndexes', [])]
+    return min(capacities)
+
+
+def write_to_dynamodb(frame, to_request, label):
+    """
+    Writes a DataFrame with adaptive_batch_write across write_partitions parallel tasks and
+    prints the achieved throughput.
+    """
+    partitions = int(args['write_partitions']) if args['write_partitions'] else sc.defaultParallelism
+    capacity = get_write_capacity(args['dynamodb_table'], args['region'])
+    write_percent = float(args['write_percent'])
+    if capacity:
+        # Every partition writes at least MIN_WRITE_RATE, so more partitions than that allows
+        # would keep the table throttled however far each one backs off
+        partitions = max(1, min(partitions, int(capacity // MIN_WRITE_RATE)))
+        # Provisioned: start at write_percent of capacity and allow ramping into burst capacity
+        initial_rate = capacity * write_percent / partitions
+        max_rate = capacity * 2 / partitions
+    else:
+        initial_rate = float(args['max_write_rate']) * write_percent / partitions
+        max_rate = float(args['max_write_rate']) / partitions
+    initial_rate = max(initial_rate, MIN_WRITE_RATE)
+    max_rate = max(max_rate, initial_rate)
+    print(f"{label}: {partitions} partitions, capacity {capacity or 'on-demand'}, "
+          f"initial {initial_rate:.1f} WCU/s and max {max_rate:.1f} WCU/s per partition")
+
+    table_name = args['dynamodb_table']
+    region = args['region']
+    started = time.time()
+    results = frame.repartition(partitions).rdd.mapPartitions(
+        lambda rows: adaptive_batch_write(rows, table_name, region, to_request, initial_rate, max_rate)
+    ).collect()
+    elapsed = time.time() - started
+
+    items = sum(r['items'] for r in results)
+    throttles = sum(r['throttles'] for r in results)
+    consumed = sum(r['consumed'] for r in results)
+    print(f"{label}: {items} items in {elapsed:.1f}s ({items / elapsed if elapsed else 0:.1f} items/sec), "
+          f"{consumed:.0f} WCU consumed, {throttles} throttled batches")
+    return items
+
+
+# Stable column layout of the Parquet snapshot: source CSV column -> snapshot column. Every column
+# is a string and missing source columns are written as nulls, so readers can rely on the schema.
+SNAPSHOT_COLUMNS = [
+    ('id', 'id'),
+    ('Name', 'name'),
+    ('Prefix', 'prefix'),
+    ('First', 'first'),
+    ('Middle', 'middle'),
+    ('Last', 'last'),
+    ('Suffix', 'suffix'),
+    ('Address 1', 'address_1'),
+    ('Address 2', 'address_2'),
+    ('Address 3', 'address_3'),
+    ('Address 4', 'address_4'),
+    ('City', 'city'),
+    ('State / Province', 'state_province'),
+    ('Country', 'country'),
+    ('Zip Code', 'zip_code'),
+    ('Open Data Flag', 'open_data_flag'),
+    ('Unique Entity ID', 'unique_entity_id'),
+    ('Exclusion Program', 'exclusion_program'),
+    ('Excluding Agency', 'excluding_agency'),
+    ('CT Code', 'ct_code'),
+    ('Exclusion Type', 'exclusion_type'),
+    ('Additional Comments', 'additional_comments'),
+    ('Active Date', 'active_date'),
+    ('Termination Date', 'termination_date'),
+    ('Record Status', 'record_status'),
+    ('Cross-Reference', 'cross_reference'),
+    ('SAM Number', 'sam_number'),
+    ('CAGE', 'cage'),
+    ('NPI', 'npi'),
+    ('Creation_Date', 'creation_date'),
+    ('Classification', 'classification')
+]
+SNAPSHOT_KEY_COLUMNS = ['name_norm', 'name_key']
+SNAPSHOT_ARRAY_COLUMNS = ['name_tokens', 'name_phonetic', 'aliases', 'alias_keys', 'alias_phonetic']
+
+
+def to_snapshot_frame(frame, load_date):
+    columns = [
+        (col(f"`{source}`") if source in frame.columns else lit(None)).cast(StringType()).alias(target)
+        for source, target in SNAPSHOT_COLUMNS + [(c, c) for c in SNAPSHOT_KEY_COLUMNS]
+    ]
+    columns += [
+        (col(c) if c in frame.columns else lit(None)).cast(ArrayType(StringType())).alias(c)
+        for c in SNAPSHOT_ARRAY_COLUMNS
+    ]
+    return frame.select(*columns, lit(load_date).alias("load_date"))
+
 
 # -----------------------------------
-print("1. Retrieve Job Arguments")
+start_stage("1. Retrieve Job Arguments")
 # -----------------------------------
 args = getResolvedOptions(sys.argv, [
     'JOB_NAME',
@@ -29,10 +366,49 @@ print(f"s3_input_path: {args['s3_input_path']}")
 print(f"dynamodb_table: {args['dynamodb_table']}")
 print(f"region: {args['region']}")
 print(f"opensearch_domain: {args['opensearch_domain']}")
+
+# Optional arguments:
+#   shard_manifest - manifest of CSV shards written by the SAM.gov pull Lambda. When present the
+#                    shards are read instead of s3_input_path so parsing is spread across executors.
+#   incremental    - 'true' to write only the inserts/updates/deletes since the previous snapshot
+#   snapshot_path  - S3 prefix holding the cleaned snapshots used for the incremental diff
+#   delete_mode    - 'delete' removes records dropped from the source, 'tombstone' marks them deleted
+#   dynamodb_writer  - 'adaptive' for the rate-aware BatchWriteItem writer, 'glue' for the Glue connector
+#   write_percent    - share of write capacity to start at (the Glue connector's fixed setting)
+#   write_partitions - number of parallel writer tasks, defaults to the cluster parallelism
+#   max_write_rate   - ceiling in WCU/s for on-demand tables, which report no capacity
+#   parquet_output_path - S3 prefix for a Parquet snapshot of the cleaned data, partitioned by
+#                         classification and load_date; empty to skip
+args.update(get_optional_args(sys.argv, {
+    'shard_manifest': '',
+    'incremental': 'false',
+    'snapshot_path': '',
+    'delete_mode': 'delete',
+    'dynamodb_writer': 'adaptive',
+    'write_percent': '0.5',
+    'write_partitions': '',
+    'max_write_rate': '4000',
+    'parquet_output_path': ''
+}))
+incremental = args['incremental'].lower() == 'true'
+if incremental and not args['snapshot_path']:
+    raise ValueError("snapshot_path is required when incremental is enabled.")
+if args['delete_mode'] not in ('delete', 'tombstone'):
+    raise ValueError(f"Unsupported delete_mode: {args['delete_mode']}")
+if args['dynamodb_writer'] not in ('adaptive', 'glue'):
+    raise ValueError(f"Unsupported dynamodb_writer: {args['dynamodb_writer']}")
+
+print(f"shard_manifest: {args['shard_manifest']}")
+print(f"incremental: {incremental}")
+print(f"snapshot_path: {args['snapshot_path']}")
+print(f"delete_mode: {args['delete_mode']}")
+print(f"dynamodb_writer: {args['dynamodb_writer']}")
+print(f"write_percent: {args['write_percent']}")
+print(f"parquet_output_path: {args['parquet_output_path']}")
 print("")
 
 # -----------------------------------
-print("2. Initialize Spark and Glue Contexts")
+start_stage("2. Initialize Spark and Glue Contexts")
 # -----------------------------------
 sc = SparkContext()
 glueContext = GlueContext(sc)
@@ -41,8 +417,17 @@ job = Job(glueContext)
 job.init(args['JOB_NAME'], args)
 
 # -----------------------------------
-print("3. Read Data Directly from S3 with Proper CSV Options")
+start_stage("3. Read Data Directly from S3 with Proper CSV Options")
 # -----------------------------------
+input_paths = args['s3_input_path']
+if args['shard_manifest']:
+    manifest_bucket, manifest_key = split_s3_path(args['shard_manifest'])
+    manifest_body = boto3.client('s3', region_name=args['region']).get_object(
+        Bucket=manifest_bucket, Key=manifest_key)['Body'].read()
+    manifest = json.loads(manifest_body)
+    input_paths = [f"s3://{manifest_bucket}/{shard['key']}" for shard in manifest['shards']]
+    print(f"Reading {len(input_paths)} shards ({manifest['total_rows']} rows) from {manifest['prefix']}")
+
 # Read all columns as strings to simplify cleaning
 datasource = spark.read.format("csv") \
     .option("header", "true") \
@@ -50,7 +435,7 @@ datasource = spark.read.format("csv") \
     .option("multiLine", "true") \
     .option("ignoreLeadingWhiteSpace", "true") \
     .option("ignoreTrailingWhiteSpace", "true") \
-    .load(args['s3_input_path'])
+    .load(input_paths)
 
 df = datasource
 
@@ -62,57 +447,175 @@ if "_c0" in df.columns:
     df = df.drop("_c0")
 
 # -----------------------------------
-print("4. Data Cleaning")
+start_stage("4. Data Cleaning")
 # -----------------------------------
-# Remove extra quotes and trim whitespace from all string columns
-string_cols = [f.name for f in df.schema.fields if f.dataType == StringType()]
-
-for c in string_cols:
-    # Remove double quotes and trim
-    df = df.withColumn(c, trim(regexp_replace(col(c), '"', '')))
-
 # Add an 'id' column from 'SAM Number' for DynamoDB key
 if "SAM Number" not in df.columns:
     raise ValueError("SAM Number column is missing. Cannot set key for DynamoDB.")
 
-df = df.withColumn("id", col("SAM Number"))
+# Remove extra quotes and trim whitespace from all string columns in a single projection,
+# rather than one withColumn per column which nests a projection per column in the plan
+string_cols = {f.name for f in df.schema.fields if f.dataType == StringType()}
+df = df.select(
+    *[trim(regexp_replace(col(f"`{c}`"), '"', '')).alias(c) if c in string_cols else col(f"`{c}`")
+      for c in df.columns],
+    trim(regexp_replace(col("`SAM Number`"), '"', '')).alias("id")
+)
+
+df = add_name_keys(df)
+df = add_aliases(df)
+
+# Persist the cleaned frame so the statistics pass and deduplication parse the CSV only once
+df = df.persist(StorageLevel.MEMORY_AND_DISK)
+cleaned = df
 
 # -----------------------------------
-print("5. Data Deduplication and Validation")
+start_stage("5. Data Deduplication and Validation")
 # -----------------------------------
-total_records_before = df.count()
+# One aggregation for all statistics instead of a full count before and after deduplication
+valid_id = col("id").isNotNull() & (col("id") != "")
+stats = df.agg(
+    count(lit(1)).alias("total"),
+    count(when(~valid_id | col("id").isNull(), 1)).alias("missing_id"),
+    countDistinct(when(valid_id, col("id"))).alias("unique_ids")
+).collect()[0]
+
+total_records_before = stats["total"]
 print(f"Total records before deduplication: {total_records_before}")
 
 # Filter out records with null or empty 'id'
-df = df.filter(col("id").isNotNull() & (trim(col("id")) != ""))
+df = df.filter(valid_id)
 
-# Drop duplicates based on 'id'
-df = df.dropDuplicates(['id'])
+# Drop duplicates based on 'id'. The result is persisted because it feeds several writes and
+# dropDuplicates may keep a different row per id each time it is recomputed. The persisted
+# frame is kept by name, since incremental runs replace df with a derived frame.
+deduplicated = df.dropDuplicates(['id']).persist(StorageLevel.MEMORY_AND_DISK)
+df = deduplicated
 
-total_records_after = df.count()
+total_records_after = stats["unique_ids"]
 print(f"Total records after deduplication: {total_records_after}")
+print(f"Records without an id removed: {stats['missing_id']}")
 
-duplicates_removed = total_records_before - total_records_after
+duplicates_removed = total_records_before - stats["missing_id"] - total_records_after
 print(f"Number of duplicate records removed: {duplicates_removed}")
 
 # -----------------------------------
-print("6. Write Cleaned Data to DynamoDB")
+start_stage("6. Compute Changes Against Previous Snapshot")
 # -----------------------------------
-dynamodb_frame = DynamicFrame.fromDF(df, glueContext, "dynamodb_frame")
+deletes = None
+cached_upserts = None
+if incremental:
+    # Hash every data column so changed records can be found without comparing column by column.
+    # Nulls are mapped to a marker so that null and empty string hash differently.
+    data_cols = sorted(c for c in df.columns if c != "id")
+    df = df.withColumn(
+        "row_hash",
+        sha2(concat_ws("\u0001", *[coalesce(col(f"`{c}`").cast(StringType()), lit("\u0000")) for c in data_cols]), 256)
+    )
 
-glueContext.write_dynamic_frame.from_options(
-    frame=dynamodb_frame,
-    connection_type="dynamodb",
-    connection_options={
-        "dynamodb.output.tableName": args['dynamodb_table'],
-        "dynamodb.throughput.write.percent": "0.5",
-        "dynamodb.region": args['region']
-    }
-)
+    s3 = boto3.client('s3', region_name=args['region'])
+    snapshot_bucket, snapshot_prefix = split_s3_path(args['snapshot_path'].rstrip("/"))
+    latest_pointer_key = f"{snapshot_prefix}/_LATEST"
+    try:
+        previous_path = s3.get_object(Bucket=snapshot_bucket, Key=latest_pointer_key)['Body'].read().decode('utf-8')
+    except s3.exceptions.NoSuchKey:
+        previous_path = None
+
+    if previous_path:
+        print(f"Diffing against previous snapshot: {previous_path}")
+        previous = spark.read.parquet(previous_path)
+        previous_hashes = previous.select(col("id").alias("prev_id"), col("row_hash").alias("prev_hash"))
+
+        # Inserts have no previous row, updates have a different hash; unchanged rows are dropped
+        changes = df.join(previous_hashes, df["id"] == previous_hashes["prev_id"], "left")
+        changes = changes.filter(col("prev_id").isNull() | (col("prev_hash") != col("row_hash")))
+        upserts = changes.drop("prev_id", "prev_hash")
+        deletes = previous.join(df.select("id"), "id", "left_anti")
+    else:
+        print("No previous snapshot found, writing all records")
+        upserts = df
+else:
+    upserts = df
+
+if incremental:
+    upserts = cached_upserts = upserts.cache()
+    upsert_count = upserts.count()
+    delete_count = deletes.count() if deletes is not None else 0
+    print(f"Records to insert or update: {upsert_count}")
+    print(f"Records to {args['delete_mode']}: {delete_count}")
+
+    if deletes is not None and args['delete_mode'] == 'tombstone' and delete_count:
+        # Tombstones go through the normal write so the stream carries them to OpenSearch
+        tombstones = deletes.withColumn("is_deleted", lit("true")) \
+            .withColumn("deleted_at", lit(datetime.now(timezone.utc).isoformat()))
+        upserts = upserts.unionByName(tombstones, allowMissingColumns=True)
+        deletes = None
+
+# -----------------------------------
+start_stage("7. Write Cleaned Data to DynamoDB")
+# -----------------------------------
+if args['dynamodb_writer'] == 'adaptive':
+    write_to_dynamodb(upserts.drop("row_hash"), to_write_request, "Upserts")
+else:
+    dynamodb_frame = DynamicFrame.fromDF(upserts.drop("row_hash"), glueContext, "dynamodb_frame")
+
+    glueContext.write_dynamic_frame.from_options(
+        frame=dynamodb_frame,
+        connection_type="dynamodb",
+        connection_options={
+            "dynamodb.output.tableName": args['dynamodb_table'],
+            "dynamodb.throughput.write.percent": args['write_percent'],
+            "dynamodb.region": args['region']
+        }
+    )
+
+if deletes is not None and args['delete_mode'] == 'delete':
+    write_to_dynamodb(deletes.select("id"), to_delete_request, "Deletes")
 
 # -----------------------------------
-print("7. Commit the Job")
+start_stage("8. Write Parquet Snapshot")
+# -----------------------------------
+if args['parquet_output_path']:
+    load_date = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    snapshot = to_snapshot_frame(df, load_date)
+
+    # Only the partitions being written are replaced, so earlier load dates are kept
+    spark.conf.set("spark.sql.sources.partitionOverwriteMode", "dynamic")
+    # One task per partition value keeps files few and large; sorting by id gives tight
+    # min/max statistics per row group for predicate pushdown on id lookups
+    snapshot.repartition("classification", "load_date") \
+        .sortWithinPartitions("id") \
+        .write.mode("overwrite") \
+        .partitionBy("classification", "load_date") \
+        .option("compression", "snappy") \
+        .parquet(args['parquet_output_path'])
+    print(f"Parquet snapshot written to {args['parquet_output_path']} (load_date={load_date})")
+
+# -----------------------------------
+start_stage("9. Save Snapshot for the Next Incremental Run")
+# -----------------------------------
+if incremental:
+    # Each run writes a new snapshot and then moves the pointer, so a failed run never
+    # leaves a half-written snapshot behind for the next diff
+    run_path = f"s3://{snapshot_bucket}/{snapshot_prefix}/run={datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}"
+    df.write.mode("overwrite").parquet(run_path)
+    s3.put_object(Bucket=snapshot_bucket, Key=latest_pointer_key, Body=run_path.encode('utf-8'))
+    print(f"Snapshot written to {run_path}")
+
+# -----------------------------------
+start_stage("10. Commit the Job")
 # -----------------------------------
 job.commit()
 
+if cached_upserts is not None:
+    cached_upserts.unpersist()
+deduplicated.unpersist()
+cleaned.unpersist()
+start_stage(None)
+
+print("Stage timings:")
+for stage in stage_timings:
+    print(f"   {stage['seconds']:8.1f}s  {stage['name']}")
+print(f"   {sum(stage['seconds'] for stage in stage_timings):8.1f}s  total")
+
 print("Data load completed successfully.")
\ No newline at end of file
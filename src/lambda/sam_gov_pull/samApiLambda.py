@@ -1,7 +1,14 @@
 import urllib.request
+import urllib.error
+import hashlib
 import json
 import boto3
 import os
+import io
+import time
+import zipfile
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # SAM.gov API endpoint
 SAM_API_URL = 'https://api.sam.gov/data-services/v1/extracts?api_key=4yZkGyeqYTqYjnvWZtCxaMzboz3h40CjlDFL868H&fileType=EXCLUSION'
@@ -9,20 +16,32 @@ SAM_API_URL = 'https://api.sam.gov/data-services/v1/extracts?api_key=4yZkGyeqYTq
 S3_BUCKET_NAME = 'codeblodded'
 # S3 object name
 S3_OBJECT_NAME = 'Source/exclusionData.zip'
+# Extracts are staged here before being copied onto S3_OBJECT_NAME, outside the prefix that triggers Glue
+STAGING_OBJECT_NAME = 'Staging/exclusionData.zip'
+# State record of the last successful pull (ETag, Last-Modified, SHA-256, skip counters)
+STATE_OBJECT_NAME = 'State/exclusionData.state.json'
 
-# AWS S3 client
-s3_client = boto3.client('s3')
+# Streaming upload settings. S3 requires every part except the last to be at least 5 MiB,
+# and peak memory is roughly PART_SIZE * (MAX_UPLOAD_WORKERS + 1).
+STREAMING_UPLOAD = os.environ.get('STREAMING_UPLOAD', 'true').lower() == 'true'
+PART_SIZE = max(int(os.environ.get('PART_SIZE_MB', '8')), 5) * 1024 * 1024
+MAX_UPLOAD_WORKERS = int(os.environ.get('MAX_UPLOAD_WORKERS', '4'))
+PART_RETRIES = int(os.environ.get('PART_RETRIES', '3'))
+# Multipart uploads older than this are treated as orphaned and aborted before a new pull
+STALE_UPLOAD_SECONDS = int(os.environ.get('STALE_UPLOAD_SECONDS', '3600'))
 
+# Sharding settings. The CSV inside the extract is split into SHARD_COUNT row-aligned shards
+# under SHARD_PREFIX/<date>/ so the Glue job can parse them in parallel.
+SHARD_EXTRACT = os.environ.get('SHARD_EXTRACT', 'true').lower() == 'true'
+SHARD_COUNT = max(int(os.environ.get('SHARD_COUNT', '8')), 1)
+SHARD_PREFIX = os.environ.get('SHARD_PREFIX', 'Shards')
+# Manifest of the most recent shard set. Reading the shards is opt-in: the Glue job only uses
+# them when started with --shard_manifest s3://<bucket>/Shards/latest_manifest.json
+LATEST_MANIFEST_NAME = f"{SHARD_PREFIX}/latest_manifest.json"
+RANGE_READ_SIZE = 8 * 1024 * 1024
 
-def download_exclusion_file(api_url):
-    try:
-        # Download the file from SAM.gov API
-        with urllib.request.urlopen(api_url) as response:
-            data = response.read()
-            return data
-    except Exception as e:
-        print(f"Error downloading file from SAM.gov: {e}")
-        return None
+# AWS S3 client
+s3_client = boto3.client('s3')
 
 
 def upload_to_s3(file_data, bucket_name, object_name):
@@ -33,41 +52,490 @@ def upload_to_s3(file_data, bucket_name, object_name):
         s3_client.put_object(Body=file_data, Bucket=bucket_name, Key=object_name)
         print(f"File uploaded successfully to S3 bucket")
         # print(f"File uploaded successfully to S3 bucket {bucket_name} with object name {object_name}.")
+        return True
     except Exception as e:
         print(f"Error uploading file to S3: {e}")
+        return False
 
 
-def lambda_handler(event, context):
+def read_chunks(stream, chunk_size):
     """
-    AWS Lambda handler function to download the exclusion file and upload it to S3.
+    Yields fixed-size chunks from a file-like stream. HTTP responses can return short reads,
+    so each chunk is filled up to chunk_size before it is yielded; only the last one may be smaller.
     """
-    # Log event
-    print(f"Received event: {json.dumps(event)}")
+    while True:
+        buffer = bytearray()
+        while len(buffer) < chunk_size:
+            data = stream.read(chunk_size - len(buffer))
+            if not data:
+                break
+            buffer.extend(data)
+        if not buffer:
+            return
+        yield bytes(buffer)
+        if len(buffer) < chunk_size:
+            return
 
-    # Download the exclusion file from SAM.gov
-    file_data = download_exclusion_file(SAM_API_URL)
 
-    if file_data:
-        # Upload the file to the S3 bucket
-        upload_to_s3(file_data, S3_BUCKET_NAME, S3_OBJECT_NAME)
-        return {
-            'statusCode': 200,
-            'body': json.dumps(
-                f"File uploaded successfully to S3 bucket {S3_BUCKET_NAME} with object name {S3_OBJECT_NAME}.")
-        }
-    else:
-        return {
-            'statusCode': 500,
-            'body': json.dumps("Failed to download or upload the exclusion file.")
-        }
+def upload_part(bucket_name, object_name, upload_id, part_number, data):
+    """
+    Uploads a single multipart part, retrying with exponential backoff before giving up.
+    """
+    for attempt in range(1, PART_RETRIES + 1):
+        try:
+            response = s3_client.upload_part(
+                Bucket=bucket_name,
+                Key=object_name,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=data
+            )
+            return {'PartNumber': part_number, 'ETag': response['ETag']}
+        except Exception as e:
+            if attempt == PART_RETRIES:
+                raise
+            print(f"Retrying part {part_number} after error (attempt {attempt}): {e}")
+            time.sleep(2 ** attempt * 0.1)
+
+
+def abort_stale_uploads(bucket_name, object_name, max_age_seconds=STALE_UPLOAD_SECONDS):
+    """
+    Aborts multipart uploads for object_name left behind by earlier invocations that timed out
+    or crashed before they could clean up after themselves.
+    """
+    aborted = 0
+    try:
+        response = s3_client.list_multipart_uploads(Bucket=bucket_name, Prefix=object_name)
+        now = time.time()
+        for upload in response.get('Uploads', []):
+            if upload['Key'] != object_name:
+                continue
+            if now - upload['Initiated'].timestamp() < max_age_seconds:
+                continue
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=object_name, UploadId=upload['UploadId'])
+            aborted += 1
+        if aborted:
+            print(f"Aborted {aborted} stale multipart upload(s) for {object_name}")
+    except Exception as e:
+        print(f"Error cleaning up stale multipart uploads: {e}")
+    return aborted
+
+
+def stream_to_s3(stream, bucket_name, object_name, part_size=PART_SIZE, max_workers=MAX_UPLOAD_WORKERS,
+                 should_complete=None):
+    """
+    Streams a file-like object to S3 as a multipart upload. Chunks are read from the stream while
+    earlier parts are still uploading, with at most max_workers parts in flight at once. If any part
+    fails the upload is aborted so no orphaned parts are left behind.
+
+    should_complete, if given, is called once the stream is exhausted and every part is uploaded;
+    when it returns False the upload is aborted instead of completed, so no object is written.
+
+    Returns the number of bytes uploaded, or None when the upload was discarded.
+    """
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket_name, Key=object_name)['UploadId']
+    parts = []
+    total_bytes = 0
+    in_flight = set()
+
+    def collect(done):
+        for future in done:
+            parts.append(future.result())
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for part_number, chunk in enumerate(read_chunks(stream, part_size), start=1):
+                # Back-pressure: wait for a free slot before reading further ahead
+                if len(in_flight) >= max_workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight.add(executor.submit(upload_part, bucket_name, object_name, upload_id, part_number, chunk))
+                total_bytes += len(chunk)
+            done, _ = wait(in_flight)
+            collect(done)
+
+        if should_complete is not None and not should_complete():
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=object_name, UploadId=upload_id)
+            print(f"Discarded multipart upload of {total_bytes} bytes for {object_name}")
+            return None
+
+        if not parts:
+            # Multipart uploads need at least one part, fall back to an empty object
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=object_name, UploadId=upload_id)
+            s3_client.put_object(Body=b'', Bucket=bucket_name, Key=object_name)
+            return 0
+
+        parts.sort(key=lambda p: p['PartNumber'])
+        s3_client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=object_name,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+        print(f"Streamed {total_bytes} bytes in {len(parts)} parts to S3")
+        return total_bytes
+    except Exception:
+        print(f"Aborting multipart upload {upload_id} for {object_name}")
+        try:
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=object_name, UploadId=upload_id)
+        except Exception as e:
+            print(f"Error aborting multipart upload: {e}")
+        raise
 
 
+def load_state(bucket_name, state_name):
+    """
+    Loads the state record of the last successful pull, or an empty record on the first run.
+    """
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=state_name)
+        return json.loads(response['Body'].read())
+    except s3_client.exceptions.NoSuchKey:
+        return {}
+    except Exception as e:
+        print(f"Error loading pull state, doing a full pull: {e}")
+        return {}
 
 
+def save_state(state, bucket_name, state_name):
+    try:
+        s3_client.put_object(Body=json.dumps(state).encode('utf-8'), Bucket=bucket_name, Key=state_name)
+    except Exception as e:
+        print(f"Error saving pull state: {e}")
 
 
+class HashingReader:
+    """
+    Wraps a file-like stream and computes a SHA-256 of everything read through it.
+    """
 
+    def __init__(self, stream):
+        self.stream = stream
+        self.sha256 = hashlib.sha256()
+        self.bytes_read = 0
 
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.sha256.update(data)
+        self.bytes_read += len(data)
+        return data
 
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+def build_conditional_request(api_url, state):
+    """
+    Builds the SAM.gov request with If-None-Match / If-Modified-Since taken from the last pull.
+    """
+    headers = {}
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('last_modified'):
+        headers['If-Modified-Since'] = state['last_modified']
+    return urllib.request.Request(api_url, headers=headers)
+
+
+def promote_staged_object(bucket_name, staging_name, object_name):
+    """
+    Moves the staged extract onto the watched key. The copy is server side, so the
+    Glue trigger only fires once the full object is in place.
+    """
+    s3_client.copy_object(
+        Bucket=bucket_name,
+        Key=object_name,
+        CopySource={'Bucket': bucket_name, 'Key': staging_name}
+    )
+    discard_staged_object(bucket_name, staging_name)
+
+
+def discard_staged_object(bucket_name, staging_name):
+    try:
+        s3_client.delete_object(Bucket=bucket_name, Key=staging_name)
+    except Exception as e:
+        print(f"Error deleting staged object {staging_name}: {e}")
+
+
+def pull_exclusion_file(api_url, bucket_name, object_name, state):
+    """
+    Downloads the exclusion file from SAM.gov and uploads it to S3 only if it changed since the
+    last pull. The request is conditional on the stored ETag/Last-Modified, and a SHA-256 of the
+    payload is compared against the stored digest for servers that ignore conditional headers.
 
+    In streaming mode the payload is hashed while its parts upload to STAGING_OBJECT_NAME, and the
+    multipart upload is aborted instead of completed when the digest matches, so an unchanged
+    extract writes no object and never fires the S3 event. Its parts have still been transferred,
+    so only the conditional-request and buffered paths count toward 'bytes_saved'. Changed
+    extracts are sharded (see shard_extract) before object_name is written.
 
+    Returns a result dict with 'status' of 'not_modified', 'unchanged' or 'uploaded', or None on failure.
+    """
+    request = build_conditional_request(api_url, state)
+    if STREAMING_UPLOAD:
+        abort_stale_uploads(bucket_name, STAGING_OBJECT_NAME)
+    try:
+        with urllib.request.urlopen(request) as response:
+            reader = HashingReader(response)
+            if STREAMING_UPLOAD:
+                stream_to_s3(reader, bucket_name, STAGING_OBJECT_NAME,
+                             should_complete=lambda: reader.hexdigest() != state.get('sha256'))
+                file_data = None
+            else:
+                file_data = reader.read()
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            print("SAM.gov reports the extract is not modified, skipping download")
+            return {'status': 'not_modified', 'bytes': 0, 'bytes_saved': state.get('size', 0)}
+        print(f"Error downloading file from SAM.gov: {e}")
+        return None
+    except Exception as e:
+        print(f"Error pulling file from SAM.gov to S3: {e}")
+        return None
+
+    result = {
+        'sha256': reader.hexdigest(),
+        'etag': etag,
+        'last_modified': last_modified,
+        'bytes': reader.bytes_read
+    }
+    if result['sha256'] == state.get('sha256'):
+        print("Extract content is unchanged, skipping upload")
+        # A streamed extract was already sent as parts before the digest was known
+        result.update(status='unchanged', bytes_saved=0 if STREAMING_UPLOAD else reader.bytes_read)
+        return result
+
+    if SHARD_EXTRACT:
+        # Shards and manifest go out before the source object so Glue never sees a half-written set
+        try:
+            if STREAMING_UPLOAD:
+                zip_stream = io.BufferedReader(S3RangeReader(bucket_name, STAGING_OBJECT_NAME), RANGE_READ_SIZE)
+            else:
+                zip_stream = io.BytesIO(file_data)
+            manifest = shard_extract(zip_stream, bucket_name, result['sha256'])
+            result['shards'] = len(manifest['shards'])
+        except Exception as e:
+            print(f"Error sharding extract: {e}")
+            if STREAMING_UPLOAD:
+                discard_staged_object(bucket_name, STAGING_OBJECT_NAME)
+            return None
+
+    if STREAMING_UPLOAD:
+        try:
+            promote_staged_object(bucket_name, STAGING_OBJECT_NAME, object_name)
+        except Exception as e:
+            print(f"Error uploading file to S3: {e}")
+            discard_staged_object(bucket_name, STAGING_OBJECT_NAME)
+            return None
+    elif not upload_to_s3(file_data, bucket_name, object_name):
+        return None
+    print(f"Uploaded {reader.bytes_read} bytes to S3 (sha256 {result['sha256']})")
+    result.update(status='uploaded', bytes_saved=0)
+    return result
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Seekable, read-only view of an S3 object backed by ranged GETs. zipfile needs to seek to the
+    central directory at the end of the archive, which a plain streaming body cannot do.
+    """
+
+    def __init__(self, bucket_name, object_name):
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.size = s3_client.head_object(Bucket=bucket_name, Key=object_name)['ContentLength']
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        return self.position
+
+    def readinto(self, buffer):
+        if self.position >= self.size:
+            return 0
+        end = min(self.position + len(buffer), self.size) - 1
+        response = s3_client.get_object(
+            Bucket=self.bucket_name,
+            Key=self.object_name,
+            Range=f"bytes={self.position}-{end}"
+        )
+        data = response['Body'].read()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class IterStream:
+    """
+    File-like adapter over an iterator of byte strings, so generated content can be fed to stream_to_s3.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        # Appending to and deleting from the front of a bytearray is amortized constant time;
+        # growing and slicing a bytes object copies the whole buffer on every chunk
+        self.buffer = bytearray()
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def iter_csv_records(lines):
+    """
+    Groups raw CSV lines into complete records. A line break only ends a record when the quotes
+    seen so far are balanced, so quoted multiline fields stay in one record. Bytes are passed
+    through untouched, including the doubled-quote artifacts in the SAM extract.
+    """
+    record = []
+    quotes = 0
+    for line in lines:
+        record.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            yield b''.join(record)
+            record = []
+            quotes = 0
+    if record:
+        yield b''.join(record)
+
+
+def shard_csv_member(archive, info, bucket_name, prefix, shard_count=SHARD_COUNT):
+    """
+    Streams one CSV member out of the archive and writes it as up to shard_count row-aligned
+    shards of roughly equal size. Every shard starts with the CSV header.
+
+    Returns a list of {'key', 'rows', 'bytes'} entries for the manifest.
+    """
+    shards = []
+    base_name = os.path.splitext(os.path.basename(info.filename))[0]
+    target_bytes = max(info.file_size // shard_count, 1)
+    with archive.open(info) as member:
+        records = iter_csv_records(member)
+        header = next(records, None)
+        if header is None:
+            return shards
+        if not header.endswith(b'\n'):
+            header += b'\n'
+        pending = next(records, None)
+
+        while pending is not None:
+            stats = {'rows': 0, 'bytes': 0}
+            last_shard = len(shards) == shard_count - 1
+
+            def shard_records():
+                nonlocal pending
+                yield header
+                while pending is not None and (last_shard or stats['bytes'] < target_bytes):
+                    yield pending
+                    stats['rows'] += 1
+                    stats['bytes'] += len(pending)
+                    pending = next(records, None)
+
+            key = f"{prefix}/data/{base_name}-part-{len(shards):05d}.csv"
+            size = stream_to_s3(IterStream(shard_records()), bucket_name, key)
+            shards.append({'key': key, 'rows': stats['rows'], 'bytes': size})
+    return shards
+
+
+def shard_extract(zip_stream, bucket_name, source_sha256, shard_count=SHARD_COUNT):
+    """
+    Unpacks the CSV members of the extract ZIP and writes them as shards under a dated prefix,
+    followed by a manifest. The manifest is also copied to LATEST_MANIFEST_NAME for the Glue job.
+
+    Returns the manifest dict.
+    """
+    now = datetime.now(timezone.utc)
+    prefix = f"{SHARD_PREFIX}/{now.strftime('%Y-%m-%d')}/{source_sha256[:12]}"
+    shards = []
+    with zipfile.ZipFile(zip_stream) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith('.csv'):
+                continue
+            shards.extend(shard_csv_member(archive, info, bucket_name, prefix, shard_count))
+
+    manifest = {
+        'created': now.isoformat(),
+        'source_sha256': source_sha256,
+        'prefix': prefix,
+        'total_rows': sum(s['rows'] for s in shards),
+        'total_bytes': sum(s['bytes'] for s in shards),
+        'shards': shards
+    }
+    body = json.dumps(manifest, indent=2).encode('utf-8')
+    s3_client.put_object(Body=body, Bucket=bucket_name, Key=f"{prefix}/manifest.json")
+    s3_client.put_object(Body=body, Bucket=bucket_name, Key=LATEST_MANIFEST_NAME)
+    print(f"Wrote {len(shards)} shards ({manifest['total_rows']} rows) under {prefix}")
+    return manifest
+
+
+def lambda_handler(event, context):
+    """
+    AWS Lambda handler function to download the exclusion file and upload it to S3.
+    Runs where SAM.gov has not published anything new are skipped without touching
+    the source object, so the downstream Glue job is not triggered.
+    """
+    # Log event
+    print(f"Received event: {json.dumps(event)}")
+
+    state = load_state(S3_BUCKET_NAME, STATE_OBJECT_NAME)
+    result = pull_exclusion_file(SAM_API_URL, S3_BUCKET_NAME, S3_OBJECT_NAME, state)
+
+    if result is None:
+        return {
+            'statusCode': 500,
+            'body': json.dumps("Failed to download or upload the exclusion file.")
+        }
+
+    skipped = result['status'] != 'uploaded'
+    state['skipped_runs'] = state.get('skipped_runs', 0) + (1 if skipped else 0)
+    state['bytes_saved'] = state.get('bytes_saved', 0) + result['bytes_saved']
+    if result['status'] != 'not_modified':
+        state.update(
+            sha256=result['sha256'],
+            etag=result['etag'],
+            last_modified=result['last_modified'],
+            size=result['bytes']
+        )
+    save_state(state, S3_BUCKET_NAME, STATE_OBJECT_NAME)
+
+    if skipped:
+        message = f"Exclusion file unchanged ({result['status']}), upload skipped."
+    else:
+        message = f"File uploaded successfully to S3 bucket {S3_BUCKET_NAME} with object name {S3_OBJECT_NAME}."
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': message,
+            'status': result['status'],
+            'skipped': skipped,
+            'bytes_downloaded': result['bytes'],
+            'bytes_saved': result['bytes_saved'],
+            'shards': result.get('shards', 0),
+            'total_skipped_runs': state['skipped_runs'],
+            'total_bytes_saved': state['bytes_saved']
+        })
+    }
@@ -76,7 +76,7 @@ function App() {
     if (e && e.preventDefault) e.preventDefault(); // Prevent default form submission
     setLoading(true);
     setError(null);
-    const url = 'https://search-mfcodeblooded-public-2pyd6s6pv5mkpug4ostdgfqltu.aos.us-east-1.on.aws/event-data-index_v1/_search/template';
+    const url = 'https://search-mfcodeblooded-public-2pyd6s6pv5mkpug4ostdgfqltu.aos.us-east-1.on.aws/event-data-index/_search/template';
 
     let payload = {
       id: searchType,
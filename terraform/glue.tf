@@ -12,6 +12,7 @@ resource "aws_glue_job" "load_data" {
     "--TempDir"                          = "s3://${aws_s3_bucket.source.id}/temporary/"
     "--enable-continuous-cloudwatch-log" = "true"
     "--enable-metrics"                   = "true"
+    "--extra-py-files"                   = "s3://${aws_s3_bucket.source.id}/scripts/name_keys.py"
   }
 
   execution_property {